@@ -10,6 +10,27 @@ class ImageGenerationRequest(BaseModel):
     width: int = Field(1024, ge=256, le=2048, description="Image width in pixels")
     height: int = Field(1024, ge=256, le=2048, description="Image height in pixels")
     num_outputs: int = Field(1, ge=1, le=4, description="Number of images to generate")
+    image_profile: str | None = Field(
+        None,
+        pattern="^(original|lossless|high|standard|compact)$",
+        description="Storage profile: original, lossless, high, standard or compact",
+    )
+    image_format: str | None = Field(
+        None, pattern="^(webp|avif|jpeg|png)$", description="Override the profile's format"
+    )
+    quality: int | None = Field(None, ge=1, le=100, description="Override encoder quality")
+    lossless: bool | None = Field(None, description="Lossless WebP/AVIF encoding")
+    strip_metadata: bool | None = Field(None, description="Drop EXIF and ICC metadata")
+    provider: str | None = Field(None, description="Preferred backend while it is healthy")
+    max_latency: float | None = Field(
+        None, gt=0, description="Prefer backends expected to answer within this many seconds"
+    )
+    max_cost: int | None = Field(
+        None, ge=1, le=3, description="Highest cost tier, 1 ($) to 3 ($$$)"
+    )
+    min_quality: str | None = Field(
+        None, pattern="^(Good|High|Very High)$", description="Lowest acceptable quality level"
+    )
 
     class Config:
         json_schema_extra = {
@@ -18,6 +39,7 @@ class ImageGenerationRequest(BaseModel):
                 "width": 1024,
                 "height": 1024,
                 "num_outputs": 1,
+                "image_profile": "standard",
             }
         }
 
@@ -28,15 +50,45 @@ class ImageGenerationResponse(BaseModel):
     job_id: str
     status: str
     images: list[str] | None = None
+    provider: str | None = None
     message: str | None = None
 
 
+class SimilarImage(BaseModel):
+    """One match from a perceptual-hash lookup"""
+
+    filename: str
+    distance: int = Field(..., description="Hamming distance between perceptual hashes (0-64)")
+
+
+class SimilarImagesResponse(BaseModel):
+    """Response model for similar-image lookups"""
+
+    filename: str
+    matches: list[SimilarImage]
+
+
 class AudioGenerationRequest(BaseModel):
     """Request model for audio generation"""
 
     text: str = Field(..., description="Text to convert to speech")
     voice: str = Field("Adam", description="Voice name")
     language: str = Field("ar", description="Language code (ar, en, etc.)")
+    audio_profile: str | None = Field(
+        None,
+        pattern="^(voice|compact|standard|high)$",
+        description="Audio profile: voice, compact, standard or high (defaults to server config)",
+    )
+    audio_codec: str | None = Field(
+        None, pattern="^(mp3|opus|aac)$", description="Override the profile's codec"
+    )
+    bitrate: str | None = Field(
+        None, pattern="^[0-9]{2,3}k$", description="Override the profile's bitrate, e.g. 64k"
+    )
+    channels: int | None = Field(None, ge=1, le=2, description="Override channels: 1 or 2")
+    sample_rate: int | None = Field(
+        None, ge=8000, le=48000, description="Override the sample rate in Hz"
+    )
 
     class Config:
         json_schema_extra = {
@@ -44,6 +96,7 @@ class AudioGenerationRequest(BaseModel):
                 "text": "مرحباً بكم في منصة SA للذكاء الاصطناعي",
                 "voice": "Adam",
                 "language": "ar",
+                "audio_profile": "voice",
             }
         }
 
@@ -63,6 +116,19 @@ class VideoGenerationRequest(BaseModel):
     image_paths: list[str] = Field(..., description="List of image file paths")
     duration_per_image: int = Field(3, ge=1, le=10, description="Duration per image in seconds")
     audio_path: str | None = Field(None, description="Optional audio track path")
+    transition: str = Field(
+        "none",
+        pattern="^(none|crossfade|kenburns|slide)$",
+        description="Transition between images: none, crossfade, kenburns or slide",
+    )
+    transition_duration: float = Field(
+        0.5, ge=0.1, le=2.0, description="Transition length in seconds"
+    )
+    render_profile: str | None = Field(
+        None,
+        pattern="^(draft|standard|final)$",
+        description="Render profile: draft, standard or final (defaults to server config)",
+    )
 
     class Config:
         json_schema_extra = {
@@ -70,6 +136,25 @@ class VideoGenerationRequest(BaseModel):
                 "image_paths": ["outputs/img1.png", "outputs/img2.png"],
                 "duration_per_image": 3,
                 "audio_path": "outputs/audio.mp3",
+                "transition": "crossfade",
+                "render_profile": "draft",
+            }
+        }
+
+
+class TextToVideoRequest(BaseModel):
+    """Request model for text-to-video generation"""
+
+    prompt: str = Field(..., min_length=3, max_length=1000, description="Video description")
+    duration: int = Field(5, ge=1, le=10, description="Video duration in seconds")
+    fps: int = Field(24, ge=8, le=30, description="Frames per second")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "prompt": "A drone shot over desert dunes at sunset, cinematic",
+                "duration": 4,
+                "fps": 24,
             }
         }
 
@@ -80,7 +165,19 @@ class VideoGenerationResponse(BaseModel):
     job_id: str
     status: str
     video_url: str | None = None
+    progress_url: str | None = None
+    message: str | None = None
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for job progress"""
+
+    job_id: str
+    kind: str
+    status: str
     message: str | None = None
+    progress: dict
+    result: str | None = None
 
 
 class PromptImprovementRequest(BaseModel):
@@ -171,6 +268,12 @@ class ConfigStatusResponse(BaseModel):
     assets_dir: str
 
 
+class RoutingStatusResponse(BaseModel):
+    """Response model for provider routing statistics"""
+
+    image: dict[str, dict]
+
+
 class OutputsResponse(BaseModel):
     """Response model for listing outputs"""
 
@@ -179,6 +282,12 @@ class OutputsResponse(BaseModel):
     audio: list[str]
 
 
+class WebhookResponse(BaseModel):
+    """Response model for provider webhooks"""
+
+    accepted: bool
+
+
 class DeleteResponse(BaseModel):
     """Response model for delete operations"""
 
@@ -1,11 +1,15 @@
 """API route handlers"""
 
+import json
 import logging
 import os
+import shutil
 import uuid
+from concurrent.futures import Future
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 
 from sa.api.models import (
     AudioGenerationRequest,
@@ -15,19 +19,38 @@ from sa.api.models import (
     HealthResponse,
     ImageGenerationRequest,
     ImageGenerationResponse,
+    JobStatusResponse,
     OutputsResponse,
     PromptImprovementRequest,
     PromptImprovementResponse,
     PromptVariationsRequest,
     PromptVariationsResponse,
+    RoutingStatusResponse,
     Scene,
     ScriptGenerationRequest,
     ScriptGenerationResponse,
+    SimilarImage,
+    SimilarImagesResponse,
+    TextToVideoRequest,
     VideoGenerationRequest,
     VideoGenerationResponse,
+    WebhookResponse,
 )
 from sa.generators import AudioGenerator, ImageGenerator, VideoGenerator
-from sa.utils import SuggestionEngine, config
+from sa.generators.audio_engine import AUDIO_MEDIA_TYPES, get_audio_format
+from sa.generators.image_generator import IMAGE_MEDIA_TYPES, get_image_encoding
+from sa.generators.predictions import PredictionEngine
+from sa.utils import SuggestionEngine, config, derivative_service, image_index, job_tracker
+from sa.utils.ai_models import closest_size
+from sa.utils.derivatives import DERIVATIVE_MEDIA_TYPE
+from sa.utils.image_index import SIMILAR_DISTANCE
+from sa.utils.model_router import (
+    Backend,
+    ModelRouter,
+    RequestRejected,
+    RoutingError,
+    RoutingHints,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -40,24 +63,87 @@ audio_router = APIRouter(prefix="/audio", tags=["Audio"])
 videos_router = APIRouter(prefix="/videos", tags=["Videos"])
 suggestions_router = APIRouter(prefix="/suggestions", tags=["AI Suggestions"])
 utilities_router = APIRouter(prefix="/outputs", tags=["Utilities"])
+webhooks_router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
 
 # Initialize generators
 image_generator = None
-video_generator = VideoGenerator()
 audio_generator = None
 suggestion_engine = None
 
+# One engine tracks every in-flight Replicate prediction on a single background loop
+prediction_engine = None
+if config.replicate_api_key:
+    prediction_engine = PredictionEngine(
+        config.replicate_api_key,
+        webhook_url=config.replicate_webhook_url,
+        webhook_secret=config.replicate_webhook_secret,
+    )
+
+video_generator = VideoGenerator(
+    render_profile=config.render_profile, prediction_engine=prediction_engine
+)
+
 # Initialize generators with API keys if available
 if config.replicate_api_key:
-    image_generator = ImageGenerator(config.replicate_api_key)
+    image_generator = ImageGenerator(
+        config.replicate_api_key,
+        image_profile=config.image_profile,
+        prediction_engine=prediction_engine,
+    )
     logger.info("✅ Image generator initialized")
 
+# Saves downloads for every provider, also when Replicate isn't configured
+image_store = image_generator or ImageGenerator(image_profile=config.image_profile)
+
+
+def _replicate_images(**kwargs) -> Future:
+    """
+    Submit a Replicate prediction through the current image generator
+
+    Raises:
+        RequestRejected: If the generator's local validation refuses the request
+    """
+    issues = (
+        ImageGenerator.validate_prompt(kwargs["prompt"])["issues"]
+        + ImageGenerator.validate_dimensions(kwargs["width"], kwargs["height"])["issues"]
+    )
+    if issues:
+        raise RequestRejected("; ".join(issues))
+    return image_generator.submit(**kwargs)
+
+
+def _openai_images(generator, info: dict):
+    """Adapt a DALL-E generator to the request shape of the Replicate one"""
+
+    def generate(prompt: str, width: int, height: int, num_outputs: int) -> list[str]:
+        size = closest_size(info["sizes"], width, height)
+        return [generator.generate(prompt, size=size) for _ in range(num_outputs)]
+
+    return generate
+
+
+# Sends each image request to the fastest healthy provider and fails over between them
+image_router = ModelRouter.from_factory(
+    "image", {"OpenAI": config.openai_api_key}, adapter=_openai_images
+)
+image_router.add(
+    Backend(
+        "replicate-flux-schnell",
+        _replicate_images,
+        cost=1,
+        quality="High",
+        expected_latency=4.0,
+        returns_future=True,
+        enabled=lambda: image_generator is not None,
+    )
+)
+
 if config.elevenlabs_api_key:
-    audio_generator = AudioGenerator(config.elevenlabs_api_key)
+    audio_generator = AudioGenerator(config.elevenlabs_api_key, audio_profile=config.audio_profile)
     logger.info("✅ Audio generator initialized")
 else:
     # Fallback to gTTS
-    audio_generator = AudioGenerator(None)
+    audio_generator = AudioGenerator(None, audio_profile=config.audio_profile)
     logger.info("✅ Audio generator initialized with gTTS fallback")
 
 if config.openai_api_key:
@@ -72,13 +158,13 @@ if config.openai_api_key:
 async def health_check():
     """
     ## فحص صحة النظام
-    
+
     يتحقق من حالة API وجاهزية جميع الخدمات.
-    
+
     ### Returns:
     - `status`: حالة النظام (healthy/degraded)
     - `services`: قائمة الخدمات المتاحة
-    
+
     ### مثال على الاستجابة:
     ```json
     {
@@ -113,6 +199,12 @@ async def config_status():
     )
 
 
+@config_router.get("/config/routing", response_model=RoutingStatusResponse)
+async def routing_status():
+    """Latency, error rate and health of each provider backend"""
+    return RoutingStatusResponse(image=image_router.get_statistics())
+
+
 # ============= Image Routes =============
 
 
@@ -120,50 +212,73 @@ async def config_status():
 async def generate_image(request: ImageGenerationRequest, background_tasks: BackgroundTasks):
     """
     ## توليد صورة من النص
-    
+
     يستخدم AI لتحويل الوصف النصي إلى صورة عالية الجودة.
-    
+
     ### المعاملات:
     - `prompt`: النص الوصفي للصورة (مطلوب)
     - `width`: عرض الصورة بالبكسل (512-1024، افتراضي: 512)
     - `height`: ارتفاع الصورة (512-1024، افتراضي: 512)
     - `num_outputs`: عدد الصور (1-4، افتراضي: 1)
     - `guidance_scale`: قوة الالتزام بالنص (1-20، افتراضي: 7.5)
-    
+
     ### أمثلة على Prompts:
     - "beautiful sunset over ocean, vibrant colors, 8k"
     - "cute cat playing with yarn, studio photo"
     - "futuristic city at night, neon lights, cyberpunk"
-    
+
     ### Returns:
     - `job_id`: معرف فريد للعملية
     - `status`: حالة التوليد (completed/failed)
     - `image_urls`: روابط الصور المولدة
     - `message`: رسالة حالة
-    
+
     ### ملاحظات:
-    - يتطلب Replicate API token
+    - يتطلب Replicate API token أو OpenAI API key
+    - يُوجَّه الطلب إلى أسرع مزوّد سليم، مع الانتقال التلقائي إلى غيره عند الفشل
+    - `provider` و`max_latency` و`max_cost` و`min_quality` تلميحات اختيارية لاختيار المزوّد
     - الوقت المتوقع: 10-30 ثانية
     - الصور تُحفظ تلقائياً في `outputs/`
     """
-    if not image_generator:
+    if not image_router:
         raise HTTPException(
             status_code=503,
-            detail="Image generation service not available. Please configure REPLICATE_API_TOKEN",
+            detail="Image generation service not available. "
+            "Please configure REPLICATE_API_TOKEN or OPENAI_API_KEY",
         )
 
     job_id = str(uuid.uuid4())
 
     try:
-        logger.info(f"Generating image for job {job_id}: {request.prompt[:50]}...")
-        images = image_generator.generate(
-            prompt=request.prompt,
-            width=request.width,
-            height=request.height,
-            num_outputs=request.num_outputs,
+        encoding = get_image_encoding(
+            request.image_profile or config.image_profile,
+            image_format=request.image_format,
+            quality=request.quality,
+            lossless=request.lossless,
+            strip_metadata=request.strip_metadata,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
-        if not images:
+    try:
+        logger.info(f"Generating image for job {job_id}: {request.prompt[:50]}...")
+        hints = RoutingHints(
+            provider=request.provider,
+            max_latency=request.max_latency,
+            max_cost=request.max_cost,
+            min_quality=request.min_quality,
+        )
+        try:
+            # Awaiting a Replicate prediction holds no thread while it runs
+            routed = await image_router.acall(
+                prompt=request.prompt,
+                width=request.width,
+                height=request.height,
+                num_outputs=request.num_outputs,
+                hints=hints,
+            )
+        except RoutingError as e:
+            logger.error(f"Image generation failed for job {job_id}: {e}")
             return ImageGenerationResponse(
                 job_id=job_id,
                 status="failed",
@@ -171,16 +286,26 @@ async def generate_image(request: ImageGenerationRequest, background_tasks: Back
             )
 
         # Download images
+        store = image_generator or image_store
         saved_images = []
-        for i, image_url in enumerate(images):
+        for i, image_url in enumerate(routed.result):
             save_path = f"{config.output_dir}/img_{job_id}_{i}.png"
-            if image_generator.download_image(image_url, save_path):
-                saved_images.append(f"/api/v1/images/{os.path.basename(save_path)}")
+            # Retries, backoff and hedged requests must not block the event loop
+            saved_path = await run_in_threadpool(
+                store.download_image, image_url, save_path, encoding=encoding
+            )
+            if saved_path:
+                # Hashing decodes the image, so it runs off the event loop too
+                saved_path = await run_in_threadpool(_index_image, saved_path)
+                # The extension follows the format the provider actually served
+                saved_images.append(f"/api/v1/images/{os.path.basename(saved_path)}")
+                derivative_service.submit(saved_path)
 
         return ImageGenerationResponse(
             job_id=job_id,
             status="completed",
             images=saved_images,
+            provider=routed.backend,
             message=f"Generated {len(saved_images)} images",
         )
 
@@ -189,20 +314,99 @@ async def generate_image(request: ImageGenerationRequest, background_tasks: Back
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+def _index_image(path: str) -> str:
+    """
+    Add a stored image to the similarity index
+
+    With dedupe_images enabled, a perceptual duplicate of an earlier image is
+    deleted and the earlier file is returned instead.
+    """
+    if config.dedupe_images:
+        return image_index.dedupe(path)
+    image_index.add(path)
+    return path
+
+
+def _derivative_response(file_path: str, size: str) -> FileResponse:
+    """Serve a cached thumbnail, preview or poster of an output file"""
+    try:
+        derivative = derivative_service.get(file_path, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    if not derivative:
+        raise HTTPException(status_code=500, detail=f"Failed to create {size} derivative")
+    return FileResponse(derivative, media_type=DERIVATIVE_MEDIA_TYPE)
+
+
+def _find_similar(file_path: str, max_distance: int, limit: int) -> list[tuple[str, int]]:
+    """Bring the index up to date, then query it"""
+    image_index.sync(config.output_dir)
+    return image_index.find_similar(file_path, max_distance=max_distance, limit=limit)
+
+
+@images_router.get("/{filename}/similar", response_model=SimilarImagesResponse)
+async def find_similar_images(
+    filename: str,
+    max_distance: int = Query(SIMILAR_DISTANCE, ge=0, le=64, description="Hamming radius"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of matches"),
+):
+    """Find generated images that look like this one"""
+    file_path = f"{config.output_dir}/{filename}"
+
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    matches = await run_in_threadpool(_find_similar, file_path, max_distance, limit)
+    return SimilarImagesResponse(
+        filename=filename,
+        matches=[
+            SimilarImage(filename=os.path.basename(path), distance=distance)
+            for path, distance in matches
+        ],
+    )
+
+
 @images_router.get("/{filename}")
-async def get_image(filename: str):
-    """Download a generated image"""
+async def get_image(
+    filename: str,
+    size: str | None = Query(None, pattern="^(thumb|preview)$", description="Derivative size"),
+):
+    """Download a generated image, or a downsized derivative of it"""
     file_path = f"{config.output_dir}/{filename}"
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Image not found")
 
-    return FileResponse(file_path, media_type="image/png")
+    if size:
+        return await run_in_threadpool(_derivative_response, file_path, size)
+
+    media_type = IMAGE_MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), "image/png")
+    return FileResponse(file_path, media_type=media_type)
 
 
 # ============= Audio Routes =============
 
 
+def _publish_audio(audio: str, output_path: str) -> str:
+    """
+    Make generated audio downloadable from the output directory
+
+    Cache hits point into the generator's cache, which ``get_audio`` does not
+    serve, so they are hard-linked (or copied across filesystems) to output_path.
+
+    Returns:
+        Path of the audio inside the output directory
+    """
+    output_dir = os.path.realpath(config.output_dir)
+    if os.path.dirname(os.path.realpath(audio)) == output_dir:
+        return audio
+    try:
+        os.link(audio, output_path)
+    except OSError:
+        shutil.copyfile(audio, output_path)
+    return output_path
+
+
 @audio_router.post("/generate", response_model=AudioGenerationResponse)
 async def generate_audio(request: AudioGenerationRequest):
     """Generate speech from text"""
@@ -215,14 +419,39 @@ async def generate_audio(request: AudioGenerationRequest):
     job_id = str(uuid.uuid4())
 
     try:
-        logger.info(f"Generating audio for job {job_id}: {request.text[:50]}...")
-        output_path = f"{config.output_dir}/audio_{job_id}.mp3"
+        audio_format = get_audio_format(
+            request.audio_profile or config.audio_profile,
+            codec=request.audio_codec,
+            bitrate=request.bitrate,
+            channels=request.channels,
+            sample_rate=request.sample_rate,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
+    try:
+        logger.info(f"Generating audio for job {job_id}: {request.text[:50]}...")
+        output_path = f"{config.output_dir}/audio_{job_id}{audio_format.extension}"
+
+        # Providers return MP3 at the standard profile; anything else is
+        # synthesized into the audio cache and re-encoded from there
+        passthrough = audio_format == get_audio_format()
+        speech_path = (
+            output_path
+            if passthrough
+            else audio_generator.speech_cache_path(request.text, request.voice)
+        )
         audio = audio_generator.generate_speech(
             text=request.text,
             voice=request.voice,
-            output_path=output_path,
+            output_path=speech_path,
+            language=request.language,
         )
+        if audio and not passthrough:
+            audio = audio_generator.convert_audio(audio, output_path, audio_format)
+        # Never hand out a cache path, e.g. another profile's intermediate speech
+        if audio:
+            audio = _publish_audio(audio, output_path)
 
         if not audio:
             return AudioGenerationResponse(
@@ -243,6 +472,30 @@ async def generate_audio(request: AudioGenerationRequest):
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@audio_router.post("/stream")
+async def stream_audio(request: AudioGenerationRequest):
+    """Stream speech to the client while it is being synthesized"""
+    if not audio_generator:
+        raise HTTPException(
+            status_code=503,
+            detail="Audio generation service not available",
+        )
+
+    logger.info(f"Streaming audio: {request.text[:50]}...")
+    chunks = audio_generator.stream_speech(
+        text=request.text, voice=request.voice, language=request.language
+    )
+    if chunks is None:
+        raise HTTPException(status_code=400, detail="Invalid text for speech synthesis")
+
+    # Sync iterators are drained in the threadpool, one chunk per transfer frame
+    return StreamingResponse(
+        chunks,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @audio_router.get("/{filename}")
 async def get_audio(filename: str):
     """Download a generated audio file"""
@@ -251,73 +504,224 @@ async def get_audio(filename: str):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Audio not found")
 
-    return FileResponse(file_path, media_type="audio/mpeg")
+    media_type = AUDIO_MEDIA_TYPES.get(os.path.splitext(filename)[1], "audio/mpeg")
+    return FileResponse(file_path, media_type=media_type)
 
 
 # ============= Video Routes =============
 
 
-@videos_router.post("/generate", response_model=VideoGenerationResponse)
-async def generate_video(request: VideoGenerationRequest):
-    """Create a video from images"""
+def _render_video_job(job_id: str, request: VideoGenerationRequest) -> str | None:
+    """Render a video job, publishing progress to the job tracker"""
+    output_path = f"{config.output_dir}/video_{job_id}.mp4"
+
+    def on_message(message: str) -> None:
+        job_tracker.update(job_id, message=message)
+
+    def on_render_progress(progress: dict) -> None:
+        job_tracker.update(job_id, progress=progress)
+
+    job_tracker.update(job_id, status="processing", message="Creating slideshow...")
+
+    # Create slideshow
+    video = video_generator.create_slideshow(
+        image_paths=request.image_paths,
+        duration_per_image=request.duration_per_image,
+        output_path=output_path,
+        transition=request.transition,
+        transition_duration=request.transition_duration,
+        render_profile=request.render_profile,
+        progress_callback=on_message,
+        render_progress_callback=on_render_progress,
+    )
+
+    # Add audio if provided
+    if video and request.audio_path and os.path.exists(request.audio_path):
+        video_with_audio = video_generator.add_audio(
+            video,
+            request.audio_path,
+            render_profile=request.render_profile,
+            progress_callback=on_message,
+            render_progress_callback=on_render_progress,
+        )
+        if video_with_audio:
+            video = video_with_audio
+
+    if not video:
+        job_tracker.update(job_id, status="failed", message="Failed to create video")
+        return None
+
+    derivative_service.submit(video)
+    video_url = f"/api/v1/videos/{os.path.basename(video)}"
+    job_tracker.update(job_id, status="completed", message="Video generated", result=video_url)
+    return video_url
+
+
+def _run_video_job(job_id: str, request: VideoGenerationRequest) -> None:
+    """Background task wrapper that never lets a render error escape"""
+    try:
+        _render_video_job(job_id, request)
+    except Exception as e:
+        logger.error(f"Error in video job {job_id}: {e}")
+        job_tracker.update(job_id, status="failed", message=str(e))
+
+
+def _check_video_request(request: VideoGenerationRequest) -> None:
+    """Validate that the video service and all input images are available"""
     if not video_generator:
         raise HTTPException(
             status_code=503,
             detail="Video generation service not available",
         )
 
+    # Verify all images exist
+    for img_path in request.image_paths:
+        if not os.path.exists(img_path):
+            raise HTTPException(status_code=404, detail=f"Image not found: {img_path}")
+
+
+@videos_router.post("/generate", response_model=VideoGenerationResponse)
+async def generate_video(request: VideoGenerationRequest):
+    """Create a video from images"""
+    _check_video_request(request)
+
     job_id = str(uuid.uuid4())
+    job_tracker.create(job_id, kind="video")
 
     try:
         logger.info(f"Generating video for job {job_id}")
 
-        # Verify all images exist
-        for img_path in request.image_paths:
-            if not os.path.exists(img_path):
-                raise HTTPException(status_code=404, detail=f"Image not found: {img_path}")
-
-        output_path = f"{config.output_dir}/video_{job_id}.mp4"
-
-        # Create slideshow
-        video = video_generator.create_slideshow(
-            image_paths=request.image_paths,
-            duration_per_image=request.duration_per_image,
-            output_path=output_path,
-        )
+        # Render off the event loop so progress streams stay responsive
+        video_url = await run_in_threadpool(_render_video_job, job_id, request)
 
-        if not video:
+        if not video_url:
             return VideoGenerationResponse(
                 job_id=job_id,
                 status="failed",
                 message="Failed to create video",
             )
 
-        # Add audio if provided
-        if request.audio_path and os.path.exists(request.audio_path):
-            video_with_audio = video_generator.add_audio(video, request.audio_path)
-            if video_with_audio:
-                video = video_with_audio
-
         return VideoGenerationResponse(
             job_id=job_id,
             status="completed",
-            video_url=f"/api/v1/videos/{os.path.basename(video)}",
+            video_url=video_url,
             message="Video generated successfully",
         )
 
     except Exception as e:
         logger.error(f"Error generating video: {e}")
+        job_tracker.update(job_id, status="failed", message=str(e))
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@videos_router.post("/jobs", response_model=VideoGenerationResponse, status_code=202)
+async def submit_video_job(request: VideoGenerationRequest, background_tasks: BackgroundTasks):
+    """
+    ## إرسال مهمة فيديو في الخلفية
+
+    يعيد `job_id` فوراً، ويمكن متابعة تقدم الترميز (الإطارات، fps، الوقت المتبقي)
+    عبر `progress_url` كبث Server-Sent Events.
+    """
+    _check_video_request(request)
+
+    job_id = str(uuid.uuid4())
+    job_tracker.create(job_id, kind="video")
+    background_tasks.add_task(_run_video_job, job_id, request)
+
+    return VideoGenerationResponse(
+        job_id=job_id,
+        status="queued",
+        progress_url=f"/api/v1/videos/jobs/{job_id}/events",
+        message="Video job queued",
+    )
+
+
+@videos_router.post("/text", response_model=VideoGenerationResponse, status_code=202)
+async def submit_text_to_video(request: TextToVideoRequest):
+    """
+    Queue a text-to-video prediction
+
+    Returns immediately; the job is completed by the prediction engine when
+    Replicate finishes, and can be followed through `progress_url`.
+    """
+    if not prediction_engine:
+        raise HTTPException(
+            status_code=503,
+            detail="Text-to-video not available. Please configure REPLICATE_API_TOKEN",
+        )
+
+    job_id = str(uuid.uuid4())
+    job_tracker.create(job_id, kind="video")
+    job_tracker.update(job_id, status="processing", message="Generating video...")
+
+    def on_done(future) -> None:
+        video_url = future.result()
+        if video_url:
+            job_tracker.update(
+                job_id, status="completed", message="Video generated", result=video_url
+            )
+        else:
+            job_tracker.update(job_id, status="failed", message="Failed to generate video")
+
+    video_generator.submit_from_text(
+        request.prompt,
+        duration=request.duration,
+        fps=request.fps,
+        progress_callback=lambda message: job_tracker.update(job_id, message=message),
+    ).add_done_callback(on_done)
+
+    return VideoGenerationResponse(
+        job_id=job_id,
+        status="processing",
+        progress_url=f"/api/v1/videos/jobs/{job_id}/events",
+        message="Video prediction submitted",
+    )
+
+
+@videos_router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_video_job(job_id: str):
+    """Get the current progress of a video job"""
+    job = job_tracker.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobStatusResponse(**job)
+
+
+@videos_router.get("/jobs/{job_id}/events")
+async def stream_video_job(job_id: str):
+    """Stream video job progress as Server-Sent Events until the job finishes"""
+    if not job_tracker.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        async for job in job_tracker.stream(job_id):
+            payload = {k: job[k] for k in ("job_id", "status", "message", "progress", "result")}
+            yield f"event: {job['status']}\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @videos_router.get("/{filename}")
-async def get_video(filename: str):
-    """Download a generated video"""
+async def get_video(
+    filename: str,
+    size: str | None = Query(
+        None, pattern="^(poster|thumb|preview)$", description="Poster frame size"
+    ),
+):
+    """Download a generated video, or its poster frame"""
     file_path = f"{config.output_dir}/{filename}"
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Video not found")
 
+    if size:
+        return await run_in_threadpool(_derivative_response, file_path, size)
+
     return FileResponse(file_path, media_type="video/mp4")
 
 
@@ -409,11 +813,11 @@ async def list_outputs():
             for file in os.listdir(config.output_dir):
                 file_path = os.path.join(config.output_dir, file)
                 if os.path.isfile(file_path):
-                    if file.endswith((".png", ".jpg", ".jpeg")):
+                    if file.endswith((".png", ".jpg", ".jpeg", ".webp", ".gif", ".avif")):
                         outputs["images"].append(file)
                     elif file.endswith((".mp4", ".avi", ".mov")):
                         outputs["videos"].append(file)
-                    elif file.endswith((".mp3", ".wav")):
+                    elif file.endswith((".mp3", ".wav", ".ogg", ".m4a")):
                         outputs["audio"].append(file)
 
         return OutputsResponse(**outputs)
@@ -433,6 +837,8 @@ async def delete_output(filename: str):
 
     try:
         os.remove(file_path)
+        derivative_service.remove(file_path)
+        image_index.remove(file_path)
         return DeleteResponse(message=f"File {filename} deleted successfully")
 
     except Exception as e:
@@ -440,6 +846,29 @@ async def delete_output(filename: str):
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+# ============= Webhook Routes =============
+
+
+@webhooks_router.post("/replicate", response_model=WebhookResponse)
+async def replicate_webhook(request: Request):
+    """Receive completed predictions pushed by Replicate"""
+    if not prediction_engine:
+        raise HTTPException(status_code=503, detail="Prediction engine not configured")
+
+    body = await request.body()
+    if not prediction_engine.verify_webhook(request.headers, body):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        prediction = json.loads(body)
+    except ValueError:
+        prediction = None
+    if not isinstance(prediction, dict):
+        raise HTTPException(status_code=400, detail="Invalid prediction payload")
+
+    return WebhookResponse(accepted=prediction_engine.handle_webhook(prediction))
+
+
 # Combine all routers
 def get_router():
     """Get the main API router with all sub-routers"""
@@ -452,5 +881,6 @@ def get_router():
     main_router.include_router(videos_router)
     main_router.include_router(suggestions_router)
     main_router.include_router(utilities_router)
+    main_router.include_router(webhooks_router)
 
     return main_router
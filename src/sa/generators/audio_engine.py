@@ -0,0 +1,616 @@
+"""NumPy PCM assembly and mixing for narration and background music
+
+pydub concatenation (``a + b``) and ``overlay`` copy the whole buffer on
+every call, which makes joining many segments quadratic. Here audio is
+decoded once to int16 PCM, the output buffer is allocated at its final
+length, and segments, gaps and a looped music bed are written into it in
+a single pass.
+
+For long-form mixes ``stream_mix`` never holds more than one chunk of
+audio in memory: ffmpeg decodes both inputs to raw PCM pipes, chunks are
+gained and summed in NumPy, and the result is piped to an ffmpeg encoder.
+
+Music beds reused across many outputs can be decoded once into a
+``PCMCache``: raw PCM files keyed by content hash and format, opened as
+read-only memory maps so mixers slice them without decoding or copying.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import IO, Any, Self
+
+import numpy as np
+from pydub import AudioSegment
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 44100
+SAMPLE_WIDTH = 2  # int16
+
+# Frames per streaming chunk (~1.5 s at 44.1 kHz)
+DEFAULT_CHUNK_FRAMES = 65536
+
+
+def ffmpeg_binary() -> str:
+    """Locate ffmpeg: FFMPEG_BINARY env, moviepy's bundled binary, then pydub's"""
+    binary = os.getenv("FFMPEG_BINARY")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+
+        return str(imageio_ffmpeg.get_ffmpeg_exe())
+    except Exception:
+        return str(AudioSegment.converter)
+
+
+# Supported output codecs: ffmpeg encoder, container, file extension, media type
+AUDIO_CODECS: dict[str, tuple[str, str, str, str]] = {
+    "mp3": ("libmp3lame", "mp3", ".mp3", "audio/mpeg"),
+    "opus": ("libopus", "ogg", ".ogg", "audio/ogg"),
+    "aac": ("aac", "ipod", ".m4a", "audio/mp4"),
+}
+
+# Sample rates libopus accepts natively
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Encoding applied to exported audio files"""
+
+    name: str
+    codec: str = "mp3"
+    bitrate: str = "128k"
+    channels: int | None = None  # None keeps the source layout
+    sample_rate: int | None = None  # None keeps the source rate
+
+    def __post_init__(self) -> None:
+        if self.codec not in AUDIO_CODECS:
+            raise ValueError(
+                f"Unsupported audio codec: {self.codec}. Available: {list(AUDIO_CODECS.keys())}"
+            )
+        if self.codec == "opus" and self.sample_rate not in OPUS_SAMPLE_RATES:
+            # libopus rejects other rates, so snap to its native 48 kHz
+            object.__setattr__(self, "sample_rate", 48000)
+
+    @property
+    def extension(self) -> str:
+        """File extension including the dot"""
+        return AUDIO_CODECS[self.codec][2]
+
+    @property
+    def media_type(self) -> str:
+        """HTTP content type"""
+        return AUDIO_CODECS[self.codec][3]
+
+    def ffmpeg_args(self) -> list[str]:
+        """ffmpeg output arguments selecting container, codec and bitrate"""
+        encoder, container, _, _ = AUDIO_CODECS[self.codec]
+        args = ["-f", container, "-c:a", encoder, "-b:a", self.bitrate]
+        if self.channels:
+            args += ["-ac", str(self.channels)]
+        if self.sample_rate:
+            args += ["-ar", str(self.sample_rate)]
+        return args
+
+    def export_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for pydub's ``AudioSegment.export``"""
+        encoder, container, _, _ = AUDIO_CODECS[self.codec]
+        parameters = []
+        if self.channels:
+            parameters += ["-ac", str(self.channels)]
+        if self.sample_rate:
+            parameters += ["-ar", str(self.sample_rate)]
+        return {
+            "format": container,
+            "codec": encoder,
+            "bitrate": self.bitrate,
+            "parameters": parameters,
+        }
+
+
+AUDIO_PROFILES: dict[str, AudioFormat] = {
+    "voice": AudioFormat(name="voice", codec="opus", bitrate="32k", channels=1, sample_rate=24000),
+    "compact": AudioFormat(name="compact", codec="aac", bitrate="64k", sample_rate=44100),
+    "standard": AudioFormat(name="standard", codec="mp3", bitrate="128k"),
+    "high": AudioFormat(name="high", codec="mp3", bitrate="192k", channels=2, sample_rate=44100),
+}
+
+DEFAULT_AUDIO_PROFILE = "standard"
+
+# Media types by file extension, for serving exported files
+AUDIO_MEDIA_TYPES = {extension: media for _, _, extension, media in AUDIO_CODECS.values()}
+
+
+def get_audio_format(
+    profile: str | None = None,
+    codec: str | None = None,
+    bitrate: str | None = None,
+    channels: int | None = None,
+    sample_rate: int | None = None,
+) -> AudioFormat:
+    """
+    Look up an audio profile and apply per-request overrides
+
+    Args:
+        profile: Profile name (voice/compact/standard/high), defaults to standard
+        codec: Override codec (mp3/opus/aac)
+        bitrate: Override bitrate, e.g. "96k"
+        channels: Override channel count (1 or 2)
+        sample_rate: Override sample rate in Hz
+
+    Returns:
+        Effective audio format
+
+    Raises:
+        ValueError: If the profile or codec is not supported
+    """
+    profile = profile or DEFAULT_AUDIO_PROFILE
+    if profile not in AUDIO_PROFILES:
+        raise ValueError(
+            f"Unsupported audio profile: {profile}. Available: {list(AUDIO_PROFILES.keys())}"
+        )
+    overrides = {
+        key: value
+        for key, value in {
+            "codec": codec,
+            "bitrate": bitrate,
+            "channels": channels,
+            "sample_rate": sample_rate,
+        }.items()
+        if value is not None
+    }
+    audio_format = AUDIO_PROFILES[profile]
+    return replace(audio_format, **overrides) if overrides else audio_format
+
+
+def transcode(input_path: str, output_path: str, audio_format: AudioFormat) -> str:
+    """
+    Re-encode an audio file with ffmpeg
+
+    Args:
+        input_path: Source audio
+        output_path: Destination file
+        audio_format: Target encoding
+
+    Returns:
+        output_path
+
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    cmd = [
+        ffmpeg_binary(),
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-y",
+        "-i",
+        input_path,
+        "-vn",
+        *audio_format.ffmpeg_args(),
+        output_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg transcode failed: {result.stderr.decode(errors='replace')}")
+    return output_path
+
+
+def db_to_gain(db: float) -> float:
+    """Convert a decibel change to a linear amplitude factor"""
+    return float(10 ** (db / 20))
+
+
+def music_volume_to_gain(music_volume: float) -> float:
+    """Map the 0.0-1.0 music volume used by the generators to a linear gain"""
+    # Same curve as the previous pydub code: music - 20 * (1 - volume) dB
+    return db_to_gain(-20 * (1 - music_volume))
+
+
+def decode_pcm(path: str, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 1) -> np.ndarray:
+    """
+    Decode an audio file to int16 PCM
+
+    Args:
+        path: Audio file path (any format ffmpeg can read)
+        sample_rate: Target sample rate
+        channels: Target channel count
+
+    Returns:
+        Array of shape (frames, channels), dtype int16
+    """
+    segment = AudioSegment.from_file(path)
+    segment = (
+        segment.set_frame_rate(sample_rate).set_channels(channels).set_sample_width(SAMPLE_WIDTH)
+    )
+    return np.frombuffer(segment.raw_data, dtype=np.int16).reshape(-1, channels)
+
+
+def to_audio_segment(pcm: np.ndarray, sample_rate: int = DEFAULT_SAMPLE_RATE) -> AudioSegment:
+    """Wrap int16 PCM in a pydub AudioSegment for export"""
+    return AudioSegment(
+        data=np.ascontiguousarray(pcm, dtype=np.int16).tobytes(),
+        sample_width=SAMPLE_WIDTH,
+        frame_rate=sample_rate,
+        channels=pcm.shape[1],
+    )
+
+
+def add_looped(out: np.ndarray, bed: np.ndarray, gain: float = 1.0) -> None:
+    """
+    Add a bed to ``out`` in place, looping it to cover the whole buffer
+
+    Args:
+        out: int32 accumulation buffer of shape (frames, channels)
+        bed: int16 PCM of shape (frames, channels)
+        gain: Linear gain applied to the bed
+    """
+    if not len(bed):
+        return
+    # Scale one window at a time so a memory-mapped bed is never copied whole
+    position = 0
+    while position < len(out):
+        offset = position % len(bed)
+        frames = min(DEFAULT_CHUNK_FRAMES, len(bed) - offset, len(out) - position)
+        window = bed[offset : offset + frames]
+        if gain != 1.0:
+            window = (window * np.float32(gain)).astype(np.int32)
+        out[position : position + frames] += window
+        position += frames
+
+
+def assemble_pcm(
+    segments: list[np.ndarray],
+    gap_frames: int = 0,
+    bed: np.ndarray | None = None,
+    bed_gain: float = 1.0,
+) -> np.ndarray:
+    """
+    Concatenate segments with gaps and mix an optional looped bed in one pass
+
+    Args:
+        segments: int16 PCM arrays with identical channel counts
+        gap_frames: Silent frames inserted between consecutive segments
+        bed: Optional int16 PCM looped under the whole output
+        bed_gain: Linear gain applied to the bed
+
+    Returns:
+        int16 PCM of shape (frames, channels)
+    """
+    if not segments:
+        raise ValueError("No segments to assemble")
+
+    channels = segments[0].shape[1]
+    total = sum(len(s) for s in segments) + gap_frames * (len(segments) - 1)
+
+    # Accumulate in int32 so mixing cannot wrap before the final clip
+    out = np.zeros((total, channels), dtype=np.int32)
+    offset = 0
+    for segment in segments:
+        out[offset : offset + len(segment)] = segment
+        offset += len(segment) + gap_frames
+
+    if bed is not None:
+        add_looped(out, bed, bed_gain)
+
+    np.clip(out, -32768, 32767, out=out)
+    return out.astype(np.int16)
+
+
+class PCMReader:
+    """Read fixed-size int16 PCM chunks from any audio file through an ffmpeg pipe"""
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        channels: int = 2,
+        loop: bool = False,
+    ):
+        """
+        Start decoding
+
+        Args:
+            path: Audio file path
+            sample_rate: Output sample rate
+            channels: Output channel count
+            loop: Repeat the input forever (for music beds)
+        """
+        self.channels = channels
+        cmd = [ffmpeg_binary(), "-nostdin", "-loglevel", "error"]
+        if loop:
+            cmd += ["-stream_loop", "-1"]
+        cmd += ["-i", path, "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate), "-"]
+        self._process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+        )
+        self._stdout: IO[bytes] = self._process.stdout  # type: ignore[assignment]
+
+    def read_into(self, buffer: np.ndarray) -> int:
+        """
+        Fill ``buffer`` (frames, channels) int16 from the stream
+
+        Returns:
+            Number of frames read; less than requested only at end of stream
+        """
+        view = memoryview(buffer.reshape(-1).view(np.uint8))
+        filled = 0
+        while filled < len(view):
+            count = self._stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        return filled // (SAMPLE_WIDTH * self.channels)
+
+    def close(self) -> None:
+        """Stop the decoder"""
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._stdout.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class ArrayReader:
+    """Read chunks from in-memory or memory-mapped PCM with the PCMReader interface"""
+
+    def __init__(self, pcm: np.ndarray, loop: bool = False):
+        """
+        Initialize array reader
+
+        Args:
+            pcm: int16 PCM of shape (frames, channels), e.g. a PCMCache memmap
+            loop: Wrap around at the end instead of stopping
+        """
+        self.pcm = pcm
+        self.loop = loop
+        self._position = 0
+
+    def read_into(self, buffer: np.ndarray) -> int:
+        """Copy the next frames into ``buffer``; returns frames copied"""
+        total = len(self.pcm)
+        filled = 0
+        while filled < len(buffer) and total:
+            if self._position >= total:
+                if not self.loop:
+                    break
+                self._position = 0
+            count = min(len(buffer) - filled, total - self._position)
+            # Slicing a memmap is zero-copy; only the chunk copy touches pages
+            buffer[filled : filled + count] = self.pcm[self._position : self._position + count]
+            filled += count
+            self._position += count
+        return filled
+
+    def close(self) -> None:
+        """Nothing to release; the caller owns the array"""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class PCMCache:
+    """Decoded-audio cache of memory-mapped PCM, keyed by content hash and format"""
+
+    def __init__(self, cache_dir: str | Path = "outputs/audio_cache/pcm"):
+        """
+        Initialize PCM cache
+
+        Args:
+            cache_dir: Directory for raw PCM files
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> content hash, so unchanged files are not re-hashed
+        self._hashes: dict[tuple[str, int, int], str] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _content_hash(self, path: str) -> str:
+        """SHA-256 of the file contents, memoized per size/mtime"""
+        st = os.stat(path)
+        memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        cached = self._hashes.get(memo_key)
+        if cached:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+        self._hashes[memo_key] = content_hash
+        return content_hash
+
+    def path_for(self, path: str, sample_rate: int, channels: int) -> Path:
+        """Location of the decoded PCM for a source file and format"""
+        return self.cache_dir / f"{self._content_hash(path)}_{sample_rate}_{channels}.s16le"
+
+    def get(
+        self, path: str, sample_rate: int = DEFAULT_SAMPLE_RATE, channels: int = 2
+    ) -> np.ndarray:
+        """
+        Get decoded PCM for a file, decoding it only on first use
+
+        Args:
+            path: Source audio file
+            sample_rate: PCM sample rate
+            channels: PCM channel count
+
+        Returns:
+            Read-only int16 memmap of shape (frames, channels)
+        """
+        pcm_path = self.path_for(path, sample_rate, channels)
+        if pcm_path.exists():
+            self.stats["hits"] += 1
+        else:
+            with self._lock:
+                if not pcm_path.exists():
+                    self.stats["misses"] += 1
+                    self._decode_to(path, pcm_path, sample_rate, channels)
+
+        if pcm_path.stat().st_size == 0:
+            return np.zeros((0, channels), dtype=np.int16)
+        return np.memmap(pcm_path, dtype=np.int16, mode="r").reshape(-1, channels)
+
+    def _decode_to(self, path: str, pcm_path: Path, sample_rate: int, channels: int) -> None:
+        """Stream-decode a file to raw PCM on disk, published atomically"""
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            buffer = np.zeros((DEFAULT_CHUNK_FRAMES, channels), dtype=np.int16)
+            with os.fdopen(fd, "wb") as out, PCMReader(path, sample_rate, channels) as reader:
+                while True:
+                    got = reader.read_into(buffer)
+                    if not got:
+                        break
+                    out.write(memoryview(buffer[:got]).cast("B"))
+            os.replace(tmp_path, pcm_path)
+            logger.info(f"Cached decoded PCM for {path}: {pcm_path.name}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def clear(self) -> int:
+        """Delete all cached PCM files; returns number removed"""
+        count = 0
+        for pcm_file in self.cache_dir.glob("*.s16le"):
+            pcm_file.unlink(missing_ok=True)
+            count += 1
+        self._hashes.clear()
+        return count
+
+
+def stream_mix(
+    voice_path: str,
+    bed: str | np.ndarray,
+    output_path: str,
+    bed_gain: float = 1.0,
+    duration: float | None = None,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    channels: int = 2,
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+    encoder_args: list[str] | None = None,
+) -> str:
+    """
+    Mix a voice track over a looped bed with bounded memory
+
+    Args:
+        voice_path: Foreground audio
+        bed: Background audio path, or int16 PCM (e.g. from PCMCache), looped
+            to cover the output
+        output_path: Encoded output file; format follows the extension
+        bed_gain: Linear gain applied to the bed
+        duration: Output length in seconds; defaults to the voice length,
+            a longer duration pads the voice with silence
+        sample_rate: Mix sample rate
+        channels: Mix channel count
+        chunk_frames: Frames processed per chunk
+        encoder_args: Extra ffmpeg output arguments (codec, bitrate, ...)
+
+    Returns:
+        output_path
+
+    Raises:
+        RuntimeError: If the encoder fails
+    """
+    total_frames = round(duration * sample_rate) if duration is not None else None
+
+    cmd = [
+        ffmpeg_binary(),
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-y",
+        "-f",
+        "s16le",
+        "-ar",
+        str(sample_rate),
+        "-ac",
+        str(channels),
+        "-i",
+        "-",
+        *(encoder_args or []),
+        output_path,
+    ]
+    # Errors go to a file: a pipe nobody reads until the end could fill up
+    # and block the encoder
+    stderr_file = tempfile.TemporaryFile()
+    encoder = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr_file)
+    assert encoder.stdin is not None
+
+    # All per-chunk buffers are allocated once
+    voice_buf = np.zeros((chunk_frames, channels), dtype=np.int16)
+    bed_buf = np.zeros((chunk_frames, channels), dtype=np.int16)
+    acc = np.zeros((chunk_frames, channels), dtype=np.int32)
+    pcm_out = np.zeros((chunk_frames, channels), dtype=np.int16)
+    gain = np.float32(bed_gain)
+
+    written = 0
+    voice_done = False
+    try:
+        bed_reader = (
+            ArrayReader(bed, loop=True)
+            if isinstance(bed, np.ndarray)
+            else PCMReader(bed, sample_rate, channels, loop=True)
+        )
+        with PCMReader(voice_path, sample_rate, channels) as voice, bed_reader:
+            while True:
+                want = chunk_frames
+                if total_frames is not None:
+                    want = min(want, total_frames - written)
+                if want <= 0:
+                    break
+
+                got = 0 if voice_done else voice.read_into(voice_buf[:want])
+                if got < want:
+                    voice_done = True
+                    if total_frames is None:
+                        want = got
+                        if want == 0:
+                            break
+                    voice_buf[got:want] = 0
+
+                bed_got = bed_reader.read_into(bed_buf[:want])
+                bed_buf[bed_got:want] = 0
+
+                out = acc[:want]
+                np.multiply(bed_buf[:want], gain, out=out, casting="unsafe")
+                out += voice_buf[:want]
+                np.clip(out, -32768, 32767, out=out)
+                np.copyto(pcm_out[:want], out, casting="unsafe")
+                encoder.stdin.write(memoryview(pcm_out[:want]).cast("B"))
+                written += want
+    except BrokenPipeError:
+        # The encoder exited early; its error is reported below
+        pass
+    finally:
+        with contextlib.suppress(BrokenPipeError):
+            encoder.stdin.close()
+        encoder.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+        stderr_file.close()
+
+    if encoder.returncode != 0:
+        raise RuntimeError(f"ffmpeg encoder failed: {stderr.decode(errors='replace')[-500:]}")
+
+    logger.info(f"Streamed {written / sample_rate:.1f}s of mixed audio to {output_path}")
+    return output_path
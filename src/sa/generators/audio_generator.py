@@ -1,44 +1,154 @@
 """Text-to-Speech Audio Generator with caching, validation and progress tracking"""
 
 import hashlib
+import importlib.util
 import json
 import logging
 import os
-from collections.abc import Callable
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any
 
-try:
-    from elevenlabs import ElevenLabs
+import numpy as np
 
-    ELEVENLABS_AVAILABLE = True
-except ImportError:
-    ELEVENLABS_AVAILABLE = False
-    ElevenLabs = None  # type: ignore
+from sa.utils.clients import get_client
+from sa.utils.rate_limit import get_limiter
 
-from pydub import AudioSegment
+from .audio_engine import (
+    DEFAULT_SAMPLE_RATE,
+    AudioFormat,
+    PCMCache,
+    assemble_pcm,
+    decode_pcm,
+    get_audio_format,
+    music_volume_to_gain,
+    stream_mix,
+    to_audio_segment,
+    transcode,
+)
+from .voice_catalog import DEFAULT_VOICE_TTL, DEFAULT_VOICES, VoiceCatalog
+
+# Checked without importing; the SDK is loaded when the first client is built
+ELEVENLABS_AVAILABLE = importlib.util.find_spec("elevenlabs") is not None
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Long texts are split into chunks of at most this many characters and
+# synthesized in parallel; chunks are joined with a short pause
+MAX_CHUNK_CHARS = 800
+CHUNK_GAP_MS = 120
+
+# Sentence terminators (Latin and Arabic) and clause separators to split on
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?؟…۔])\s+|\n+")
+_CLAUSE_BREAK = re.compile(r"(?<=[,;:،؛])\s+")
+
+# Number of locks that concurrent identical fallback requests are striped over
+KEY_LOCK_STRIPES = 64
+
+# Bytes per read when replaying cached audio to a stream
+STREAM_CHUNK_SIZE = 16384
+
+# Maximum parallel TTS requests per provider when synthesizing scripts
+DEFAULT_CONCURRENCY = {
+    "elevenlabs": 4,
+    "gtts": 2,
+}
+
+
+def split_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list[str]:
+    """
+    Split text into chunks at sentence, then clause, then word boundaries
+
+    Adjacent pieces are packed greedily so chunks stay close to
+    ``max_chars`` without cutting through a sentence unless it alone is
+    longer than the limit.
+
+    Args:
+        text: Text to split
+        max_chars: Maximum characters per chunk
+
+    Returns:
+        Non-empty chunks in reading order
+    """
+
+    def pieces(fragment: str, breaks: list[re.Pattern[str] | None]) -> list[str]:
+        if len(fragment) <= max_chars:
+            return [fragment]
+        pattern, rest = breaks[0], breaks[1:]
+        parts = pattern.split(fragment) if pattern else fragment.split()
+        if len(parts) == 1:
+            # A single unbreakable word: hard-cut it
+            if not rest:
+                return [fragment[i : i + max_chars] for i in range(0, len(fragment), max_chars)]
+            return pieces(fragment, rest)
+        return [p for part in parts if part.strip() for p in pieces(part.strip(), rest or [None])]
+
+    chunks: list[str] = []
+    current = ""
+    for piece in pieces(text.strip(), [_SENTENCE_BREAK, _CLAUSE_BREAK, None]):
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
 
 class AudioGenerator:
     """Generate audio from text using text-to-speech with caching and validation"""
 
-    def __init__(self, api_key: str | None = None, cache_dir: str = "outputs/audio_cache"):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        cache_dir: str = "outputs/audio_cache",
+        concurrency: dict[str, int] | None = None,
+        segment_retries: int = 2,
+        retry_backoff: float = 0.5,
+        max_chunk_chars: int = MAX_CHUNK_CHARS,
+        chunk_gap_ms: int = CHUNK_GAP_MS,
+        voice_catalog_ttl: float = DEFAULT_VOICE_TTL,
+        audio_profile: str | None = None,
+    ):
         """
         Initialize the audio generator
 
         Args:
             api_key: ElevenLabs API key
             cache_dir: Directory for caching generated audio
+            concurrency: Per-provider limit of parallel segment requests
+            segment_retries: Extra attempts for a failed narration segment
+            retry_backoff: Base delay in seconds between segment retries
+            max_chunk_chars: Texts longer than this are split and synthesized in parallel
+            chunk_gap_ms: Pause inserted between chunks of a split text
+            voice_catalog_ttl: Seconds before the cached voice list is refreshed
+            audio_profile: Default encoding for mixed and narrated output
+                (voice/compact/standard/high)
         """
         self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
         self.client = None
-
-        if self.api_key and ELEVENLABS_AVAILABLE and ElevenLabs is not None:
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self.segment_retries = segment_retries
+        self.retry_backoff = retry_backoff
+        self.max_chunk_chars = max_chunk_chars
+        self.chunk_gap_ms = chunk_gap_ms
+        self.audio_format = get_audio_format(audio_profile)
+        self.limiter = get_limiter("elevenlabs", self.api_key)
+        self._lock = threading.Lock()
+        # Striped locks serializing identical requests without growing per key
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+
+        if self.api_key and ELEVENLABS_AVAILABLE:
             try:
-                self.client = ElevenLabs(api_key=self.api_key)
+                self.client = get_client("elevenlabs", self.api_key)
                 logger.info("ElevenLabs client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize ElevenLabs client: {e}")
@@ -49,6 +159,18 @@ class AudioGenerator:
         self._cache: dict[str, Any] = {}
         self._load_cache_index()
 
+        # Content-addressed narration segments, reused across script edits
+        self.segments_dir = self.cache_dir / "segments"
+        self.segments_dir.mkdir(exist_ok=True)
+
+        # Decoded music beds, memory-mapped so repeat mixes skip decoding
+        self.pcm_cache = PCMCache(self.cache_dir / "pcm")
+
+        # Voice names and IDs, refreshed in the background
+        self.voice_catalog = VoiceCatalog(
+            self._fetch_voices, self.cache_dir / "voices.json", ttl=voice_catalog_ttl
+        )
+
         # Statistics
         self.stats = {
             "generated": 0,
@@ -72,8 +194,13 @@ class AudioGenerator:
         """Save cache index to disk"""
         index_file = self.cache_dir / "cache_index.json"
         try:
-            with open(index_file, "w") as f:
-                json.dump(self._cache, f, indent=2)
+            # Segments are synthesized in parallel; serialize writers and
+            # replace the file atomically so readers never see half an index
+            with self._lock:
+                tmp_file = index_file.with_name(f"{index_file.name}.{threading.get_ident()}.tmp")
+                with open(tmp_file, "w") as f:
+                    json.dump(dict(self._cache), f, indent=2)
+                os.replace(tmp_file, index_file)
         except Exception as e:
             logger.warning(f"Failed to save cache index: {e}")
 
@@ -82,11 +209,26 @@ class AudioGenerator:
         key_data = f"{text}:{json.dumps(params, sort_keys=True)}"
         return hashlib.md5(key_data.encode()).hexdigest()
 
+    def speech_cache_path(
+        self, text: str, voice: str = "Adam", model: str = "eleven_multilingual_v2"
+    ) -> str:
+        """
+        Cache location for speech that is only synthesized to be re-encoded
+
+        Named by the same key generate_speech caches under, so the file is the
+        cache entry itself and is reused and cleared with the rest of the cache.
+        """
+        cache_key = self._get_cache_key(text, {"voice": voice, "model": model})
+        return str(self.cache_dir / f"{cache_key}.mp3")
+
     def clear_cache(self) -> int:
         """Clear all cached audio"""
         cleared = len(self._cache)
         self._cache.clear()
         self._save_cache_index()
+        for audio_file in [*self.segments_dir.glob("*.mp3"), *self.cache_dir.glob("*.mp3")]:
+            audio_file.unlink(missing_ok=True)
+        self.pcm_cache.clear()
         return cleared
 
     def get_cache_size(self) -> int:
@@ -95,7 +237,13 @@ class AudioGenerator:
 
     def get_statistics(self) -> dict[str, int]:
         """Get generation statistics"""
-        return self.stats.copy()
+        with self._lock:
+            return self.stats.copy()
+
+    def _count(self, stat: str) -> None:
+        """Increment a statistic; segments are synthesized on several threads"""
+        with self._lock:
+            self.stats[stat] += 1
 
     @staticmethod
     def validate_text(text: str) -> dict[str, Any]:
@@ -139,6 +287,7 @@ class AudioGenerator:
         output_path: str = "output.mp3",
         use_cache: bool = True,
         progress_callback: Callable[[str], None] | None = None,
+        language: str = "ar",
     ) -> str | None:
         """
         Generate speech from text with caching and validation
@@ -150,6 +299,7 @@ class AudioGenerator:
             output_path: Path to save the audio
             use_cache: Whether to use cached results
             progress_callback: Optional callback for progress updates
+            language: Language code for the gTTS fallback
 
         Returns:
             Path to generated audio file or None if failed
@@ -158,7 +308,7 @@ class AudioGenerator:
         validation = self.validate_text(text)
         if not validation["valid"]:
             logger.error(f"Invalid text: {validation['issues']}")
-            self.stats["failed"] += 1
+            self._count("failed")
             return None
 
         # Check cache
@@ -169,44 +319,38 @@ class AudioGenerator:
             cached_path = self._cache[cache_key]
             if os.path.exists(cached_path):
                 logger.info(f"Using cached audio for text: {text[:50]}...")
-                self.stats["cached"] += 1
+                self._count("cached")
                 if progress_callback:
                     progress_callback("Retrieved from cache")
                 cached_result: str | None = cached_path
                 return cached_result
 
+        if len(text) > self.max_chunk_chars:
+            return self._generate_chunked(
+                text, voice, model, output_path, cache_key, progress_callback, language
+            )
+
         if not self.client or not ELEVENLABS_AVAILABLE:
             logger.info("ElevenLabs not available, using fallback TTS")
             if progress_callback:
                 progress_callback("Using fallback TTS...")
-            return self._fallback_tts(text, output_path, progress_callback)
+            return self._fallback_tts(
+                text, output_path, progress_callback, language=language, use_cache=use_cache
+            )
 
         try:
             if progress_callback:
                 progress_callback("Generating speech with ElevenLabs...")
 
-            # Create output directory if needed
-            output_dir = Path(output_path).parent
-            output_dir.mkdir(parents=True, exist_ok=True)
-
-            # Use text_to_speech.convert instead of deprecated generate
-            audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=voice,
-                model_id=model,
-            )
+            # Throttled requests are retried by the limiter before falling back
+            self._elevenlabs_tts(text, voice, model, output_path)
 
-            # Save the audio
             if progress_callback:
                 progress_callback("Saving audio file...")
 
-            with open(output_path, "wb") as f:
-                for chunk in audio:
-                    f.write(chunk)
-
             self._cache[cache_key] = output_path
             self._save_cache_index()
-            self.stats["generated"] += 1
+            self._count("generated")
             logger.info(f"Speech generated successfully: {output_path}")
 
             if progress_callback:
@@ -218,82 +362,516 @@ class AudioGenerator:
             # Fallback to basic TTS if ElevenLabs fails
             if progress_callback:
                 progress_callback("Falling back to gTTS...")
-            return self._fallback_tts(text, output_path, progress_callback)
+            return self._fallback_tts(
+                text, output_path, progress_callback, language=language, use_cache=use_cache
+            )
+
+    def _elevenlabs_tts(self, text: str, voice: str, model: str, output_path: str) -> None:
+        """
+        Synthesize text with ElevenLabs into output_path
+
+        Raises:
+            Exception: Whatever the provider raised; callers decide on fallback
+        """
+        # Create output directory if needed
+        output_dir = Path(output_path).parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        voice_id = self.resolve_voice(voice)
+
+        def synthesize() -> None:
+            # Use text_to_speech.convert instead of deprecated generate;
+            # the request runs while the chunks are consumed
+            audio = self.client.text_to_speech.convert(
+                text=text,
+                voice_id=voice_id,
+                model_id=model,
+            )
+            with open(output_path, "wb") as f:
+                for chunk in audio:
+                    f.write(chunk)
+
+        self.limiter.call(synthesize)
 
     def _fallback_tts(
         self,
         text: str,
         output_path: str,
         progress_callback: Callable[[str], None] | None = None,
+        language: str = "ar",
+        use_cache: bool = True,
     ) -> str | None:
         """
         Fallback TTS using gTTS (free alternative)
 
+        Results are cached by provider, language and text, and concurrent
+        requests for the same text wait for a single gTTS call, so an
+        ElevenLabs outage does not turn into a burst of identical requests.
+
         Args:
             text: Text to convert
             output_path: Where to save audio
             progress_callback: Optional callback for progress updates
+            language: gTTS language code
+            use_cache: Whether to use and record cached results
 
         Returns:
             Path to audio file or None
         """
+        cache_key = self._get_cache_key(text, {"provider": "gtts", "lang": language})
+
+        with self._key_lock(cache_key):
+            cached_path = self._cache.get(cache_key)
+            if use_cache and cached_path and os.path.exists(cached_path):
+                logger.info(f"Using cached fallback audio for text: {text[:50]}...")
+                self._count("cached")
+                if progress_callback:
+                    progress_callback("Retrieved from cache")
+                return str(cached_path)
+
+            try:
+                from gtts import gTTS
+
+                if progress_callback:
+                    progress_callback("Using gTTS fallback...")
+
+                # Create output directory if needed
+                output_dir = Path(output_path).parent
+                output_dir.mkdir(parents=True, exist_ok=True)
+
+                tts = gTTS(text=text, lang=language, slow=False)
+                tts.save(output_path)
+
+                if use_cache:
+                    with self._lock:
+                        self._cache[cache_key] = output_path
+                    self._save_cache_index()
+                self._count("generated")
+                self._count("fallback_used")
+                logger.info(f"Fallback TTS generated: {output_path}")
+
+                if progress_callback:
+                    progress_callback("Fallback TTS complete")
+
+                return output_path
+            except Exception as e:
+                logger.error(f"Fallback TTS also failed: {e}")
+                self._count("failed")
+                if progress_callback:
+                    progress_callback(f"Error: {str(e)}")
+                return None
+
+    def _key_lock(self, cache_key: str) -> threading.Lock:
+        """Lock shared by concurrent requests for the same cache key"""
+        return self._key_locks[int(cache_key[:8], 16) % KEY_LOCK_STRIPES]
+
+    def stream_speech(
+        self,
+        text: str,
+        voice: str = "Adam",
+        model: str = "eleven_multilingual_v2",
+        use_cache: bool = True,
+        language: str = "ar",
+    ) -> Iterator[bytes] | None:
+        """
+        Stream speech audio as the provider produces it, teeing it into the cache
+
+        The first request for a text is relayed chunk by chunk while being
+        written to a temporary file, which is published to the cache only once
+        the stream completes. Later requests are replayed from disk.
+
+        Args:
+            text: Text to convert to speech
+            voice: Voice name to use
+            model: TTS model to use
+            use_cache: Whether to serve and store cached audio
+            language: Language code for the gTTS fallback
+
+        Returns:
+            Iterator of MP3 chunks, or None if the text is invalid
+        """
+        validation = self.validate_text(text)
+        if not validation["valid"]:
+            logger.error(f"Invalid text: {validation['issues']}")
+            self._count("failed")
+            return None
+
+        cache_key = self._get_cache_key(text, {"voice": voice, "model": model})
+        cached_path = self._cache.get(cache_key)
+        if use_cache and cached_path and os.path.exists(cached_path):
+            logger.info(f"Streaming cached audio for text: {text[:50]}...")
+            self._count("cached")
+            return self._replay_file(cached_path)
+
+        return self._tee_stream(text, voice, model, language, use_cache)
+
+    def _replay_file(self, path: str) -> Iterator[bytes]:
+        """Read a cached file back in stream-sized chunks"""
+        with open(path, "rb") as f:
+            while chunk := f.read(STREAM_CHUNK_SIZE):
+                yield chunk
+
+    def _provider_stream(
+        self, text: str, voice: str, model: str, language: str, use_cache: bool
+    ) -> Iterator[tuple[str, bytes]]:
+        """
+        Raw audio chunks tagged with their source
+
+        ElevenLabs is tried first; if it is unavailable or fails before
+        sending any audio, the cached gTTS rendition is replayed, or gTTS
+        is streamed live.
+        """
+        if self.client and ELEVENLABS_AVAILABLE:
+            started = False
+            try:
+                # The limiter slot is held for as long as the response streams
+                with self.limiter.slot():
+                    # convert() yields chunks as the HTTP response arrives
+                    for chunk in self.client.text_to_speech.convert(
+                        text=text, voice_id=self.resolve_voice(voice), model_id=model
+                    ):
+                        started = True
+                        yield "elevenlabs", chunk
+                if started:
+                    return
+            except Exception as e:
+                # Once audio has been sent the stream cannot switch provider
+                if started:
+                    raise
+                logger.error(f"Error streaming speech: {e}")
+
+        fallback_key = self._get_cache_key(text, {"provider": "gtts", "lang": language})
+        cached_path = self._cache.get(fallback_key)
+        if use_cache and cached_path and os.path.exists(cached_path):
+            logger.info(f"Streaming cached fallback audio for text: {text[:50]}...")
+            self._count("cached")
+            for chunk in self._replay_file(cached_path):
+                yield "cache", chunk
+            return
+
+        from gtts import gTTS
+
+        logger.info("Streaming with gTTS fallback")
+        self._count("fallback_used")
+        for chunk in gTTS(text=text, lang=language, slow=False).stream():
+            yield "gtts", chunk
+
+    def _tee_stream(
+        self, text: str, voice: str, model: str, language: str, use_cache: bool
+    ) -> Iterator[bytes]:
+        """Relay provider chunks to the caller while writing them to the cache"""
+        tmp_dir = self.cache_dir / "tmp"
+        tmp_dir.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".mp3", prefix="stream_", dir=tmp_dir)
+        source = None
+        completed = False
         try:
-            from gtts import gTTS
+            with os.fdopen(fd, "wb") as f:
+                for source, chunk in self._provider_stream(text, voice, model, language, use_cache):
+                    f.write(chunk)
+                    yield chunk
+            completed = True
+        except Exception as e:
+            # Re-raised so the response is aborted instead of ending cleanly
+            # on truncated audio
+            logger.error(f"Speech stream failed: {e}")
+            self._count("failed")
+            raise
+        finally:
+            # Abandoned or failed streams leave nothing behind in the cache;
+            # audio is keyed by the provider that actually produced it
+            params = {
+                "elevenlabs": {"voice": voice, "model": model},
+                "gtts": {"provider": "gtts", "lang": language},
+            }.get(source or "")
+            if completed and use_cache and params:
+                cache_key = self._get_cache_key(text, params)
+                final_path = self.cache_dir / f"{cache_key}.mp3"
+                os.replace(tmp_path, final_path)
+                with self._lock:
+                    self._cache[cache_key] = str(final_path)
+                self._save_cache_index()
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        if completed and source != "cache":
+            self._count("generated")
+            logger.info(f"Speech streamed: {text[:50]}...")
+
+    def _provider(self) -> str:
+        """Name of the provider that will serve the next request"""
+        return "elevenlabs" if self.client and ELEVENLABS_AVAILABLE else "gtts"
+
+    def _segment_path(
+        self, text: str, voice: str, model: str, provider: str, language: str = "ar"
+    ) -> Path:
+        """
+        Content-addressed location of a narration segment
 
-            if progress_callback:
-                progress_callback("Using gTTS fallback...")
+        Keyed by the engine that produced the audio, so a gTTS fallback is
+        never reused as the requested ElevenLabs voice.
+        """
+        if provider == "gtts":
+            params = {"provider": "gtts", "lang": language, "kind": "segment"}
+        else:
+            params = {"voice": voice, "model": model, "kind": "segment"}
+        key = self._get_cache_key(text, params)
+        return self.segments_dir / f"{key}.mp3"
+
+    def _synthesize_segment(
+        self, text: str, voice: str, model: str, scratch_dir: Path, language: str = "ar"
+    ) -> str | None:
+        """
+        Synthesize one narration segment, reusing a cached copy when available
 
-            # Create output directory if needed
-            output_dir = Path(output_path).parent
-            output_dir.mkdir(parents=True, exist_ok=True)
+        The provider itself is retried; gTTS only takes over once every
+        attempt has failed, so a transient error does not switch voices
+        in the middle of a narration.
 
-            tts = gTTS(text=text, lang="ar", slow=False)
-            tts.save(output_path)
+        Args:
+            text: Segment text
+            voice: Voice name
+            model: TTS model
+            scratch_dir: Job-private directory for in-progress files
+            language: Language code for the gTTS fallback
 
-            self.stats["generated"] += 1
-            self.stats["fallback_used"] += 1
-            logger.info(f"Fallback TTS generated: {output_path}")
+        Returns:
+            Path to the cached segment audio or None after all attempts failed
+        """
+        provider = self._provider()
+        segment_path = self._segment_path(text, voice, model, provider, language)
+        if segment_path.exists():
+            logger.info(f"Reusing cached segment: {text[:50]}...")
+            self._count("cached")
+            return str(segment_path)
+
+        temp_path = str(scratch_dir / segment_path.name)
+        for attempt in range(self.segment_retries + 1):
+            try:
+                if provider == "elevenlabs":
+                    self._elevenlabs_tts(text, voice, model, temp_path)
+                    self._count("generated")
+                elif not self._fallback_tts(text, temp_path, language=language, use_cache=False):
+                    raise RuntimeError("gTTS returned no audio")
+                # Atomic publish: concurrent jobs never read a partial segment
+                os.replace(temp_path, segment_path)
+                return str(segment_path)
+            except Exception as e:
+                if attempt < self.segment_retries:
+                    delay = self.retry_backoff * (2**attempt)
+                    logger.warning(f"Segment synthesis failed ({e}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                else:
+                    logger.warning(f"Segment synthesis failed after {attempt + 1} attempts: {e}")
+
+        if provider == "elevenlabs":
+            logger.warning(f"Using gTTS fallback voice for segment: {text[:50]}...")
+            result = self._fallback_tts(text, temp_path, language=language, use_cache=False)
+            if result:
+                # Stored as gTTS; the next job tries the provider again
+                fallback_path = self._segment_path(text, voice, model, "gtts", language)
+                os.replace(result, fallback_path)
+                return str(fallback_path)
+        return None
+
+    def _synthesize_parallel(
+        self,
+        jobs: list[tuple[int, str, str, str]],
+        scratch_dir: Path,
+        progress_callback: Callable[[str], None] | None = None,
+        language: str = "ar",
+    ) -> dict[int, str]:
+        """
+        Synthesize segments concurrently, bounded by the provider's concurrency
+
+        Args:
+            jobs: (index, text, voice, model) tuples
+            scratch_dir: Job-private directory for in-progress files
+            progress_callback: Optional callback for progress updates
+            language: Language code for the gTTS fallback
+
+        Returns:
+            Segment paths by index; failed segments are missing
+        """
+        provider = self._provider()
+        max_workers = max(1, min(self.concurrency.get(provider, 1), len(jobs) or 1))
+        if progress_callback:
+            progress_callback(
+                f"Generating {len(jobs)} segments ({max_workers} in parallel via {provider})..."
+            )
+
+        results: dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._synthesize_segment, text, voice, model, scratch_dir, language
+                ): i
+                for i, text, voice, model in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                result = future.result()
+                if result:
+                    results[i] = result
+                else:
+                    logger.warning(f"Segment {i} failed after retries")
+                if progress_callback:
+                    progress_callback(f"Generated segment {done}/{len(jobs)}")
+        return results
+
+    def _generate_chunked(
+        self,
+        text: str,
+        voice: str,
+        model: str,
+        output_path: str,
+        cache_key: str,
+        progress_callback: Callable[[str], None] | None = None,
+        language: str = "ar",
+    ) -> str | None:
+        """
+        Synthesize long text as parallel sentence-aligned chunks
+
+        Each chunk goes through the segment cache, so a long text that shares
+        sentences with an earlier one only re-synthesizes what changed.
+
+        Args:
+            text: Text longer than ``max_chunk_chars``
+            voice: Voice name
+            model: TTS model
+            output_path: Path to save the joined audio
+            cache_key: Cache key of the whole text
+            progress_callback: Optional callback for progress updates
+            language: Language code for the gTTS fallback
+
+        Returns:
+            Path to the audio file or None if any chunk failed
+        """
+        chunks = split_text(text, self.max_chunk_chars)
+        logger.info(f"Splitting {len(text)} characters into {len(chunks)} chunks")
+
+        scratch_root = self.cache_dir / "tmp"
+        scratch_root.mkdir(exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix="speech_", dir=scratch_root))
+        try:
+            jobs = [(i, chunk, voice, model) for i, chunk in enumerate(chunks)]
+            results = self._synthesize_parallel(jobs, temp_dir, progress_callback, language)
+            if len(results) != len(chunks):
+                # Unlike a script, a sentence missing from the middle is not acceptable
+                logger.error(f"{len(chunks) - len(results)} of {len(chunks)} chunks failed")
+                self._count("failed")
+                return None
 
             if progress_callback:
-                progress_callback("Fallback TTS complete")
+                progress_callback("Joining chunks...")
+            combined = assemble_pcm(
+                [decode_pcm(results[i], DEFAULT_SAMPLE_RATE, 1) for i in range(len(chunks))],
+                gap_frames=DEFAULT_SAMPLE_RATE * self.chunk_gap_ms // 1000,
+            )
 
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            # Same encoding the provider returns for unsplit text
+            to_audio_segment(combined, DEFAULT_SAMPLE_RATE).export(
+                output_path, **get_audio_format().export_kwargs()
+            )
+
+            with self._lock:
+                self._cache[cache_key] = output_path
+            self._save_cache_index()
+            self._count("generated")
+            logger.info(f"Speech generated from {len(chunks)} chunks: {output_path}")
+
+            if progress_callback:
+                progress_callback("Speech generation complete")
             return output_path
         except Exception as e:
-            logger.error(f"Fallback TTS also failed: {e}")
-            self.stats["failed"] += 1
+            logger.error(f"Error joining speech chunks: {e}")
+            self._count("failed")
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _fetch_voices(self) -> dict[str, str]:
+        """Fetch {name: voice_id} from ElevenLabs"""
+        if not self.client or not ELEVENLABS_AVAILABLE:
+            return {}
+        voices_list = self.limiter.call(self.client.voices.get_all)
+        voices = {voice.name: voice.voice_id for voice in voices_list.voices if voice.name}
+        logger.info(f"Retrieved {len(voices)} voices from ElevenLabs")
+        return voices
 
     def get_available_voices(self) -> list[str]:
         """
         Get list of available voices
 
+        Served from the voice catalog; a stale catalog is refreshed in the
+        background instead of blocking the caller.
+
         Returns:
             List of voice names
         """
-        default_voices = ["Adam", "Bella", "Antoni", "Rachel", "Domi"]
-
         if not self.client or not ELEVENLABS_AVAILABLE:
             logger.info("Using default voice list (ElevenLabs not available)")
-            return default_voices
+            return list(DEFAULT_VOICES)
+
+        return self.voice_catalog.names()
+
+    def resolve_voice(self, voice: str) -> str:
+        """
+        Map a voice display name to its ElevenLabs voice ID
+
+        Args:
+            voice: Voice name (case-insensitive) or ID
+
+        Returns:
+            Voice ID, or ``voice`` unchanged if it is not a known name
+        """
+        return self.voice_catalog.resolve(voice)
+
+    def convert_audio(
+        self,
+        input_path: str,
+        output_path: str,
+        audio_format: AudioFormat | None = None,
+    ) -> str | None:
+        """
+        Re-encode audio into a compact output format
+
+        Args:
+            input_path: Source audio file
+            output_path: Destination file (extension should match the format)
+            audio_format: Target encoding, defaults to the generator's profile
 
+        Returns:
+            Path to the converted file or None if failed
+        """
+        if not os.path.exists(input_path):
+            logger.error(f"Audio file not found: {input_path}")
+            self._count("failed")
+            return None
+
+        audio_format = audio_format or self.audio_format
         try:
-            voices_list = self.client.voices.get_all()
-            voices = [voice.name for voice in voices_list.voices if voice.name]
-            logger.info(f"Retrieved {len(voices)} voices from ElevenLabs")
-            return voices if voices else default_voices
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            transcode(input_path, output_path, audio_format)
+            logger.info(
+                f"Audio converted to {audio_format.codec} {audio_format.bitrate}: {output_path}"
+            )
+            return output_path
         except Exception as e:
-            logger.error(f"Error fetching voices: {e}")
-            return default_voices
+            logger.error(f"Error converting audio: {e}")
+            self._count("failed")
+            return None
 
     def add_background_music(
         self,
         voice_path: str,
         music_path: str,
-        output_path: str = "mixed_audio.mp3",
+        output_path: str | None = None,
         music_volume: float = 0.3,
         progress_callback: Callable[[str], None] | None = None,
+        audio_format: AudioFormat | None = None,
     ) -> str | None:
         """
         Mix voice audio with background music with validation
@@ -301,9 +879,11 @@ class AudioGenerator:
         Args:
             voice_path: Path to voice audio
             music_path: Path to background music
-            output_path: Path to save mixed audio
+            output_path: Path to save mixed audio; the extension is set to match
+                the output encoding (default "mixed_audio" plus that extension)
             music_volume: Volume level for music (0.0 to 1.0)
             progress_callback: Optional callback for progress updates
+            audio_format: Output encoding, defaults to the generator's profile
 
         Returns:
             Path to mixed audio or None if failed
@@ -311,58 +891,41 @@ class AudioGenerator:
         # Validate inputs
         if not os.path.exists(voice_path):
             logger.error(f"Voice file not found: {voice_path}")
-            self.stats["failed"] += 1
+            self._count("failed")
             return None
 
         if not os.path.exists(music_path):
             logger.error(f"Music file not found: {music_path}")
-            self.stats["failed"] += 1
+            self._count("failed")
             return None
 
         if not 0.0 <= music_volume <= 1.0:
             logger.error(f"Invalid music volume: {music_volume}")
-            self.stats["failed"] += 1
+            self._count("failed")
             return None
 
-        try:
-            if progress_callback:
-                progress_callback("Loading audio files...")
-
-            voice = AudioSegment.from_file(voice_path)
-            music = AudioSegment.from_file(music_path)
-
-            if progress_callback:
-                progress_callback("Adjusting music volume...")
-
-            # Adjust music volume
-            music = music - (20 * (1 - music_volume))  # Convert to dB
-
-            # Loop music to match voice length
-            if progress_callback:
-                progress_callback("Syncing audio lengths...")
-
-            if len(music) < len(voice):
-                times = (len(voice) // len(music)) + 1
-                music = music * times
-
-            music = music[: len(voice)]
-
-            # Mix audio
-            if progress_callback:
-                progress_callback("Mixing audio tracks...")
-
-            mixed = voice.overlay(music)
+        audio_format = audio_format or self.audio_format
+        output_path = str(Path(output_path or "mixed_audio").with_suffix(audio_format.extension))
 
+        try:
             # Create output directory if needed
             output_dir = Path(output_path).parent
             output_dir.mkdir(parents=True, exist_ok=True)
 
+            # Stream fixed-size chunks through decode -> mix -> encode so
+            # memory stays bounded however long the voice track is
             if progress_callback:
-                progress_callback("Exporting mixed audio...")
+                progress_callback("Mixing audio tracks...")
 
-            mixed.export(output_path, format="mp3")
+            stream_mix(
+                voice_path,
+                self.pcm_cache.get(music_path),
+                output_path,
+                bed_gain=music_volume_to_gain(music_volume),
+                encoder_args=audio_format.ffmpeg_args(),
+            )
 
-            self.stats["generated"] += 1
+            self._count("generated")
             logger.info(f"Audio mixed successfully: {output_path}")
 
             if progress_callback:
@@ -371,7 +934,7 @@ class AudioGenerator:
             return output_path
         except Exception as e:
             logger.error(f"Error mixing audio: {e}")
-            self.stats["failed"] += 1
+            self._count("failed")
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
@@ -380,15 +943,31 @@ class AudioGenerator:
         self,
         script_segments: list[dict[str, str]],
         output_path: str = "narration.mp3",
+        model: str = "eleven_multilingual_v2",
+        gap_ms: int = 0,
+        background_music: str | None = None,
+        music_volume: float = 0.3,
         progress_callback: Callable[[str], None] | None = None,
+        audio_format: AudioFormat | None = None,
+        language: str = "ar",
     ) -> str | None:
         """
         Generate narration from multiple script segments with validation
 
+        Unchanged segments (same text, voice and model) are served from the
+        segment cache, so editing one line of a script only re-synthesizes
+        that line.
+
         Args:
-            script_segments: List of dicts with 'text' and optional 'voice'
+            script_segments: List of dicts with 'text' and optional 'voice'/'model'
             output_path: Path to save the complete narration
+            model: Default TTS model for segments without their own
+            gap_ms: Silence inserted between segments in milliseconds
+            background_music: Optional music file looped under the narration
+            music_volume: Volume level for background music (0.0 to 1.0)
             progress_callback: Optional callback for progress updates
+            audio_format: Output encoding, defaults to the generator's profile
+            language: Language code for the gTTS fallback
 
         Returns:
             Path to narration file or None if failed
@@ -396,14 +975,16 @@ class AudioGenerator:
         # Validate inputs
         if not script_segments:
             logger.error("No script segments provided")
-            self.stats["failed"] += 1
+            self._count("failed")
             return None
 
-        try:
-            segments: list[AudioSegment] = []
-            temp_dir = Path("temp_narration")
-            temp_dir.mkdir(exist_ok=True)
+        # Private scratch space so concurrent jobs never share temp files
+        scratch_root = self.cache_dir / "tmp"
+        scratch_root.mkdir(exist_ok=True)
+        temp_dir = Path(tempfile.mkdtemp(prefix="narration_", dir=scratch_root))
 
+        try:
+            jobs: list[tuple[int, str, str, str]] = []
             for i, segment in enumerate(script_segments):
                 text = segment.get("text", "")
                 voice = segment.get("voice", "Adam")
@@ -412,28 +993,35 @@ class AudioGenerator:
                     logger.warning(f"Skipping empty segment {i}")
                     continue
 
-                if progress_callback:
-                    progress_callback(f"Generating segment {i+1}/{len(script_segments)}...")
-
-                temp_path = str(temp_dir / f"segment_{i}.mp3")
-                result = self.generate_speech(text, voice, output_path=temp_path, use_cache=False)
+                jobs.append((i, text, voice, segment.get("model", model)))
 
-                if result and os.path.exists(result):
-                    audio_segment = AudioSegment.from_file(result)
-                    segments.append(audio_segment)
+            results = self._synthesize_parallel(jobs, temp_dir, progress_callback, language)
 
-            if not segments:
+            if not results:
                 logger.error("No valid segments generated")
-                self.stats["failed"] += 1
+                self._count("failed")
                 return None
 
-            # Combine all segments
+            # Assemble in script order regardless of completion order, writing
+            # segments, gaps and the music bed into one preallocated buffer
             if progress_callback:
                 progress_callback("Combining segments...")
 
-            combined = segments[0]
-            for segment in segments[1:]:
-                combined = combined + segment
+            channels = 2 if background_music else 1
+            segments: list[np.ndarray] = [
+                decode_pcm(results[i], DEFAULT_SAMPLE_RATE, channels) for i in sorted(results)
+            ]
+            bed = (
+                self.pcm_cache.get(background_music, DEFAULT_SAMPLE_RATE, channels)
+                if background_music
+                else None
+            )
+            combined = assemble_pcm(
+                segments,
+                gap_frames=DEFAULT_SAMPLE_RATE * gap_ms // 1000,
+                bed=bed,
+                bed_gain=music_volume_to_gain(music_volume),
+            )
 
             # Create output directory if needed
             output_dir = Path(output_path).parent
@@ -442,15 +1030,11 @@ class AudioGenerator:
             if progress_callback:
                 progress_callback("Exporting narration...")
 
-            combined.export(output_path, format="mp3")
-
-            # Clean up temp directory
-            import shutil
-
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
+            to_audio_segment(combined, DEFAULT_SAMPLE_RATE).export(
+                output_path, **(audio_format or self.audio_format).export_kwargs()
+            )
 
-            self.stats["generated"] += 1
+            self._count("generated")
             logger.info(f"Narration created successfully: {output_path}")
 
             if progress_callback:
@@ -459,7 +1043,9 @@ class AudioGenerator:
             return output_path
         except Exception as e:
             logger.error(f"Error creating narration: {e}")
-            self.stats["failed"] += 1
+            self._count("failed")
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
@@ -4,14 +4,21 @@ import hashlib
 import json
 import logging
 import os
+import tempfile
 from collections.abc import Callable
-from io import BytesIO
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any
 
-import requests
 from PIL import Image
 
+from sa.utils.downloads import Downloader
+from sa.utils.downloads import downloader as shared_downloader
+from sa.utils.rate_limit import get_limiter
+
+from .predictions import PredictionEngine, completed_future, then
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -25,22 +32,190 @@ except ImportError:
     REPLICATE_AVAILABLE = False
     logger.warning("Replicate not available")
 
+# AVIF needs Pillow >= 11.3 or the pillow-avif-plugin package
+try:
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+Image.init()
+AVIF_AVAILABLE = "AVIF" in Image.SAVE
+
+# Refuse downloads larger than this (bytes)
+MAX_DOWNLOAD_BYTES = 50 * 1024 * 1024
+
+# Images fetched at once by batch_download
+BATCH_DOWNLOAD_WORKERS = 4
+
+# File extension for each PIL format we accept from providers
+IMAGE_EXTENSIONS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "WEBP": ".webp",
+    "GIF": ".gif",
+    "AVIF": ".avif",
+}
+
+# Content types for serving images by extension
+IMAGE_MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".gif": "image/gif",
+    ".avif": "image/avif",
+}
+
+# Output formats images can be re-encoded to
+IMAGE_FORMATS = ("webp", "avif", "jpeg", "png")
+
+# Image.info keys holding metadata that strip_metadata removes
+METADATA_KEYS = ("exif", "icc_profile", "xmp")
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """How downloaded images are stored"""
+
+    name: str
+    image_format: str | None = None  # None keeps the bytes the provider served
+    quality: int = 80
+    lossless: bool = False
+    strip_metadata: bool = True
+
+    def __post_init__(self) -> None:
+        if self.image_format is not None and self.image_format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unsupported image format: {self.image_format}. Available: {list(IMAGE_FORMATS)}"
+            )
+
+    @property
+    def pil_format(self) -> str | None:
+        """PIL format name, or None for passthrough"""
+        return self.image_format.upper() if self.image_format else None
+
+    def needs_encoding(self, source_format: str | None, has_metadata: bool) -> bool:
+        """
+        Whether a downloaded file must be re-encoded to match this encoding
+
+        Lossy targets are always re-encoded so their quality applies, even
+        when the provider already served that format.
+        """
+        if not self.pil_format:
+            return False
+        if self.pil_format != source_format or not self.lossless:
+            return True
+        return self.strip_metadata and has_metadata
+
+    def save_kwargs(self, img: Image.Image) -> dict[str, Any]:
+        """Keyword arguments for ``Image.save`` in this encoding"""
+        kwargs: dict[str, Any] = {"format": self.pil_format}
+        if self.image_format == "webp":
+            kwargs.update(quality=self.quality, lossless=self.lossless, method=4)
+        elif self.image_format == "avif":
+            kwargs.update(quality=100 if self.lossless else self.quality, speed=6)
+        elif self.image_format == "jpeg":
+            kwargs.update(quality=self.quality, optimize=True, progressive=True)
+        elif self.image_format == "png":
+            kwargs.update(optimize=True)
+
+        if not self.strip_metadata:
+            for key in ("exif", "icc_profile"):
+                if img.info.get(key):
+                    kwargs[key] = img.info[key]
+        return kwargs
+
+
+IMAGE_PROFILES: dict[str, ImageEncoding] = {
+    "original": ImageEncoding(name="original"),
+    "lossless": ImageEncoding(name="lossless", image_format="webp", lossless=True),
+    "high": ImageEncoding(name="high", image_format="webp", quality=90),
+    "standard": ImageEncoding(name="standard", image_format="webp", quality=80),
+    "compact": ImageEncoding(name="compact", image_format="webp", quality=60),
+}
+
+DEFAULT_IMAGE_PROFILE = "standard"
+
+
+def get_image_encoding(
+    profile: str | None = None,
+    image_format: str | None = None,
+    quality: int | None = None,
+    lossless: bool | None = None,
+    strip_metadata: bool | None = None,
+) -> ImageEncoding:
+    """
+    Look up an image profile and apply per-request overrides
+
+    Args:
+        profile: Profile name (original/lossless/high/standard/compact)
+        image_format: Override format (webp/avif/jpeg/png)
+        quality: Override quality (1-100)
+        lossless: Override lossless encoding (WebP/AVIF)
+        strip_metadata: Override whether EXIF/ICC metadata is dropped
+
+    Returns:
+        Effective image encoding
+
+    Raises:
+        ValueError: If the profile or format is not supported
+    """
+    profile = profile or DEFAULT_IMAGE_PROFILE
+    if profile not in IMAGE_PROFILES:
+        raise ValueError(
+            f"Unsupported image profile: {profile}. Available: {list(IMAGE_PROFILES.keys())}"
+        )
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format == "avif" and not AVIF_AVAILABLE:
+        logger.warning("AVIF encoder not available, using WebP instead")
+        image_format = "webp"
+
+    overrides = {
+        key: value
+        for key, value in {
+            "image_format": image_format,
+            "quality": quality,
+            "lossless": lossless,
+            "strip_metadata": strip_metadata,
+        }.items()
+        if value is not None
+    }
+    encoding = IMAGE_PROFILES[profile]
+    return replace(encoding, **overrides) if overrides else encoding
+
 
 class ImageGenerator:
     """Generate images from text prompts using AI models with caching and validation"""
 
-    def __init__(self, api_key: str | None = None, cache_dir: str = "outputs/image_cache"):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        cache_dir: str = "outputs/image_cache",
+        image_profile: str | None = None,
+        prediction_engine: PredictionEngine | None = None,
+        downloader: Downloader | None = None,
+    ):
         """
         Initialize the image generator
 
         Args:
             api_key: API key for Replicate (optional, uses env var if not provided)
             cache_dir: Directory for caching generated images
+            image_profile: Default storage encoding for downloaded images
+            prediction_engine: Resolves predictions without blocking a thread;
+                without one the Replicate SDK is called synchronously
+            downloader: Retries and hedges image downloads (defaults to the shared one)
         """
         self.api_key = api_key or os.getenv("REPLICATE_API_TOKEN")
         if self.api_key:
             os.environ["REPLICATE_API_TOKEN"] = self.api_key
 
+        self.prediction_engine = prediction_engine
+        self.limiter = get_limiter("replicate", self.api_key)
+
+        self.encoding = get_image_encoding(image_profile)
+        self.downloader = downloader or shared_downloader
+
         # Initialize cache
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -192,25 +367,68 @@ class ImageGenerator:
         Returns:
             List of image URLs
         """
+        return self.submit(
+            prompt,
+            negative_prompt=negative_prompt,
+            width=width,
+            height=height,
+            num_outputs=num_outputs,
+            model=model,
+            use_cache=use_cache,
+            progress_callback=progress_callback,
+        ).result()
+
+    def submit(
+        self,
+        prompt: str,
+        negative_prompt: str = "",
+        width: int = 1024,
+        height: int = 1024,
+        num_outputs: int = 1,
+        model: str = "black-forest-labs/flux-schnell",
+        use_cache: bool = True,
+        progress_callback: Callable[[str], None] | None = None,
+    ) -> Future:
+        """
+        Start image generation without waiting for the prediction
+
+        Validation and cache lookups happen immediately. With a prediction
+        engine the returned future resolves once Replicate finishes, and no
+        thread waits in the meantime; otherwise the SDK call runs here and
+        the future is already resolved.
+
+        Args:
+            prompt: Text description of the image to generate
+            negative_prompt: Things to avoid in the image
+            width: Image width
+            height: Image height
+            num_outputs: Number of images to generate
+            model: AI model to use
+            use_cache: Whether to use cached results
+            progress_callback: Optional callback for progress updates
+
+        Returns:
+            Future resolving to the list of image URLs (empty on failure)
+        """
         # Validate prompt
         validation = self.validate_prompt(prompt, negative_prompt)
         if not validation["valid"]:
             logger.error(f"Invalid prompt: {validation['issues']}")
             self.stats["failed"] += 1
-            return []
+            return completed_future([])
 
         # Validate dimensions
         dim_validation = self.validate_dimensions(width, height)
         if not dim_validation["valid"]:
             logger.error(f"Invalid dimensions: {dim_validation['issues']}")
             self.stats["failed"] += 1
-            return []
+            return completed_future([])
 
         # Validate num_outputs
         if num_outputs < 1 or num_outputs > 10:
             logger.error(f"Invalid num_outputs: {num_outputs} (must be 1-10)")
             self.stats["failed"] += 1
-            return []
+            return completed_future([])
 
         # Check cache
         params = {
@@ -228,28 +446,14 @@ class ImageGenerator:
             if progress_callback:
                 progress_callback("Retrieved from cache")
             cached_result: list[str] = self._cache[cache_key]  # type: ignore
-            return cached_result
+            return completed_future(cached_result)
 
-        if not REPLICATE_AVAILABLE:
+        if self.prediction_engine is None and not REPLICATE_AVAILABLE:
             logger.error("Replicate API not available")
             self.stats["failed"] += 1
-            return []
-
-        try:
-            if progress_callback:
-                progress_callback(f"Generating {num_outputs} image(s)...")
-
-            output = replicate.run(
-                model,
-                input={
-                    "prompt": prompt,
-                    "negative_prompt": negative_prompt,
-                    "width": width,
-                    "height": height,
-                    "num_outputs": num_outputs,
-                },
-            )
+            return completed_future([])
 
+        def finish(output: Any) -> list[str]:
             # Handle output safely
             result: list[str] = []
             if isinstance(output, list | tuple):
@@ -271,13 +475,35 @@ class ImageGenerator:
                 logger.error("No output from image generation")
 
             return result
-        except Exception as e:
+
+        def fail(e: BaseException) -> list[str]:
             logger.error(f"Error generating image: {e}")
             self.stats["failed"] += 1
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return []
 
+        if progress_callback:
+            progress_callback(f"Generating {num_outputs} image(s)...")
+
+        prediction_input = {
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "width": width,
+            "height": height,
+            "num_outputs": num_outputs,
+        }
+
+        if self.prediction_engine is not None:
+            prediction = self.prediction_engine.submit(model, prediction_input)
+            return then(prediction, lambda p: finish(p.get("output")), fail)
+
+        try:
+            output = self.limiter.call(replicate.run, model, input=prediction_input)
+            return completed_future(finish(output))
+        except Exception as e:
+            return completed_future(fail(e))
+
     def enhance_prompt(self, prompt: str) -> str:
         """
         Enhance user prompt with better descriptions for AI generation
@@ -303,14 +529,26 @@ class ImageGenerator:
         url: str,
         save_path: str,
         progress_callback: Callable[[str], None] | None = None,
+        image_format: str | None = None,
+        encoding: ImageEncoding | None = None,
     ) -> str | None:
         """
         Download image from URL with validation
 
+        The response is streamed to a temporary file next to ``save_path`` and
+        atomically renamed into place. Transient failures are retried, cut-off
+        transfers resumed and slow responses hedged by the downloader. Only the
+        image header is parsed to validate it; the bytes are re-encoded only
+        when ``ImageEncoding.needs_encoding`` says the target requires it. The
+        extension of the saved file always matches its real format, so the
+        returned path may differ from ``save_path``.
+
         Args:
             url: Image URL
             save_path: Path to save the image
             progress_callback: Optional callback for progress updates
+            image_format: Target format (webp/avif/jpeg/png) at default settings
+            encoding: Full target encoding; defaults to the generator's profile
 
         Returns:
             Path to saved image or None if failed
@@ -327,36 +565,81 @@ class ImageGenerator:
             self.stats["failed"] += 1
             return None
 
+        tmp_path = None
         try:
             if progress_callback:
                 progress_callback(f"Downloading image from {url[:50]}...")
 
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-
-            if progress_callback:
-                progress_callback("Processing image...")
-
-            img = Image.open(BytesIO(response.content))
-
             # Create directory if needed
             save_dir = Path(save_path).parent
             save_dir.mkdir(parents=True, exist_ok=True)
 
-            img.save(save_path)
+            fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=save_dir)
+            with os.fdopen(fd, "wb") as f:
+                self.downloader.fetch(url, f, max_bytes=MAX_DOWNLOAD_BYTES)
+
+            if progress_callback:
+                progress_callback("Validating image...")
+
+            # Image.open only parses the header; pixels are never decoded here
+            with Image.open(tmp_path) as img:
+                source_format = img.format
+                has_metadata = any(img.info.get(key) for key in METADATA_KEYS)
+
+            if encoding is None:
+                encoding = (
+                    get_image_encoding(self.encoding.name, image_format=image_format.lower())
+                    if image_format
+                    else self.encoding
+                )
+
+            final_path = Path(save_path)
+            if encoding.needs_encoding(source_format, has_metadata):
+                if progress_callback:
+                    progress_callback(f"Encoding {source_format} as {encoding.pil_format}...")
+                final_path = self._encode_image(tmp_path, final_path, encoding)
+            else:
+                extension = IMAGE_EXTENSIONS.get(source_format)  # type: ignore[arg-type]
+                if extension and final_path.suffix.lower() not in (
+                    extension,
+                    ".jpeg" if extension == ".jpg" else extension,
+                ):
+                    final_path = final_path.with_suffix(extension)
+
+            os.replace(tmp_path, final_path)
+            tmp_path = None
             self.stats["downloaded"] += 1
-            logger.info(f"Image downloaded successfully: {save_path}")
+            logger.info(f"Image downloaded successfully: {final_path}")
 
             if progress_callback:
                 progress_callback("Download complete")
 
-            return save_path
+            return str(final_path)
         except Exception as e:
             logger.error(f"Error downloading image: {e}")
             self.stats["failed"] += 1
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _encode_image(tmp_path: str, final_path: Path, encoding: ImageEncoding) -> Path:
+        """
+        Re-encode a downloaded file in place
+
+        Returns:
+            Destination path with the extension of the new format
+        """
+        with Image.open(tmp_path) as img:
+            img.load()
+            kwargs = encoding.save_kwargs(img)
+            if encoding.image_format == "jpeg" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(tmp_path, **kwargs)
+        return final_path.with_suffix(IMAGE_EXTENSIONS[encoding.pil_format or ""])
 
     def get_suggestions(self, base_prompt: str, max_suggestions: int = 6) -> list[str]:
         """
@@ -411,20 +694,20 @@ class ImageGenerator:
             logger.warning("No URLs provided for batch download")
             return []
 
-        saved_paths = []
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
 
-        for i, url in enumerate(urls, 1):
+        def download(i: int, url: str) -> str | None:
             if progress_callback:
                 progress_callback(f"Downloading image {i}/{len(urls)}...")
 
             filename = f"image_{i}_{hashlib.md5(url.encode()).hexdigest()[:8]}.png"
-            save_path = str(output_path / filename)
+            return self.download_image(url, str(output_path / filename))
 
-            result = self.download_image(url, save_path)
-            if result:
-                saved_paths.append(result)
+        # One slow image no longer holds up the rest; results keep the input order
+        with ThreadPoolExecutor(max_workers=min(BATCH_DOWNLOAD_WORKERS, len(urls))) as pool:
+            results = list(pool.map(download, range(1, len(urls) + 1), urls))
+        saved_paths = [result for result in results if result]
 
         logger.info(f"Batch download complete: {len(saved_paths)}/{len(urls)} successful")
         if progress_callback:
@@ -0,0 +1,496 @@
+"""Non-blocking Replicate predictions with batched polling and webhooks
+
+``replicate.run`` holds a thread for the whole prediction, which for
+video models means minutes. ``PredictionEngine`` instead creates the
+prediction over HTTP and hands back a ``concurrent.futures.Future``.
+All in-flight predictions are tracked by a single event loop running in
+one background thread, which resolves them from webhook deliveries or,
+as a fallback, by polling. Polls back off per prediction and, when many
+are in flight, one listing request refreshes a whole page of them.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from sa.utils.rate_limit import AdaptiveLimiter, get_limiter, status_of
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REPLICATE_API_URL = "https://api.replicate.com/v1"
+
+# Prediction states after which Replicate makes no further changes
+TERMINAL_STATES = ("succeeded", "failed", "canceled")
+
+# Seconds before the first poll, and the cap reached by backing off
+POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 15.0
+POLL_BACKOFF = 1.5
+
+# With webhooks configured, polling is only a safety net for lost deliveries
+WEBHOOK_POLL_INTERVAL = 30.0
+
+# With at least this many predictions in flight, refresh them with list requests
+LIST_POLL_THRESHOLD = 8
+
+# Connections kept open to the API; request concurrency is set by the rate limiters
+MAX_CONCURRENT_POLLS = 32
+
+# Seconds before an unfinished prediction is canceled
+PREDICTION_TIMEOUT = 30 * 60
+
+# Maximum age in seconds of a signed webhook delivery
+WEBHOOK_TOLERANCE = 5 * 60
+
+
+class PredictionError(RuntimeError):
+    """A prediction failed, was canceled or timed out"""
+
+
+def completed_future(value: Any) -> Future:
+    """Future that is already resolved with a value"""
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def then(
+    future: Future,
+    on_result: Callable[[Any], Any],
+    on_error: Callable[[BaseException], Any],
+) -> Future:
+    """
+    Chain a callback onto a future without blocking
+
+    Args:
+        future: Source future
+        on_result: Maps the source result to the new result
+        on_error: Maps a source exception to the new result
+
+    Returns:
+        Future resolved with whichever callback ran
+    """
+    chained: Future = Future()
+
+    def forward(source: Future) -> None:
+        try:
+            error = source.exception()
+            chained.set_result(on_error(error) if error else on_result(source.result()))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(forward)
+    return chained
+
+
+def _settle(future: Future, result: Any = None, error: BaseException | None = None) -> None:
+    """Resolve a future unless the caller already canceled it"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+@dataclass
+class _Tracked:
+    """An in-flight prediction and its poll schedule"""
+
+    prediction_id: str
+    future: Future
+    interval: float
+    next_poll: float
+    deadline: float
+    prediction: dict[str, Any] = field(default_factory=dict)
+
+
+class PredictionEngine:
+    """Create Replicate predictions and resolve them without a thread per prediction"""
+
+    def __init__(
+        self,
+        api_token: str | None = None,
+        base_url: str = REPLICATE_API_URL,
+        webhook_url: str | None = None,
+        webhook_secret: str | None = None,
+        poll_interval: float = POLL_INTERVAL,
+        max_poll_interval: float = MAX_POLL_INTERVAL,
+        timeout: float = PREDICTION_TIMEOUT,
+        max_concurrent_polls: int = MAX_CONCURRENT_POLLS,
+        transport: httpx.AsyncBaseTransport | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        read_limiter: AdaptiveLimiter | None = None,
+    ):
+        """
+        Initialize prediction engine
+
+        Args:
+            api_token: Replicate API token
+            base_url: Replicate API base URL (a local fake server in tests)
+            webhook_url: Public URL of our webhook receiver; enables push completion
+                (ignored without webhook_secret, since deliveries can't be verified)
+            webhook_secret: Replicate webhook signing secret (``whsec_...``)
+            poll_interval: Seconds before a prediction is first polled
+            max_poll_interval: Cap on the per-prediction poll backoff
+            timeout: Seconds before an unfinished prediction is canceled
+            max_concurrent_polls: Size of the HTTP connection pool
+            transport: Optional httpx transport (used to plug in test servers)
+            limiter: Rate limiter for creating predictions (shared per token by default)
+            read_limiter: Rate limiter for polls and cancels (shared per token by default)
+        """
+        self.api_token = api_token
+        self.base_url = base_url.rstrip("/")
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        if webhook_url and not webhook_secret:
+            # Anyone could POST fake completions to an unsigned receiver
+            logger.warning("Replicate webhook URL ignored: no webhook secret configured")
+            self.webhook_url = None
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.max_concurrent_polls = max_concurrent_polls
+        self._transport = transport
+        self.limiter = limiter or get_limiter("replicate", api_token)
+        self.read_limiter = read_limiter or get_limiter("replicate_reads", api_token)
+
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._tracked: dict[str, _Tracked] = {}
+
+        # Statistics
+        self.stats = {
+            "created": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "polls": 0,
+            "list_polls": 0,
+            "webhooks": 0,
+        }
+
+    @property
+    def in_flight(self) -> int:
+        """Number of predictions still being tracked"""
+        return len(self._tracked)
+
+    # ----- event loop -----
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run_loop, args=(loop, ready), name="predictions", daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        """Body of the background thread"""
+        asyncio.set_event_loop(loop)
+        headers = {"Authorization": f"Bearer {self.api_token}"} if self.api_token else {}
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            timeout=30.0,
+            transport=self._transport,
+            limits=httpx.Limits(max_connections=self.max_concurrent_polls),
+        )
+        self._wakeup = asyncio.Event()
+        self._poller = loop.create_task(self._poll_loop())
+        ready.set()
+        loop.run_forever()
+
+    def close(self) -> None:
+        """Fail outstanding predictions and stop the background loop"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    async def _shutdown(self) -> None:
+        """Cancel the poller and release the HTTP client"""
+        self._poller.cancel()
+        for tracked in list(self._tracked.values()):
+            _settle(tracked.future, error=PredictionError("Prediction engine closed"))
+        self._tracked.clear()
+        await self._client.aclose()
+
+    # ----- creating predictions -----
+
+    def submit(self, model: str, prediction_input: dict[str, Any]) -> Future:
+        """
+        Create a prediction and return immediately
+
+        Args:
+            model: ``owner/name`` for official models or ``owner/name:version``
+            prediction_input: Model input
+
+        Returns:
+            Future resolved with the finished prediction (its ``output`` holds
+            the result), or failing with PredictionError / httpx.HTTPError
+        """
+        future: Future = Future()
+        loop = self._ensure_started()
+        loop.call_soon_threadsafe(
+            lambda: loop.create_task(self._create(model, prediction_input, future))
+        )
+        return future
+
+    async def _create(self, model: str, prediction_input: dict[str, Any], future: Future) -> None:
+        """POST the prediction and start tracking it"""
+        if ":" in model:
+            path, body = "/predictions", {"version": model.split(":", 1)[1]}
+        else:
+            path, body = f"/models/{model}/predictions", {}
+        body["input"] = prediction_input
+        if self.webhook_url:
+            body["webhook"] = self.webhook_url
+            body["webhook_events_filter"] = ["completed"]
+
+        attempt = 0
+        while True:
+            try:
+                response = await self._request(self.limiter, "POST", path, json=body)
+                prediction = response.json()
+                if not isinstance(prediction, dict) or not prediction.get("id"):
+                    raise PredictionError(f"Malformed prediction response: {response.text[:200]}")
+                break
+            except Exception as e:
+                # Only 429s are retried: a 5xx may have created the prediction anyway
+                if status_of(e) == 429 and attempt < self.limiter.max_retries:
+                    await asyncio.sleep(self.limiter.backoff(attempt, e))
+                    attempt += 1
+                    self.limiter.stats["retries"] += 1
+                    continue
+                logger.error(f"Error creating prediction for {model}: {e}")
+                self.stats["failed"] += 1
+                _settle(future, error=e)
+                return
+
+        self.stats["created"] += 1
+        now = time.monotonic()
+        first_poll = WEBHOOK_POLL_INTERVAL if self.webhook_url else self.poll_interval
+        self._tracked[prediction["id"]] = _Tracked(
+            prediction_id=prediction["id"],
+            future=future,
+            interval=first_poll,
+            next_poll=now + first_poll,
+            deadline=now + self.timeout,
+            prediction=prediction,
+        )
+        logger.info(f"Prediction {prediction['id']} created ({prediction.get('status')})")
+        # Predictions can finish synchronously (e.g. cached by the provider)
+        self._update(prediction)
+        self._wakeup.set()
+
+    async def _request(
+        self, limiter: AdaptiveLimiter, method: str, path: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Send one request under a rate limiter, raising for error statuses"""
+        await limiter.acquire_async()
+        try:
+            response = await self._client.request(method, path, **kwargs)
+            response.raise_for_status()
+        except Exception as e:
+            limiter.release(e)
+            raise
+        limiter.release()
+        return response
+
+    # ----- resolving predictions -----
+
+    def _update(self, prediction: dict[str, Any]) -> bool:
+        """Apply a prediction state from a poll or webhook (runs on the loop)"""
+        tracked = self._tracked.get(prediction.get("id", ""))
+        if tracked is None:
+            return False
+
+        status = prediction.get("status")
+        if status not in TERMINAL_STATES:
+            tracked.prediction = prediction
+            return True
+
+        del self._tracked[tracked.prediction_id]
+        if status == "succeeded":
+            self.stats["succeeded"] += 1
+            _settle(tracked.future, result=prediction)
+        else:
+            self.stats["failed"] += 1
+            error = prediction.get("error") or status
+            _settle(tracked.future, error=PredictionError(f"Prediction {status}: {error}"))
+        return True
+
+    def _reschedule(self, tracked: _Tracked, now: float) -> None:
+        """Back off the next poll of a still-running prediction"""
+        cap = WEBHOOK_POLL_INTERVAL if self.webhook_url else self.max_poll_interval
+        tracked.interval = min(tracked.interval * POLL_BACKOFF, cap)
+        tracked.next_poll = now + tracked.interval
+
+    async def _poll_loop(self) -> None:
+        """Poll due predictions, sleeping until the next one is due"""
+        while True:
+            now = time.monotonic()
+            try:
+                for tracked in [t for t in self._tracked.values() if t.deadline <= now]:
+                    self._expire(tracked)
+
+                due = [t for t in self._tracked.values() if t.next_poll <= now]
+                if due:
+                    await self._poll_due(due)
+            except Exception as e:
+                # A dead poller would leave every pending future unresolved
+                logger.error(f"Error polling predictions: {e}")
+
+            self._wakeup.clear()
+            next_poll = min((t.next_poll for t in self._tracked.values()), default=None)
+            delay = None if next_poll is None else max(next_poll - time.monotonic(), 0.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except TimeoutError:
+                pass
+
+    async def _poll_due(self, due: list[_Tracked]) -> None:
+        """Refresh every due prediction with as few requests as possible"""
+        seen: set[str] = set()
+        if len(self._tracked) >= LIST_POLL_THRESHOLD:
+            # The listing returns the most recent predictions with their status,
+            # so one request refreshes most of a burst, due or not; rescheduling
+            # them together keeps later polls batched too
+            seen = await self._poll_list()
+        remaining = [t for t in due if t.prediction_id not in seen]
+        if remaining:
+            await asyncio.gather(*(self._poll_one(t) for t in remaining))
+
+        now = time.monotonic()
+        for prediction_id in seen.union(t.prediction_id for t in remaining):
+            tracked = self._tracked.get(prediction_id)
+            if tracked is not None:
+                self._reschedule(tracked, now)
+
+    async def _poll_list(self) -> set[str]:
+        """Refresh from the first page of the prediction listing"""
+        try:
+            response = await self._request(self.read_limiter, "GET", "/predictions")
+            results = response.json().get("results", [])
+        except Exception as e:
+            logger.warning(f"Error listing predictions: {e}")
+            return set()
+        self.stats["list_polls"] += 1
+
+        seen = set()
+        for prediction in results:
+            # Listed entries omit output, so fetch finished ones individually
+            if not isinstance(prediction, dict) or prediction.get("status") in TERMINAL_STATES:
+                continue
+            if self._update(prediction):
+                seen.add(prediction["id"])
+        return seen
+
+    async def _poll_one(self, tracked: _Tracked) -> None:
+        """Refresh a single prediction"""
+        try:
+            response = await self._request(
+                self.read_limiter, "GET", f"/predictions/{tracked.prediction_id}"
+            )
+            prediction = response.json()
+            if not isinstance(prediction, dict):
+                raise TypeError(f"Malformed prediction: {response.text[:200]}")
+            self.stats["polls"] += 1
+            self._update(prediction)
+        except Exception as e:
+            # Transient errors are retried on the next (backed-off) poll
+            logger.warning(f"Error polling prediction {tracked.prediction_id}: {e}")
+
+    def _expire(self, tracked: _Tracked) -> None:
+        """Give up on a prediction that ran past the timeout and cancel it upstream"""
+        del self._tracked[tracked.prediction_id]
+        self.stats["failed"] += 1
+        _settle(
+            tracked.future,
+            error=PredictionError(f"Prediction {tracked.prediction_id} timed out"),
+        )
+        asyncio.get_running_loop().create_task(self._cancel(tracked.prediction_id))
+
+    async def _cancel(self, prediction_id: str) -> None:
+        """Ask Replicate to stop a prediction"""
+        try:
+            await self._request(self.read_limiter, "POST", f"/predictions/{prediction_id}/cancel")
+        except Exception as e:
+            logger.warning(f"Error canceling prediction {prediction_id}: {e}")
+
+    # ----- webhooks -----
+
+    def verify_webhook(self, headers: Mapping[str, str], body: bytes) -> bool:
+        """
+        Check a webhook delivery's signature
+
+        Replicate signs ``{webhook-id}.{webhook-timestamp}.{body}`` with
+        HMAC-SHA256 using the base64 key after the ``whsec_`` prefix.
+
+        Args:
+            headers: Request headers
+            body: Raw request body
+
+        Returns:
+            True if the signature is valid and recent; always False without a secret
+        """
+        if not self.webhook_secret:
+            return False
+
+        message_id = headers.get("webhook-id")
+        timestamp = headers.get("webhook-timestamp")
+        signatures = headers.get("webhook-signature")
+        if not (message_id and timestamp and signatures):
+            return False
+        try:
+            if abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE:
+                return False
+            key = base64.b64decode(self.webhook_secret.removeprefix("whsec_"))
+        except ValueError:
+            return False
+
+        signed = f"{message_id}.{timestamp}.".encode() + body
+        expected = base64.b64encode(hmac.new(key, signed, hashlib.sha256).digest()).decode()
+        return any(
+            hmac.compare_digest(expected, signature.split(",", 1)[-1])
+            for signature in signatures.split()
+        )
+
+    def handle_webhook(self, prediction: dict[str, Any]) -> bool:
+        """
+        Apply a webhook delivery (callable from any thread)
+
+        Args:
+            prediction: Prediction object posted by Replicate
+
+        Returns:
+            True if the prediction is being tracked by this engine
+        """
+        loop = self._loop
+        if loop is None or prediction.get("id") not in self._tracked:
+            return False
+        self.stats["webhooks"] += 1
+        loop.call_soon_threadsafe(self._update, prediction)
+        return True
@@ -0,0 +1,230 @@
+"""Vectorized slideshow transitions (crossfade, Ken Burns, slide)
+
+Frames are computed with NumPy on buffers allocated once per slideshow
+instead of moviepy's per-clip composition, so a transition costs a few
+array operations per frame rather than a Python closure per layer.
+"""
+
+import logging
+from typing import Any
+
+import numpy as np
+from moviepy.editor import VideoClip
+from PIL import Image
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TRANSITIONS = ("none", "crossfade", "kenburns", "slide")
+
+# Maximum zoom factor reached at the end of a Ken Burns image
+KENBURNS_ZOOM = 1.12
+
+
+def load_frames(image_paths: list[str], size: tuple[int, int] | None = None) -> np.ndarray:
+    """
+    Load images into a single uint8 array, letterboxed to a common size
+
+    Args:
+        image_paths: Image file paths
+        size: Output (width, height); defaults to the first image's size
+
+    Returns:
+        Array of shape (n, height, width, 3)
+    """
+    if size is None:
+        with Image.open(image_paths[0]) as first:
+            size = first.size
+    width, height = size
+    # x264 with yuv420p requires even dimensions
+    width, height = width - width % 2, height - height % 2
+
+    frames = np.zeros((len(image_paths), height, width, 3), dtype=np.uint8)
+    for i, path in enumerate(image_paths):
+        with Image.open(path) as img:
+            img = img.convert("RGB")
+            scale = min(width / img.width, height / img.height)
+            fitted = img.resize(
+                (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                Image.LANCZOS,
+            )
+        x = (width - fitted.width) // 2
+        y = (height - fitted.height) // 2
+        frames[i, y : y + fitted.height, x : x + fitted.width] = np.asarray(fitted)
+    return frames
+
+
+class SlideshowRenderer:
+    """Compute slideshow frames with vectorized transitions on preallocated buffers"""
+
+    def __init__(
+        self,
+        frames: np.ndarray,
+        duration_per_image: float,
+        transition: str = "crossfade",
+        transition_duration: float = 0.5,
+    ):
+        """
+        Initialize the renderer
+
+        Args:
+            frames: Letterboxed images, shape (n, height, width, 3)
+            duration_per_image: Seconds each image is on screen
+            transition: One of TRANSITIONS
+            transition_duration: Seconds of overlap between consecutive images
+        """
+        if transition not in TRANSITIONS:
+            raise ValueError(
+                f"Unsupported transition: {transition}. Available: {list(TRANSITIONS)}"
+            )
+
+        self.frames = frames
+        self.count, self.height, self.width, _ = frames.shape
+        self.duration_per_image = float(duration_per_image)
+        self.transition = transition
+        self.transition_duration = min(float(transition_duration), self.duration_per_image / 2)
+        self.duration = self.count * self.duration_per_image
+
+        # Buffers reused for every frame
+        shape = (self.height, self.width, 3)
+        self._out = np.empty(shape, dtype=np.uint8)
+        self._blend = np.empty(shape, dtype=np.float32)
+        if transition == "kenburns":
+            self._next = np.empty(shape, dtype=np.float32)
+            self._rows = np.empty(shape, dtype=np.float32)
+            self._cols = np.empty(shape, dtype=np.float32)
+
+        # Output pixel grids for the Ken Burns resampler
+        self._grid_y = np.arange(self.height, dtype=np.float32)
+        self._grid_x = np.arange(self.width, dtype=np.float32)
+
+    def make_clip(self) -> Any:
+        """Wrap the renderer in a moviepy clip"""
+        return VideoClip(self.make_frame, duration=self.duration)
+
+    def make_frame(self, t: float) -> np.ndarray:
+        """
+        Render the frame at time t
+
+        The returned array is an internal buffer that is overwritten by the
+        next call; moviepy writes it to the encoder before asking again.
+        """
+        index = min(int(t // self.duration_per_image), self.count - 1)
+        local = t - index * self.duration_per_image
+        start = self.duration_per_image - self.transition_duration
+        in_transition = self.transition != "none" and index < self.count - 1 and local > start
+
+        if self.transition == "kenburns":
+            self._kenburns(index, local, self._blend)
+            if in_transition:
+                self._kenburns(index + 1, 0.0, self._next)
+                alpha = (local - start) / self.transition_duration
+                # blend = blend + (next - blend) * alpha
+                np.subtract(self._next, self._blend, out=self._next)
+                np.multiply(self._next, alpha, out=self._next)
+                np.add(self._blend, self._next, out=self._blend)
+            # Bilinear weights and blends stay within [0, 255], no clipping needed
+            self._out[...] = self._blend
+            return self._out
+
+        if not in_transition:
+            return self.frames[index]
+
+        progress = (local - start) / self.transition_duration
+        if self.transition == "crossfade":
+            self._crossfade(self.frames[index], self.frames[index + 1], progress)
+        else:
+            self._slide(self.frames[index], self.frames[index + 1], progress)
+        return self._out
+
+    def _crossfade(self, current: np.ndarray, following: np.ndarray, alpha: float) -> None:
+        """Linear blend of two frames into the output buffer"""
+        np.subtract(following, current, out=self._blend, dtype=np.float32)
+        self._blend *= alpha
+        self._blend += current
+        self._out[...] = self._blend
+
+    def _slide(self, current: np.ndarray, following: np.ndarray, progress: float) -> None:
+        """Push the next frame in from the right using slice copies only"""
+        # Ease in-out for a less mechanical motion
+        eased = progress * progress * (3 - 2 * progress)
+        offset = round(eased * self.width)
+        self._out[:, : self.width - offset] = current[:, offset:]
+        self._out[:, self.width - offset :] = following[:, :offset]
+
+    def _kenburns(self, index: int, local: float, out: np.ndarray) -> None:
+        """
+        Zoom slowly into an image, alternating pan direction per image
+
+        Implemented as a separable bilinear affine warp: rows are sampled
+        first, then columns, each as a single vectorized gather. The source
+        image is converted to float in ``out`` itself, which is only
+        overwritten once the rows have been sampled.
+        """
+        source = out
+        np.copyto(source, self.frames[index], casting="unsafe")
+        progress = min(max(local / self.duration_per_image, 0.0), 1.0)
+        zoom = 1.0 + (KENBURNS_ZOOM - 1.0) * progress
+        scale = 1.0 / zoom
+
+        # Crop window pans horizontally, alternating direction per image
+        span_y = self.height * (1.0 - scale)
+        span_x = self.width * (1.0 - scale)
+        y0 = span_y * 0.5
+        x0 = span_x * (progress if index % 2 == 0 else 1.0 - progress)
+
+        ys = self._grid_y * scale + y0
+        xs = self._grid_x * scale + x0
+        r0 = np.minimum(ys.astype(np.intp), self.height - 1)
+        r1 = np.minimum(r0 + 1, self.height - 1)
+        c0 = np.minimum(xs.astype(np.intp), self.width - 1)
+        c1 = np.minimum(c0 + 1, self.width - 1)
+        wy = (ys - r0)[:, None]
+        # One weight per interleaved RGB value, so arithmetic runs on flat rows
+        wx = np.repeat(xs - c0, 3)
+
+        # 2-D (height, width * 3) views keep the inner loops contiguous
+        rows = self._rows.reshape(self.height, -1)
+        cols = self._cols.reshape(self.height, -1)
+        flat_out = out.reshape(self.height, -1)
+
+        # Rows: rows = src[r0] + (src[r1] - src[r0]) * wy
+        np.take(source, r0, axis=0, out=self._rows, mode="clip")
+        np.take(source, r1, axis=0, out=self._cols, mode="clip")
+        np.subtract(cols, rows, out=cols)
+        np.multiply(cols, wy, out=cols)
+        np.add(rows, cols, out=rows)
+
+        # Columns: out = rows[:, c0] + (rows[:, c1] - rows[:, c0]) * wx
+        np.take(self._rows, c0, axis=1, out=out, mode="clip")
+        np.take(self._rows, c1, axis=1, out=self._cols, mode="clip")
+        np.subtract(cols, flat_out, out=cols)
+        np.multiply(cols, wx, out=cols)
+        np.add(flat_out, cols, out=flat_out)
+
+
+def build_slideshow_clip(
+    image_paths: list[str],
+    duration_per_image: float,
+    transition: str = "crossfade",
+    transition_duration: float = 0.5,
+) -> Any:
+    """
+    Build a slideshow clip with vectorized transitions
+
+    Args:
+        image_paths: Image file paths
+        duration_per_image: Seconds each image is on screen
+        transition: One of TRANSITIONS
+        transition_duration: Seconds of overlap between consecutive images
+
+    Returns:
+        moviepy VideoClip ready for ``write_videofile``
+    """
+    frames = load_frames(image_paths)
+    renderer = SlideshowRenderer(frames, duration_per_image, transition, transition_duration)
+    logger.info(
+        f"Slideshow renderer: {renderer.count} images, {renderer.width}x{renderer.height}, "
+        f"transition={transition}"
+    )
+    return renderer.make_clip()
@@ -4,17 +4,27 @@ import hashlib
 import json
 import logging
 import os
+import tempfile
+import time
 from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 from moviepy.editor import (
     AudioFileClip,
-    CompositeAudioClip,
     ImageClip,
     VideoFileClip,
     concatenate_videoclips,
 )
+from proglog import ProgressBarLogger
+
+from sa.utils.rate_limit import get_limiter
+
+from .audio_engine import PCMCache, stream_mix
+from .predictions import PredictionEngine, completed_future, then
+from .transitions import TRANSITIONS, build_slideshow_clip
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -30,27 +40,169 @@ except ImportError:
     logger.warning("Replicate not available")
 
 
+@dataclass(frozen=True)
+class RenderProfile:
+    """Encoder settings applied to every rendered video"""
+
+    name: str
+    preset: str
+    crf: int
+    threads: int = 0  # 0 lets ffmpeg/x264 use every core
+    max_height: int | None = None
+    audio_bitrate: str = "128k"
+
+    def write_kwargs(self) -> dict[str, Any]:
+        """Build keyword arguments for moviepy's ``write_videofile``"""
+        ffmpeg_params = ["-crf", str(self.crf), "-pix_fmt", "yuv420p"]
+        # yuv420p needs even dimensions; round both down so odd-sized sources encode
+        if self.max_height:
+            # Downscale inside ffmpeg, never upscale
+            scale = f"scale=-2:'2*trunc(min({self.max_height},ih)/2)'"
+        else:
+            scale = "scale=trunc(iw/2)*2:trunc(ih/2)*2"
+        ffmpeg_params += ["-vf", scale]
+
+        return {
+            "codec": "libx264",
+            "audio_codec": "aac",
+            "preset": self.preset,
+            "threads": self.threads,
+            "audio_bitrate": self.audio_bitrate,
+            "ffmpeg_params": ffmpeg_params,
+        }
+
+
+RENDER_PROFILES: dict[str, RenderProfile] = {
+    "draft": RenderProfile(
+        name="draft", preset="ultrafast", crf=30, max_height=480, audio_bitrate="96k"
+    ),
+    "standard": RenderProfile(
+        name="standard", preset="veryfast", crf=23, max_height=720, audio_bitrate="128k"
+    ),
+    "final": RenderProfile(name="final", preset="slow", crf=18, audio_bitrate="192k"),
+}
+
+DEFAULT_RENDER_PROFILE = "standard"
+
+
+def get_render_profile(name: str | None = None) -> RenderProfile:
+    """
+    Look up a render profile by name
+
+    Args:
+        name: Profile name (draft/standard/final), defaults to standard
+
+    Returns:
+        Matching render profile
+
+    Raises:
+        ValueError: If profile name is not supported
+    """
+    name = name or DEFAULT_RENDER_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(
+            f"Unsupported render profile: {name}. Available: {list(RENDER_PROFILES.keys())}"
+        )
+    return RENDER_PROFILES[name]
+
+
+class RenderProgressLogger(ProgressBarLogger):
+    """Translate moviepy's encoder progress bars into frame-level progress updates"""
+
+    def __init__(
+        self,
+        progress_callback: Callable[[str], None] | None = None,
+        render_progress_callback: Callable[[dict[str, Any]], None] | None = None,
+        min_interval: float = 0.5,
+    ):
+        """
+        Initialize the progress logger
+
+        Args:
+            progress_callback: Receives human readable progress messages
+            render_progress_callback: Receives dicts with frames, total, fps and ETA
+            min_interval: Minimum seconds between two reported updates
+        """
+        super().__init__()
+        self.progress_callback = progress_callback
+        self.render_progress_callback = render_progress_callback
+        self.min_interval = min_interval
+        self._started: float | None = None
+        self._last_report = 0.0
+
+    def bars_callback(self, bar: str, attr: str, value: Any, old_value: Any = None) -> None:
+        """Called by proglog on every bar update; only video frames (bar "t") count"""
+        if bar != "t" or attr != "index":
+            return
+
+        now = time.monotonic()
+        if self._started is None or value < (old_value or 0):
+            self._started = now
+
+        total = self.bars[bar].get("total") or 0
+        done = total and value >= total
+        if not done and now - self._last_report < self.min_interval:
+            return
+        self._last_report = now
+
+        elapsed = now - self._started
+        fps = value / elapsed if elapsed > 0 else 0.0
+        eta = (total - value) / fps if fps > 0 and total else None
+        progress = {
+            "frames": value,
+            "total_frames": total,
+            "percent": round(100.0 * value / total, 1) if total else None,
+            "fps": round(fps, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+        }
+
+        if self.render_progress_callback:
+            self.render_progress_callback(progress)
+        if self.progress_callback:
+            eta_text = f", ETA {progress['eta_seconds']}s" if eta is not None else ""
+            self.progress_callback(
+                f"Encoding frame {value}/{total} ({progress['fps']} fps{eta_text})"
+            )
+
+
 class VideoGenerator:
     """Generate videos from text prompts and combine with audio"""
 
-    def __init__(self, api_key: str | None = None, cache_dir: str = "outputs/video_cache"):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        cache_dir: str = "outputs/video_cache",
+        render_profile: str = DEFAULT_RENDER_PROFILE,
+        prediction_engine: PredictionEngine | None = None,
+    ):
         """
         Initialize the video generator
 
         Args:
             api_key: API key for video generation API
             cache_dir: Directory for caching generated videos
+            render_profile: Default render profile (draft/standard/final)
+            prediction_engine: Resolves predictions without blocking a thread;
+                without one the Replicate SDK is called synchronously
         """
         self.api_key = api_key or os.getenv("REPLICATE_API_TOKEN")
         if self.api_key:
             os.environ["REPLICATE_API_TOKEN"] = self.api_key
 
+        self.prediction_engine = prediction_engine
+        self.limiter = get_limiter("replicate", self.api_key)
+
+        self.render_profile = get_render_profile(render_profile).name
+
         # Initialize cache
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self._cache: dict[str, Any] = {}
         self._load_cache_index()
 
+        # Decoded background tracks, memory-mapped so repeat mixes skip decoding
+        self.pcm_cache = PCMCache(self.cache_dir / "pcm")
+
         # Statistics
         self.stats = {
             "generated": 0,
@@ -88,6 +240,7 @@ class VideoGenerator:
         cleared = len(self._cache)
         self._cache.clear()
         self._save_cache_index()
+        self.pcm_cache.clear()
         return cleared
 
     def get_cache_size(self) -> int:
@@ -98,6 +251,22 @@ class VideoGenerator:
         """Get generation statistics"""
         return self.stats.copy()
 
+    def _write_video(
+        self,
+        video: Any,
+        output_path: str,
+        render_profile: str | None = None,
+        progress_callback: Callable[[str], None] | None = None,
+        render_progress_callback: Callable[[dict[str, Any]], None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Encode a clip to disk using the selected render profile"""
+        profile = get_render_profile(render_profile or self.render_profile)
+        render_logger = None
+        if progress_callback or render_progress_callback:
+            render_logger = RenderProgressLogger(progress_callback, render_progress_callback)
+        video.write_videofile(output_path, logger=render_logger, **profile.write_kwargs(), **kwargs)
+
     @staticmethod
     def validate_prompt(prompt: str) -> dict[str, Any]:
         """Validate video prompt
@@ -155,12 +324,45 @@ class VideoGenerator:
         Returns:
             Video URL or None if failed
         """
+        return self.submit_from_text(
+            prompt,
+            duration=duration,
+            fps=fps,
+            use_cache=use_cache,
+            progress_callback=progress_callback,
+        ).result()
+
+    def submit_from_text(
+        self,
+        prompt: str,
+        duration: int = 5,
+        fps: int = 24,
+        use_cache: bool = True,
+        progress_callback: Callable[[str], None] | None = None,
+    ) -> Future:
+        """
+        Start text-to-video generation without waiting for the prediction
+
+        With a prediction engine the returned future resolves once Replicate
+        finishes, and no thread waits in the meantime; otherwise the SDK call
+        runs here and the future is already resolved.
+
+        Args:
+            prompt: Text description of the video
+            duration: Video duration in seconds
+            fps: Frames per second
+            use_cache: Whether to use cached results
+            progress_callback: Optional callback for progress updates
+
+        Returns:
+            Future resolving to the video URL, or None if generation failed
+        """
         # Validate prompt
         validation = self.validate_prompt(prompt)
         if not validation["valid"]:
             logger.error(f"Invalid prompt: {validation['issues']}")
             self.stats["failed"] += 1
-            return None
+            return completed_future(None)
 
         # Check cache
         params = {"duration": duration, "fps": fps}
@@ -172,22 +374,14 @@ class VideoGenerator:
             if progress_callback:
                 progress_callback("Retrieved from cache")
             cached_result: str | None = self._cache[cache_key]  # type: ignore
-            return cached_result
+            return completed_future(cached_result)
 
-        if not REPLICATE_AVAILABLE:
+        if self.prediction_engine is None and not REPLICATE_AVAILABLE:
             logger.error("Replicate API not available")
             self.stats["failed"] += 1
-            return None
-
-        try:
-            if progress_callback:
-                progress_callback("Generating video...")
-
-            output = replicate.run(
-                "anotherjesse/zeroscope-v2-xl",
-                input={"prompt": prompt, "num_frames": duration * fps},
-            )
+            return completed_future(None)
 
+        def finish(output: Any) -> str | None:
             # Handle output safely
             result: str | None = None
             if isinstance(output, str):
@@ -208,20 +402,41 @@ class VideoGenerator:
                 logger.error("No output from video generation")
 
             return result
-        except Exception as e:
+
+        def fail(e: BaseException) -> None:
             logger.error(f"Error generating video: {e}")
             self.stats["failed"] += 1
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
 
+        if progress_callback:
+            progress_callback("Generating video...")
+
+        model = "anotherjesse/zeroscope-v2-xl"
+        prediction_input = {"prompt": prompt, "num_frames": duration * fps}
+
+        if self.prediction_engine is not None:
+            prediction = self.prediction_engine.submit(model, prediction_input)
+            return then(prediction, lambda p: finish(p.get("output")), fail)
+
+        try:
+            output = self.limiter.call(replicate.run, model, input=prediction_input)
+            return completed_future(finish(output))
+        except Exception as e:
+            return completed_future(fail(e))
+
     def create_slideshow(
         self,
         image_paths: list[str],
         duration_per_image: int = 3,
         output_path: str = "output.mp4",
         fps: int = 24,
+        transition: str = "none",
+        transition_duration: float = 0.5,
+        render_profile: str | None = None,
         progress_callback: Callable[[str], None] | None = None,
+        render_progress_callback: Callable[[dict[str, Any]], None] | None = None,
     ) -> str | None:
         """
         Create slideshow video from images with validation
@@ -231,7 +446,11 @@ class VideoGenerator:
             duration_per_image: Duration for each image in seconds
             output_path: Path to save the video
             fps: Frames per second
+            transition: Transition between images (none/crossfade/kenburns/slide)
+            transition_duration: Transition length in seconds
+            render_profile: Render profile name, defaults to the generator's profile
             progress_callback: Optional callback for progress updates
+            render_progress_callback: Optional callback for frame-level encoder progress
 
         Returns:
             Path to created video or None if failed
@@ -247,6 +466,11 @@ class VideoGenerator:
             self.stats["failed"] += 1
             return None
 
+        if transition not in TRANSITIONS:
+            logger.error(f"Invalid transition: {transition}")
+            self.stats["failed"] += 1
+            return None
+
         # Check if images exist
         valid_paths = []
         for img_path in image_paths:
@@ -264,20 +488,34 @@ class VideoGenerator:
             if progress_callback:
                 progress_callback(f"Creating slideshow with {len(valid_paths)} images...")
 
-            clips = []
-            for i, img_path in enumerate(valid_paths):
-                if progress_callback:
-                    progress_callback(f"Processing image {i+1}/{len(valid_paths)}")
-                clip = ImageClip(img_path, duration=duration_per_image)
-                clips.append(clip)
+            if transition == "none":
+                clips = []
+                for i, img_path in enumerate(valid_paths):
+                    if progress_callback:
+                        progress_callback(f"Processing image {i+1}/{len(valid_paths)}")
+                    clip = ImageClip(img_path, duration=duration_per_image)
+                    clips.append(clip)
 
-            if progress_callback:
-                progress_callback("Concatenating clips...")
-            video = concatenate_videoclips(clips, method="compose")
+                if progress_callback:
+                    progress_callback("Concatenating clips...")
+                video = concatenate_videoclips(clips, method="compose")
+            else:
+                if progress_callback:
+                    progress_callback(f"Preparing {transition} transitions...")
+                video = build_slideshow_clip(
+                    valid_paths, duration_per_image, transition, transition_duration
+                )
 
             if progress_callback:
                 progress_callback("Writing video file...")
-            video.write_videofile(output_path, fps=fps, logger=None)
+            self._write_video(
+                video,
+                output_path,
+                render_profile,
+                progress_callback,
+                render_progress_callback,
+                fps=fps,
+            )
 
             self.stats["generated"] += 1
             logger.info(f"Slideshow created: {output_path}")
@@ -296,7 +534,9 @@ class VideoGenerator:
         video_path: str,
         audio_path: str,
         output_path: str = "output_with_audio.mp4",
+        render_profile: str | None = None,
         progress_callback: Callable[[str], None] | None = None,
+        render_progress_callback: Callable[[dict[str, Any]], None] | None = None,
     ) -> str | None:
         """
         Add audio to video with validation
@@ -305,7 +545,9 @@ class VideoGenerator:
             video_path: Path to video file
             audio_path: Path to audio file
             output_path: Path to save the output
+            render_profile: Render profile name, defaults to the generator's profile
             progress_callback: Optional callback for progress updates
+            render_progress_callback: Optional callback for frame-level encoder progress
 
         Returns:
             Path to video with audio or None if failed
@@ -349,7 +591,9 @@ class VideoGenerator:
 
             if progress_callback:
                 progress_callback("Writing output file...")
-            video.write_videofile(output_path, codec="libx264", audio_codec="aac", logger=None)
+            self._write_video(
+                video, output_path, render_profile, progress_callback, render_progress_callback
+            )
 
             self.stats["generated"] += 1
             logger.info(f"Audio added successfully: {output_path}")
@@ -370,7 +614,9 @@ class VideoGenerator:
         background_audio: str,
         background_volume: float = 0.3,
         output_path: str = "output_mixed.mp4",
+        render_profile: str | None = None,
         progress_callback: Callable[[str], None] | None = None,
+        render_progress_callback: Callable[[dict[str, Any]], None] | None = None,
     ) -> str | None:
         """
         Mix voice and background audio and add to video with validation
@@ -381,7 +627,9 @@ class VideoGenerator:
             background_audio: Path to background audio file
             background_volume: Volume level for background (0.0 to 1.0)
             output_path: Path to save the output
+            render_profile: Render profile name, defaults to the generator's profile
             progress_callback: Optional callback for progress updates
+            render_progress_callback: Optional callback for frame-level encoder progress
 
         Returns:
             Path to video with mixed audio or None if failed
@@ -407,47 +655,35 @@ class VideoGenerator:
             self.stats["failed"] += 1
             return None
 
+        mixed_path: str | None = None
         try:
             if progress_callback:
-                progress_callback("Loading video and audio files...")
+                progress_callback("Loading video...")
 
             video = VideoFileClip(video_path)
-            voice = AudioFileClip(voice_audio)
-            background = AudioFileClip(background_audio)
-
-            # Adjust background volume using fx method
-            if progress_callback:
-                progress_callback("Adjusting volume levels...")
-            from moviepy.audio.fx.volumex import volumex
-
-            background = background.fx(volumex, background_volume)
-
-            # Loop background to match video duration
-            if progress_callback:
-                progress_callback("Processing audio durations...")
-
-            if background.duration < video.duration:
-                loops_needed = int(video.duration / background.duration) + 1
-                bg_clips = [background] * loops_needed
-                from moviepy.audio.AudioClip import concatenate_audioclips
-
-                background = concatenate_audioclips(bg_clips)
-                background = background.subclip(0, video.duration)
-            else:
-                background = background.subclip(0, video.duration)
-
-            # Mix voice and background
-            if voice.duration < video.duration:
-                voice = voice.set_duration(video.duration)
 
+            # Pre-mix voice over the looped background in fixed-size chunks so
+            # hour-long tracks never sit fully decoded in memory
             if progress_callback:
                 progress_callback("Mixing audio tracks...")
-            mixed_audio = CompositeAudioClip([voice, background])
-            video = video.set_audio(mixed_audio)
+            fd, mixed_path = tempfile.mkstemp(
+                suffix=".wav", prefix="mix_", dir=Path(output_path).parent
+            )
+            os.close(fd)
+            stream_mix(
+                voice_audio,
+                self.pcm_cache.get(background_audio),
+                mixed_path,
+                bed_gain=background_volume,
+                duration=video.duration,
+            )
+            video = video.set_audio(AudioFileClip(mixed_path))
 
             if progress_callback:
                 progress_callback("Writing final video...")
-            video.write_videofile(output_path, codec="libx264", audio_codec="aac", logger=None)
+            self._write_video(
+                video, output_path, render_profile, progress_callback, render_progress_callback
+            )
 
             self.stats["generated"] += 1
             logger.info(f"Audio mixed successfully: {output_path}")
@@ -460,6 +696,9 @@ class VideoGenerator:
             if progress_callback:
                 progress_callback(f"Error: {str(e)}")
             return None
+        finally:
+            if mixed_path and os.path.exists(mixed_path):
+                os.remove(mixed_path)
 
     def enhance_prompt(self, prompt: str) -> str:
         """
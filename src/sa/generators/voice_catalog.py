@@ -0,0 +1,158 @@
+"""Cached TTS voice catalog with TTL, background refresh and name resolution"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# ElevenLabs premade voices, usable before the first catalog fetch completes
+DEFAULT_VOICES = {
+    "Adam": "pNInz6obpgDQGcFmaJgB",
+    "Bella": "EXAVITQu4vr4xnSDxMaL",
+    "Antoni": "ErXwobaYiN019PkySvjV",
+    "Rachel": "21m00Tcm4TlvDq8ikWAM",
+    "Domi": "AZnzlk1XvdvUeBnXmlld",
+}
+
+# Seconds before a fetched catalog is considered stale
+DEFAULT_VOICE_TTL = 6 * 60 * 60
+
+# Seconds to wait after a failed refresh before trying again
+REFRESH_RETRY_INTERVAL = 60
+
+
+class VoiceCatalog:
+    """
+    Voice name -> ID catalog served from memory
+
+    Reads never touch the network: a stale catalog keeps being served while a
+    single background thread refreshes it, and the last good catalog is
+    persisted so restarts begin warm.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], dict[str, str]],
+        cache_file: str | Path,
+        ttl: float = DEFAULT_VOICE_TTL,
+        defaults: dict[str, str] | None = None,
+    ):
+        """
+        Initialize voice catalog
+
+        Args:
+            fetch: Returns the provider's voices as {name: voice_id}
+            cache_file: JSON file the catalog is persisted to
+            ttl: Seconds before a refresh is triggered
+            defaults: Voices served until a catalog has been fetched
+        """
+        self.fetch = fetch
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+        # Snapshots are replaced, never mutated, so readers need no lock
+        self._voices: dict[str, str] = dict(DEFAULT_VOICES if defaults is None else defaults)
+        self._by_lower = {name.lower(): voice_id for name, voice_id in self._voices.items()}
+        self._fetched_at = 0.0
+        self._next_refresh = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        """Load the persisted catalog, if any"""
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+            if data.get("voices"):
+                self._set(data["voices"], float(data.get("fetched_at", 0)))
+        except Exception as e:
+            logger.warning(f"Failed to load voice catalog: {e}")
+
+    def _save(self) -> None:
+        """Persist the catalog atomically"""
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump({"fetched_at": self._fetched_at, "voices": self._voices}, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to save voice catalog: {e}")
+
+    def _set(self, voices: dict[str, str], fetched_at: float) -> None:
+        """Swap in a new snapshot"""
+        self._by_lower = {name.lower(): voice_id for name, voice_id in voices.items()}
+        self._voices = dict(voices)
+        self._fetched_at = fetched_at
+        self._next_refresh = fetched_at + self.ttl
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the catalog is older than its TTL"""
+        return time.time() >= self._next_refresh
+
+    def refresh(self) -> bool:
+        """
+        Fetch the catalog now
+
+        Returns:
+            True if a non-empty catalog was fetched
+        """
+        try:
+            try:
+                voices = self.fetch()
+            except Exception as e:
+                logger.error(f"Error fetching voices: {e}")
+                voices = {}
+
+            if not voices:
+                # Keep serving the current snapshot; back off instead of retrying per call
+                self._next_refresh = time.time() + REFRESH_RETRY_INTERVAL
+                return False
+            self._set(voices, time.time())
+            self._save()
+            logger.info(f"Voice catalog refreshed: {len(voices)} voices")
+            return True
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh_in_background(self) -> None:
+        """Start a refresh unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="voice-catalog-refresh", daemon=True).start()
+
+    def _check_fresh(self) -> None:
+        """Kick off a background refresh once the TTL has passed"""
+        if self.is_stale:
+            self.refresh_in_background()
+
+    def names(self) -> list[str]:
+        """Voice names, served from memory"""
+        self._check_fresh()
+        return list(self._voices)
+
+    def resolve(self, voice: str) -> str:
+        """
+        Map a voice name to its ID
+
+        Args:
+            voice: Display name (case-insensitive) or a voice ID
+
+        Returns:
+            The voice ID, or ``voice`` unchanged when it is not a known name
+        """
+        self._check_fresh()
+        return self._by_lower.get(voice.lower(), voice)
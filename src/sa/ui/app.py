@@ -18,7 +18,7 @@ st.set_page_config(
 # Import generators and utilities
 try:
     from sa.generators import AudioGenerator, ImageGenerator, VideoGenerator
-    from sa.utils import SuggestionEngine, config
+    from sa.utils import SuggestionEngine, config, derivative_service, image_index
 except ImportError:
     st.error("⚠️ خطأ في استيراد المكونات. تأكد من تثبيت جميع التبعيات.")
     st.stop()
@@ -157,7 +157,9 @@ def main():
                     st.error("الرجاء إضافة مفتاح Replicate API")
                 else:
                     with st.spinner("🎨 جاري توليد الصورة..."):
-                        generator = ImageGenerator(config.replicate_api_key)
+                        generator = ImageGenerator(
+                            config.replicate_api_key, image_profile=config.image_profile
+                        )
 
                         # Use improved prompt if available
                         final_prompt = st.session_state.get("improved_prompt", prompt)
@@ -180,7 +182,12 @@ def main():
                                 saved = generator.download_image(img_url, save_path)
 
                                 if saved:
+                                    if config.dedupe_images:
+                                        saved = image_index.dedupe(saved)
+                                    else:
+                                        image_index.add(saved)
                                     st.session_state.generated_images.append(saved)
+                                    derivative_service.submit(saved)
                                     st.image(saved, caption=f"صورة {i+1}")
                         else:
                             st.error("فشل توليد الصورة")
@@ -239,6 +246,7 @@ def main():
                             st.success("✅ تم إنشاء الفيديو!")
                             st.video(video_path)
                             st.session_state.generated_videos.append(video_path)
+                            derivative_service.submit(video_path)
             else:
                 st.warning("لا توجد صور متاحة")
 
@@ -319,7 +327,9 @@ def main():
             cols = st.columns(3)
             for i, img_path in enumerate(st.session_state.generated_images):
                 with cols[i % 3]:
-                    st.image(img_path, use_container_width=True)
+                    # Grid cells only need a thumbnail; show the original until it is ready
+                    thumb = derivative_service.get_nowait(img_path, "thumb") or img_path
+                    st.image(thumb, use_container_width=True)
                     with open(img_path, "rb") as f:
                         st.download_button(
                             "⬇️ تحميل",
@@ -2,10 +2,17 @@
 
 from .ai_models import ModelFactory
 from .cache import CacheManager, cached, get_cache_manager
+from .clients import get_client
 from .config import Config, config
 from .database import Database, db
+from .derivatives import DerivativeService, derivative_service
+from .downloads import Downloader, DownloadPolicy, downloader
 from .i18n import I18n, get_translator
+from .image_index import ImageHashIndex, image_index
+from .jobs import JobTracker, job_tracker
+from .model_router import ModelRouter, RoutingHints
 from .projects import ProjectManager, project_manager
+from .rate_limit import AdaptiveLimiter, get_limiter
 from .suggestions import SuggestionEngine
 
 __all__ = [
@@ -22,4 +29,18 @@ __all__ = [
     "cached",
     "get_cache_manager",
     "ModelFactory",
+    "JobTracker",
+    "job_tracker",
+    "DerivativeService",
+    "derivative_service",
+    "ImageHashIndex",
+    "image_index",
+    "AdaptiveLimiter",
+    "get_limiter",
+    "Downloader",
+    "DownloadPolicy",
+    "downloader",
+    "ModelRouter",
+    "RoutingHints",
+    "get_client",
 ]
@@ -3,6 +3,31 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List
 
+from .clients import get_client
+from .rate_limit import get_limiter
+
+
+def closest_size(sizes: List[str], width: int, height: int) -> str:
+    """
+    Pick the supported "WxH" size nearest to a requested one
+
+    Sizes with the closest aspect ratio win; among those, the closest area.
+
+    Args:
+        sizes: Sizes a model supports, e.g. ["1024x1024", "1792x1024"]
+        width: Requested width in pixels
+        height: Requested height in pixels
+
+    Returns:
+        One of sizes
+    """
+
+    def distance(size: str) -> tuple[float, float]:
+        w, h = (int(value) for value in size.split("x"))
+        return abs(w / h - width / height), abs(w * h - width * height)
+
+    return min(sizes, key=distance)
+
 
 class BaseImageGenerator(ABC):
     """Base class for image generators"""
@@ -22,16 +47,20 @@ class OpenAIImageGenerator(BaseImageGenerator):
     """OpenAI DALL-E image generator"""
 
     def __init__(self, api_key: str, model: str = "dall-e-3"):
-        from openai import OpenAI
-
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("openai", api_key)
+        self.limiter = get_limiter("openai", api_key)
         self.model = model
 
     def generate(self, prompt: str, size: str = "1024x1024", quality: str = "standard") -> str:
         """Generate image using DALL-E"""
-        response = self.client.images.generate(
-            model=self.model, prompt=prompt, size=size, quality=quality, n=1
+        response = self.limiter.call(
+            self.client.images.generate,
+            model=self.model,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            n=1,
         )
         return response.data[0].url
 
@@ -74,16 +103,15 @@ class OpenAIAudioGenerator(BaseAudioGenerator):
     """OpenAI TTS audio generator"""
 
     def __init__(self, api_key: str, model: str = "tts-1"):
-        from openai import OpenAI
-
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("openai", api_key)
+        self.limiter = get_limiter("openai", api_key)
         self.model = model
 
     def generate(self, text: str, voice: str = "alloy", speed: float = 1.0) -> bytes:
         """Generate audio using OpenAI TTS"""
-        response = self.client.audio.speech.create(
-            model=self.model, voice=voice, input=text, speed=speed
+        response = self.limiter.call(
+            self.client.audio.speech.create, model=self.model, voice=voice, input=text, speed=speed
         )
         return response.content
 
@@ -125,10 +153,9 @@ class OpenAIVideoGenerator(BaseVideoGenerator):
     """OpenAI video generator (uses GPT for script generation)"""
 
     def __init__(self, api_key: str, model: str = "gpt-4"):
-        from openai import OpenAI
-
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_client("openai", api_key)
+        self.limiter = get_limiter("openai", api_key)
         self.model = model
 
     def generate(self, prompt: str, duration: int = 5) -> str:
@@ -137,7 +164,8 @@ class OpenAIVideoGenerator(BaseVideoGenerator):
         أنشئ سكريبت فيديو مدته {duration} ثواني بناءً على الوصف المُعطى.
         قدم وصفاً تفصيلياً للمشاهد والانتقالات والموسيقى."""
 
-        response = self.client.chat.completions.create(
+        response = self.limiter.call(
+            self.client.chat.completions.create,
             model=self.model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -0,0 +1,85 @@
+"""Process-wide registry of provider SDK clients
+
+Each SDK client owns an HTTP connection pool. Building one per generator
+repeats DNS lookups and TLS handshakes on every request. Clients are therefore
+built once per provider and credential, on first use, and shared by every
+generator and the suggestion engine. SDKs are imported only when their first
+client is built, so importing this package stays cheap.
+"""
+
+import hashlib
+import logging
+import threading
+from collections.abc import Callable
+from typing import Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _openai_client(api_key: str) -> Any:
+    """OpenAI client; retries, including dropped connections, are left to the rate limiter"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, max_retries=0)
+
+
+def _elevenlabs_client(api_key: str) -> Any:
+    """ElevenLabs client"""
+    from elevenlabs import ElevenLabs
+
+    return ElevenLabs(api_key=api_key)
+
+
+# Builder per provider, called once per credential
+CLIENT_BUILDERS: dict[str, Callable[[str], Any]] = {
+    "openai": _openai_client,
+    "elevenlabs": _elevenlabs_client,
+}
+
+_clients: dict[tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider: str, credential: str) -> Any:
+    """
+    Shared SDK client for a provider credential
+
+    Keys are only kept as a hash.
+
+    Args:
+        provider: One of CLIENT_BUILDERS
+        credential: API key
+
+    Returns:
+        The process-wide client for this provider and credential
+
+    Raises:
+        ValueError: If the provider is not supported
+        ImportError: If the provider's SDK is not installed
+    """
+    if provider not in CLIENT_BUILDERS:
+        raise ValueError(
+            f"Unsupported provider: {provider}. Available: {list(CLIENT_BUILDERS.keys())}"
+        )
+    key = (provider, hashlib.sha256(credential.encode()).hexdigest()[:16])
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = CLIENT_BUILDERS[provider](credential)
+            logger.info(f"Created shared {provider} client")
+        return client
+
+
+def close_clients() -> None:
+    """Close every shared client's connections and forget them"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        close = getattr(client, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"Failed to close client: {e}")
@@ -18,6 +18,10 @@ class Config:
     replicate_api_key: str | None = None
     elevenlabs_api_key: str | None = None
 
+    # Replicate webhook delivery (public URL of /api/v1/webhooks/replicate and signing secret)
+    replicate_webhook_url: str | None = None
+    replicate_webhook_secret: str | None = None
+
     # Paths
     output_dir: str = "outputs"
     assets_dir: str = "assets"
@@ -27,6 +31,22 @@ class Config:
     default_video_fps: int = 24
     default_video_duration: int = 5
 
+    # Render profile for encoded videos (draft/standard/final)
+    render_profile: str | None = None
+
+    # Storage encoding for downloaded images (original/lossless/high/standard/compact)
+    image_profile: str | None = None
+
+    # Replace newly generated images that duplicate an existing one (opt-in)
+    dedupe_images: bool | None = None
+
+    # Retries of failed media downloads, and hedging of slow ones
+    download_retries: int | None = None
+    download_hedging: bool | None = None
+
+    # Audio encoding profile for exported audio (voice/compact/standard/high)
+    audio_profile: str | None = None
+
     # Audio settings
     default_voice: str = "Adam"
     default_audio_model: str = "eleven_multilingual_v2"
@@ -36,6 +56,23 @@ class Config:
         self.openai_api_key = self.openai_api_key or os.getenv("OPENAI_API_KEY")
         self.replicate_api_key = self.replicate_api_key or os.getenv("REPLICATE_API_TOKEN")
         self.elevenlabs_api_key = self.elevenlabs_api_key or os.getenv("ELEVENLABS_API_KEY")
+        self.replicate_webhook_url = self.replicate_webhook_url or os.getenv(
+            "SA_REPLICATE_WEBHOOK_URL"
+        )
+        self.replicate_webhook_secret = self.replicate_webhook_secret or os.getenv(
+            "REPLICATE_WEBHOOK_SECRET"
+        )
+        self.render_profile = self.render_profile or os.getenv("SA_RENDER_PROFILE", "standard")
+        self.audio_profile = self.audio_profile or os.getenv("SA_AUDIO_PROFILE", "standard")
+        self.image_profile = self.image_profile or os.getenv("SA_IMAGE_PROFILE", "standard")
+        if self.dedupe_images is None:
+            dedupe = os.getenv("SA_DEDUPE_IMAGES", "false")
+            self.dedupe_images = dedupe.lower() in ("1", "true", "yes")
+        if self.download_retries is None:
+            self.download_retries = int(os.getenv("SA_DOWNLOAD_RETRIES", "3"))
+        if self.download_hedging is None:
+            hedging = os.getenv("SA_DOWNLOAD_HEDGING", "true")
+            self.download_hedging = hedging.lower() in ("1", "true", "yes")
 
         # Create output directories
         os.makedirs(self.output_dir, exist_ok=True)
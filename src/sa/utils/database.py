@@ -1,37 +1,43 @@
 """Database management for SA Platform"""
 
+import atexit
 import json
+import logging
 import sqlite3
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+# Configure logging
+logger = logging.getLogger(__name__)
+
 # Database path
 DB_PATH = Path("data/sa.db")
 DB_PATH.parent.mkdir(exist_ok=True)
 
-
-class Database:
-    """SQLite database manager for projects and statistics"""
-
-    def __init__(self, db_path: str = str(DB_PATH)):
-        """Initialize database"""
-        self.db_path = db_path
-        self.init_db()
-
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    def init_db(self) -> None:
-        """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Projects table
-        cursor.execute("""
+# Applied to every new connection. WAL lets readers (the dashboard) run while
+# a writer commits; synchronous=NORMAL is crash-safe under WAL and saves an
+# fsync per commit
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # negative means KiB: 16 MB of page cache
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms a writer waits for another writer's lock
+}
+
+# Prepared statements kept per connection and reused across calls
+STATEMENT_CACHE_SIZE = 256
+
+# Schema migrations as (version, description, statements), applied in order.
+# Never edit a released migration; add a new one instead
+MIGRATIONS: list[tuple[int, str, tuple[str, ...]]] = [
+    (
+        1,
+        "Create projects, generations and statistics tables",
+        (
+            """
             CREATE TABLE IF NOT EXISTS projects (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -42,10 +48,9 @@ class Database:
                 videos TEXT,
                 audio TEXT
             )
-        """)
-
-        # Generations table (لتتبع العمليات)
-        cursor.execute("""
+            """,
+            # Generations table (لتتبع العمليات)
+            """
             CREATE TABLE IF NOT EXISTS generations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 project_id INTEGER,
@@ -56,10 +61,8 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (project_id) REFERENCES projects(id)
             )
-        """)
-
-        # Statistics table
-        cursor.execute("""
+            """,
+            """
             CREATE TABLE IF NOT EXISTS statistics (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 date TEXT,
@@ -69,85 +72,243 @@ class Database:
                 total_time REAL DEFAULT 0,
                 UNIQUE(date)
             )
-        """)
+            """,
+        ),
+    ),
+    (
+        2,
+        "Index project history and project listings by creation time",
+        (
+            # Serves WHERE project_id = ? ORDER BY created_at DESC without a sort,
+            # and the generation deletes in delete_project
+            """
+            CREATE INDEX IF NOT EXISTS idx_generations_project_created
+            ON generations (project_id, created_at)
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_projects_created ON projects (created_at)",
+        ),
+    ),
+]
+
+# Statistics counter column for each generation type
+STAT_COLUMNS = {"image": "images_count", "video": "videos_count", "audio": "audio_count"}
+
+# Buffered statistics increments are written once this many are pending,
+# or by the background flusher this many seconds after the first one
+STATS_FLUSH_SIZE = 100
+STATS_FLUSH_INTERVAL = 2.0
+
+# Adds a day's increments atomically; concurrent writers cannot race on UNIQUE(date)
+UPSERT_STATISTICS = """
+    INSERT INTO statistics (date, images_count, videos_count, audio_count, total_time)
+    VALUES (:date, :images_count, :videos_count, :audio_count, :total_time)
+    ON CONFLICT(date) DO UPDATE SET
+        images_count = images_count + excluded.images_count,
+        videos_count = videos_count + excluded.videos_count,
+        audio_count = audio_count + excluded.audio_count,
+        total_time = total_time + excluded.total_time
+"""
+
+# Hot queries; tests check their plans stay on an index
+SELECT_PROJECTS = "SELECT * FROM projects ORDER BY created_at DESC"
+SELECT_GENERATIONS = "SELECT * FROM generations WHERE project_id = ? ORDER BY created_at DESC"
+SELECT_STATISTICS = "SELECT * FROM statistics WHERE date = ?"
+SELECT_ALL_STATISTICS = "SELECT * FROM statistics ORDER BY date DESC"
+
+
+def _zero_increments() -> dict[str, float]:
+    """Empty statistics increments for one day"""
+    return dict.fromkeys((*STAT_COLUMNS.values(), "total_time"), 0)
 
-        conn.commit()
+
+class Database:
+    """SQLite database manager for projects and statistics"""
+
+    def __init__(self, db_path: str = str(DB_PATH)):
+        """Initialize database"""
+        self.db_path = db_path
+        # One long-lived connection per thread; sqlite3 connections are not shareable
+        self._local = threading.local()
+        # Every open connection, so close_all can close them at exit
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Write-behind statistics: {date: {column: increment}}
+        self._pending_stats: dict[str, dict[str, float]] = {}
+        self._pending_count = 0
+        self._stats_lock = threading.Lock()
+        self._stats_added = threading.Condition(self._stats_lock)
+        # Single background thread (and connection) for timed flushes, stopped by close_all
+        self._flusher: threading.Thread | None = None
+        self._flusher_stop = threading.Event()
+        self.init_db()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Get this thread's database connection
+
+        The connection is opened and configured on first use and then kept,
+        so its prepared statements and page cache survive between calls.
+        Use it as a context manager to commit or roll back a transaction.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Still only used by this thread; check_same_thread=False only lets
+            # close_all close it from the exiting thread
+            conn = sqlite3.connect(
+                self.db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            for name, value in PRAGMAS.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _close_connection(conn: sqlite3.Connection) -> None:
+        """Refresh planner statistics for tables whose shape changed a lot, then close"""
+        conn.execute("PRAGMA optimize")
         conn.close()
 
-    def create_project(self, name: str, description: str = "") -> int:
-        """Create a new project"""
+    def close(self) -> None:
+        """Close this thread's connection; the next call opens a new one"""
+        self.flush_stats()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._connections_lock:
+                self._connections.remove(conn)
+            self._close_connection(conn)
+            self._local.conn = None
+
+    def close_all(self) -> None:
+        """Stop the flusher, flush statistics and close every thread's connection, e.g. at exit"""
+        with self._stats_lock:
+            flusher, self._flusher = self._flusher, None
+            self._flusher_stop.set()
+            self._stats_added.notify_all()
+        if flusher is not None:
+            flusher.join()
+        self._try_flush_stats()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            # Threads that keep going open a fresh connection on their next call
+            self._local = threading.local()
+        for conn in connections:
+            try:
+                self._close_connection(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to close database connection: {e}")
+
+    def _fetch_all(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+        """Run a query and return every row as a dict"""
+        return [dict(row) for row in self.get_connection().execute(sql, params).fetchall()]
+
+    def _fetch_one(self, sql: str, params: tuple = ()) -> dict[str, Any] | None:
+        """Run a query and return its first row as a dict"""
+        rows = self._fetch_all(sql, params)
+        return rows[0] if rows else None
+
+    def init_db(self) -> None:
+        """Initialize database tables by applying pending migrations"""
+        self.migrate()
+
+    def migrate(self) -> int:
+        """
+        Apply pending schema migrations
+
+        All pending migrations run in one IMMEDIATE transaction, so a second
+        process starting at the same time waits and then finds nothing to do.
+
+        Returns:
+            Schema version after migrating
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
-        cursor.execute(
-            "INSERT INTO projects (name, description) VALUES (?, ?)",
-            (name, description),
-        )
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+            for version, description, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                    (version, description),
+                )
+                logger.info(f"Applied database migration {version}: {description}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-        project_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        return self.schema_version()
 
+    def schema_version(self) -> int:
+        """Highest migration applied to the database"""
+        row = self._fetch_one("SELECT MAX(version) AS version FROM schema_migrations")
+        return (row["version"] or 0) if row else 0
+
+    def query_plan(self, sql: str, params: tuple = ()) -> list[str]:
+        """Steps of SQLite's plan for a query (EXPLAIN QUERY PLAN)"""
+        rows = self._fetch_all(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row["detail"] for row in rows]
+
+    def create_project(self, name: str, description: str = "") -> int:
+        """Create a new project"""
+        with self.get_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO projects (name, description) VALUES (?, ?)",
+                (name, description),
+            )
+
+        project_id = cursor.lastrowid
         return int(project_id) if project_id else 0
 
     def get_projects(self) -> list[dict[str, Any]]:
         """Get all projects"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM projects ORDER BY created_at DESC")
-        projects = [dict(row) for row in cursor.fetchall()]
-
-        conn.close()
-        return projects
+        return self._fetch_all(SELECT_PROJECTS)
 
     def get_project(self, project_id: int) -> dict[str, Any] | None:
         """Get specific project"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM projects WHERE id = ?", (project_id,))
-        row = cursor.fetchone()
-
-        conn.close()
-        return dict(row) if row else None
+        return self._fetch_one("SELECT * FROM projects WHERE id = ?", (project_id,))
 
     def update_project(
         self, project_id: int, name: str | None = None, description: str | None = None
     ) -> None:
         """Update project"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        if name and description:
-            cursor.execute(
-                "UPDATE projects SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (name, description, project_id),
-            )
-        elif name:
-            cursor.execute(
-                "UPDATE projects SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (name, project_id),
-            )
-        elif description:
-            cursor.execute(
-                "UPDATE projects SET description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-                (description, project_id),
-            )
-
-        conn.commit()
-        conn.close()
+            if name and description:
+                cursor.execute(
+                    "UPDATE projects SET name = ?, description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (name, description, project_id),
+                )
+            elif name:
+                cursor.execute(
+                    "UPDATE projects SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (name, project_id),
+                )
+            elif description:
+                cursor.execute(
+                    "UPDATE projects SET description = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (description, project_id),
+                )
 
     def delete_project(self, project_id: int) -> None:
         """Delete project"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM generations WHERE project_id = ?", (project_id,))
-        cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
-
-        conn.commit()
-        conn.close()
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM generations WHERE project_id = ?", (project_id,))
+            conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
 
     def add_generation(
         self,
@@ -158,51 +319,30 @@ class Database:
         duration: float = 0,
     ) -> None:
         """Add a generation record"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """INSERT INTO generations (project_id, type, prompt, file_path, duration)
-               VALUES (?, ?, ?, ?, ?)""",
-            (project_id, gen_type, prompt, file_path, duration),
-        )
-
-        conn.commit()
-        conn.close()
+        with self.get_connection() as conn:
+            conn.execute(
+                """INSERT INTO generations (project_id, type, prompt, file_path, duration)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (project_id, gen_type, prompt, file_path, duration),
+            )
 
         # Update statistics
         self._update_stats(gen_type, duration)
 
     def get_generations(self, project_id: int) -> list[dict[str, Any]]:
         """Get project generations"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """SELECT * FROM generations WHERE project_id = ?
-               ORDER BY created_at DESC""",
-            (project_id,),
-        )
-        generations = [dict(row) for row in cursor.fetchall()]
-
-        conn.close()
-        return generations
+        return self._fetch_all(SELECT_GENERATIONS, (project_id,))
 
     def get_statistics(self, date: str | None = None) -> dict[str, Any]:
         """Get statistics"""
         if not date:
             date = datetime.now().strftime("%Y-%m-%d")
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM statistics WHERE date = ?", (date,))
-        row = cursor.fetchone()
-
-        conn.close()
+        self._try_flush_stats()
 
+        row = self._fetch_one(SELECT_STATISTICS, (date,))
         if row:
-            return dict(row)
+            return row
 
         return {
             "date": date,
@@ -214,60 +354,89 @@ class Database:
 
     def get_all_statistics(self) -> list[dict[str, Any]]:
         """Get all statistics"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM statistics ORDER BY date DESC")
-        stats = [dict(row) for row in cursor.fetchall()]
-
-        conn.close()
-        return stats
+        self._try_flush_stats()
+        return self._fetch_all(SELECT_ALL_STATISTICS)
 
     def _update_stats(self, gen_type: str, duration: float) -> None:
-        """Update daily statistics"""
-        date = datetime.now().strftime("%Y-%m-%d")
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """
+        Count a generation in today's statistics
 
-        # Check if record exists
-        cursor.execute("SELECT id FROM statistics WHERE date = ?", (date,))
-        exists = cursor.fetchone()
+        Increments are buffered and written in batches by flush_stats, which
+        also runs before statistics are read, so counts stay exact.
+        """
+        column = STAT_COLUMNS.get(gen_type)
+        if column is None:
+            return
 
-        if exists:
-            if gen_type == "image":
-                cursor.execute(
-                    "UPDATE statistics SET images_count = images_count + 1, total_time = total_time + ? WHERE date = ?",
-                    (duration, date),
-                )
-            elif gen_type == "video":
-                cursor.execute(
-                    "UPDATE statistics SET videos_count = videos_count + 1, total_time = total_time + ? WHERE date = ?",
-                    (duration, date),
-                )
-            elif gen_type == "audio":
-                cursor.execute(
-                    "UPDATE statistics SET audio_count = audio_count + 1, total_time = total_time + ? WHERE date = ?",
-                    (duration, date),
-                )
-        else:
-            if gen_type == "image":
-                cursor.execute(
-                    "INSERT INTO statistics (date, images_count, total_time) VALUES (?, 1, ?)",
-                    (date, duration),
-                )
-            elif gen_type == "video":
-                cursor.execute(
-                    "INSERT INTO statistics (date, videos_count, total_time) VALUES (?, 1, ?)",
-                    (date, duration),
-                )
-            elif gen_type == "audio":
-                cursor.execute(
-                    "INSERT INTO statistics (date, audio_count, total_time) VALUES (?, 1, ?)",
-                    (date, duration),
+        date = datetime.now().strftime("%Y-%m-%d")
+        with self._stats_lock:
+            increments = self._pending_stats.setdefault(date, _zero_increments())
+            increments[column] += 1
+            increments["total_time"] += duration
+            self._pending_count += 1
+            flush_now = self._pending_count >= STATS_FLUSH_SIZE
+            if not flush_now:
+                if self._flusher is None:
+                    self._flusher_stop = threading.Event()
+                    self._flusher = threading.Thread(
+                        target=self._flush_worker,
+                        args=(self._flusher_stop,),
+                        name="stats-flush",
+                        daemon=True,
+                    )
+                    self._flusher.start()
+                self._stats_added.notify()
+
+        if flush_now:
+            # Through the caller's connection, which also bounds the buffer
+            self._try_flush_stats()
+
+    def flush_stats(self) -> None:
+        """Write buffered statistics increments, one UPSERT per day, in one transaction"""
+        with self._stats_lock:
+            pending, self._pending_stats = self._pending_stats, {}
+            self._pending_count = 0
+        if not pending:
+            return
+
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    UPSERT_STATISTICS,
+                    [{"date": date, **increments} for date, increments in pending.items()],
                 )
-
-        conn.commit()
-        conn.close()
+        except sqlite3.Error:
+            # Keep the increments for the next flush rather than losing them
+            with self._stats_lock:
+                for date, increments in pending.items():
+                    merged = self._pending_stats.setdefault(date, _zero_increments())
+                    for column, value in increments.items():
+                        merged[column] += value
+                    self._pending_count += sum(increments[c] for c in STAT_COLUMNS.values())
+            raise
+
+    def _try_flush_stats(self) -> None:
+        """Flush statistics, logging a failure instead of raising; increments are kept"""
+        try:
+            self.flush_stats()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to flush statistics: {e}")
+
+    def _flush_worker(self, stop: threading.Event) -> None:
+        """
+        Background flusher: writes increments STATS_FLUSH_INTERVAL after they arrive
+
+        Runs on one thread until close_all sets ``stop``, so timed flushes all
+        reuse a single connection. A failed flush is retried on the next round.
+        """
+        while not stop.is_set():
+            with self._stats_lock:
+                while not self._pending_stats and not stop.is_set():
+                    self._stats_added.wait()
+            # close_all flushes whatever is left once this thread has stopped
+            if stop.wait(STATS_FLUSH_INTERVAL):
+                return
+            self._try_flush_stats()
 
     def export_project(self, project_id: int) -> str:
         """Export project as JSON"""
@@ -281,3 +450,5 @@ class Database:
 
 # Global database instance
 db = Database()
+# Buffered statistics must not be lost when the process exits
+atexit.register(db.close_all)
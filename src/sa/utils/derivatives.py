@@ -0,0 +1,280 @@
+"""Thumbnail, preview and poster-frame derivatives for generated media"""
+
+import hashlib
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from .config import config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each derivative size; None keeps the source size
+DERIVATIVE_SIZES: dict[str, int | None] = {
+    "thumb": 256,
+    "preview": 1024,
+    "poster": None,
+}
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".avif")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov")
+
+# Seconds into a video the poster frame is taken from (clamped for short clips)
+POSTER_OFFSET = 1.0
+
+# Derivatives are always JPEG: small, and displayable everywhere
+DERIVATIVE_MEDIA_TYPE = "image/jpeg"
+DERIVATIVE_QUALITY = 82
+
+
+def media_kind(path: str) -> str | None:
+    """Return "image", "video" or None from a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def sizes_for(path: str) -> list[str]:
+    """Derivative sizes that apply to a media file"""
+    kind = media_kind(path)
+    if kind == "image":
+        return ["thumb", "preview"]
+    if kind == "video":
+        return ["poster", "thumb", "preview"]
+    return []
+
+
+class DerivativeService:
+    """Produce and cache downsized derivatives in a background worker pool"""
+
+    def __init__(self, cache_dir: str = "outputs/derivatives", max_workers: int = 2):
+        """
+        Initialize derivative service
+
+        Args:
+            cache_dir: Directory for cached derivatives
+            max_workers: Number of background worker threads
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.stats = {
+            "generated": 0,
+            "cached": 0,
+            "failed": 0,
+        }
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Create the worker pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="derivatives"
+                )
+            return self._executor
+
+    def derivative_path(self, source: str, size: str) -> Path:
+        """Cache location of one derivative of a source file"""
+        key = hashlib.md5(os.path.abspath(source).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{Path(source).stem}_{key}_{size}.jpg"
+
+    def _is_fresh(self, dest: Path, source: str) -> bool:
+        """Whether a cached derivative exists and is newer than its source"""
+        try:
+            return dest.stat().st_mtime_ns >= os.stat(source).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def submit(self, source: str) -> list[Future]:
+        """
+        Queue every derivative of a newly created output
+
+        Args:
+            source: Image or video file
+
+        Returns:
+            Futures resolving to derivative paths (or None on failure)
+        """
+        return [self._schedule(source, size) for size in sizes_for(source)]
+
+    def _schedule(self, source: str, size: str) -> Future:
+        """Queue one derivative, sharing work with an identical pending request"""
+        dest = self.derivative_path(source, size)
+        with self._lock:
+            pending = self._pending.get(dest)
+            if pending is not None:
+                return pending
+        future = self._pool().submit(self._build, source, size, dest)
+        with self._lock:
+            self._pending.setdefault(dest, future)
+        future.add_done_callback(lambda _: self._forget(dest, future))
+        return future
+
+    def _forget(self, dest: Path, future: Future) -> None:
+        """Drop a finished future from the pending table"""
+        with self._lock:
+            if self._pending.get(dest) is future:
+                del self._pending[dest]
+
+    def get(self, source: str, size: str, timeout: float | None = 30) -> str | None:
+        """
+        Get a derivative, rendering it now if it was never queued
+
+        Args:
+            source: Image or video file
+            size: One of the sizes from ``sizes_for(source)``
+            timeout: Seconds to wait for a queued render
+
+        Returns:
+            Path to the derivative or None if it could not be produced
+
+        Raises:
+            ValueError: If the size does not apply to this kind of media
+        """
+        dest = self._cached_path(source, size)
+        if self._is_fresh(dest, source):
+            self.stats["cached"] += 1
+            return str(dest)
+
+        with self._lock:
+            pending = self._pending.get(dest)
+        if pending is not None:
+            return pending.result(timeout=timeout)
+        return self._build(source, size, dest)
+
+    def get_nowait(self, source: str, size: str) -> str | None:
+        """
+        Get a derivative only if it is already rendered, queueing it otherwise
+
+        For callers that must not wait, such as a gallery drawing many items.
+
+        Args:
+            source: Image or video file
+            size: One of the sizes from ``sizes_for(source)``
+
+        Returns:
+            Path to the derivative, or None while it is being rendered
+
+        Raises:
+            ValueError: If the size does not apply to this kind of media
+        """
+        dest = self._cached_path(source, size)
+        if self._is_fresh(dest, source):
+            self.stats["cached"] += 1
+            return str(dest)
+        self._schedule(source, size)
+        return None
+
+    def _cached_path(self, source: str, size: str) -> Path:
+        """Validate a requested size and return its cache location"""
+        if size not in sizes_for(source):
+            raise ValueError(f"Unsupported derivative size: {size}. Available: {sizes_for(source)}")
+        return self.derivative_path(source, size)
+
+    def remove(self, source: str) -> int:
+        """Delete all derivatives of a source; returns number removed"""
+        removed = 0
+        for size in DERIVATIVE_SIZES:
+            dest = self.derivative_path(source, size)
+            if dest.exists():
+                dest.unlink()
+                removed += 1
+        return removed
+
+    def _build(self, source: str, size: str, dest: Path) -> str | None:
+        """Render one derivative to a temp file and publish it atomically"""
+        if self._is_fresh(dest, source):
+            self.stats["cached"] += 1
+            return str(dest)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".jpg", dir=self.cache_dir)
+        os.close(fd)
+        try:
+            if media_kind(source) == "video":
+                self._render_video(source, size, tmp_path)
+            else:
+                self._render_image(source, DERIVATIVE_SIZES[size], tmp_path)
+            os.replace(tmp_path, dest)
+            self.stats["generated"] += 1
+            logger.info(f"Derivative created: {dest.name}")
+            return str(dest)
+        except Exception as e:
+            logger.error(f"Error creating {size} derivative of {source}: {e}")
+            self.stats["failed"] += 1
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _render_image(source: str, max_edge: int | None, output: str) -> None:
+        """Downscale an image into a JPEG, never upscaling"""
+        with Image.open(source) as img:
+            if max_edge:
+                # Lets the JPEG decoder skip straight to a reduced scale
+                img.draft("RGB", (max_edge, max_edge))
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(output, format="JPEG", quality=DERIVATIVE_QUALITY, optimize=True)
+
+    def _render_video(self, source: str, size: str, output: str) -> None:
+        """Extract the poster frame, then scale it for thumb and preview"""
+        if size != "poster":
+            # Built in this worker rather than waited for: a queued poster
+            # behind thumbs holding every worker would never run
+            poster = self._build(source, "poster", self.derivative_path(source, "poster"))
+            if not poster:
+                raise RuntimeError("Poster frame unavailable")
+            self._render_image(poster, DERIVATIVE_SIZES[size], output)
+            return
+
+        from sa.generators.audio_engine import ffmpeg_binary
+
+        for offset in (POSTER_OFFSET, 0.0):
+            # -ss before -i seeks by keyframe, so this is cheap for long videos
+            result = subprocess.run(
+                [
+                    ffmpeg_binary(),
+                    "-nostdin",
+                    "-loglevel",
+                    "error",
+                    "-y",
+                    "-ss",
+                    str(offset),
+                    "-i",
+                    source,
+                    "-frames:v",
+                    "1",
+                    "-q:v",
+                    "3",
+                    "-f",
+                    "image2",
+                    output,
+                ],
+                capture_output=True,
+                check=False,
+            )
+            # Clips shorter than the offset produce no frame; retry from the start
+            if result.returncode == 0 and os.path.getsize(output) > 0:
+                return
+        raise RuntimeError(f"ffmpeg poster extraction failed: {result.stderr.decode()[:200]}")
+
+
+# Global derivative service instance
+derivative_service = DerivativeService(os.path.join(config.output_dir, "derivatives"))
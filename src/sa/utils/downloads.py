@@ -0,0 +1,281 @@
+"""Download policy for generated media: retries, range resume and hedged requests
+
+Provider outputs are served from CDNs whose edges are usually fast but
+occasionally stall or drop a connection. ``Downloader`` works around both:
+
+- Transient failures (connection errors, timeouts, 408/429/5xx) are
+  retried with capped exponential backoff and jitter, honouring
+  Retry-After.
+- A body interrupted part-way is resumed with a ``Range`` request instead
+  of starting over, as long as the server still serves the same file.
+- When the response headers take longer than the host's recent latency
+  percentile, a second identical request is started and whichever answers
+  first is used. Hedges are limited to a fraction of all requests so a slow
+  host does not receive double the traffic.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import BinaryIO
+from urllib.parse import urlparse
+
+import requests
+
+from .config import config
+from .rate_limit import retry_after_of, status_of
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying; anything else is final
+RETRY_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+# Network-level failures worth retrying
+RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+# Bytes per streamed download chunk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Header latencies remembered per host for the hedge threshold
+LATENCY_WINDOW = 200
+
+
+@dataclass(frozen=True)
+class DownloadPolicy:
+    """Timeouts, retries and hedging for media downloads"""
+
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0  # longest silence between bytes
+    max_attempts: int = 4
+    backoff_base: float = 0.25
+    backoff_cap: float = 8.0
+    hedge: bool = True
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.25
+    hedge_initial_delay: float = 2.0  # until enough latencies are known
+    hedge_min_samples: int = 20
+    hedge_budget: float = 0.1  # fraction of requests that may be hedged
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed download attempt is worth repeating"""
+    return isinstance(error, RETRY_EXCEPTIONS) or status_of(error) in RETRY_STATUSES
+
+
+def _close_response(future: Future) -> None:
+    """Close the response of a request that lost a hedge race"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _validator(response: requests.Response) -> str | None:
+    """Strong ETag or Last-Modified identifying the served file, for If-Range"""
+    etag = response.headers.get("ETag")
+    if isinstance(etag, str) and etag and not etag.startswith("W/"):
+        return etag
+    modified = response.headers.get("Last-Modified")
+    return modified if isinstance(modified, str) and modified else None
+
+
+def _resumes_at(response: requests.Response, offset: int) -> bool:
+    """Whether a response continues the file at offset rather than restarting it"""
+    content_range = response.headers.get("Content-Range")
+    return (
+        response.status_code == 206
+        and isinstance(content_range, str)
+        and content_range.startswith(f"bytes {offset}-")
+    )
+
+
+class Downloader:
+    """Fetches URLs to files under a DownloadPolicy, shared across generators"""
+
+    def __init__(self, policy: DownloadPolicy | None = None, max_workers: int = 16):
+        """
+        Initialize downloader
+
+        Args:
+            policy: Timeouts, retries and hedging (defaults to DownloadPolicy())
+            max_workers: Threads available for concurrent and hedged requests
+        """
+        self.policy = policy or DownloadPolicy()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._latencies: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.stats = {
+            "requests": 0,
+            "downloads": 0,
+            "retries": 0,
+            "resumed": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "failed": 0,
+        }
+
+    # ----- latency tracking -----
+
+    def _record_latency(self, host: str, seconds: float) -> None:
+        """Remember how long a host took to send response headers"""
+        with self._lock:
+            window = self._latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW))
+            window.append(seconds)
+
+    def hedge_delay(self, host: str) -> float:
+        """
+        Seconds to wait for response headers before sending a hedged request
+
+        Args:
+            host: Host name the request goes to
+
+        Returns:
+            The host's latency percentile from the policy, or the initial
+            delay while too few requests have been seen
+        """
+        policy = self.policy
+        with self._lock:
+            samples = sorted(self._latencies.get(host, ()))
+        if len(samples) < policy.hedge_min_samples:
+            return policy.hedge_initial_delay
+        rank = math.ceil(policy.hedge_percentile / 100 * len(samples)) - 1
+        return max(policy.hedge_min_delay, samples[min(max(rank, 0), len(samples) - 1)])
+
+    # ----- requests -----
+
+    def _get(self, url: str, headers: dict[str, str]) -> requests.Response:
+        """Send one GET and wait for its response headers"""
+        start = time.monotonic()
+        response = requests.get(
+            url,
+            headers=headers,
+            timeout=(self.policy.connect_timeout, self.policy.read_timeout),
+            stream=True,
+        )
+        self._record_latency(urlparse(url).netloc, time.monotonic() - start)
+        return response
+
+    def _open(self, url: str, headers: dict[str, str]) -> requests.Response:
+        """
+        Send a GET, hedging it with a second one if the first is slow
+
+        Returns:
+            Whichever response arrived first; the other is closed when it lands
+        """
+        self.stats["requests"] += 1
+        if not self.policy.hedge:
+            return self._get(url, headers)
+
+        primary = self._executor.submit(self._get, url, headers)
+        done, _ = wait([primary], timeout=self.hedge_delay(urlparse(url).netloc))
+        if done or self.stats["hedged"] >= self.policy.hedge_budget * self.stats["requests"]:
+            return primary.result()
+
+        self.stats["hedged"] += 1
+        logger.debug(f"Hedging slow download: {url[:80]}")
+        hedge = self._executor.submit(self._get, url, headers)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self.stats["hedge_wins"] += 1
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+        # Both failed; report the original request's error
+        return primary.result()
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retrying a failed attempt"""
+        retry_after = retry_after_of(error)
+        if retry_after is not None:
+            return min(retry_after, self.policy.backoff_cap)
+        # Exponential backoff with "equal jitter" to spread retries out
+        delay = min(self.policy.backoff_cap, self.policy.backoff_base * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def fetch(self, url: str, dest: BinaryIO, max_bytes: int | None = None) -> int:
+        """
+        Download a URL into an open, writable and seekable binary file
+
+        Args:
+            url: URL to download
+            dest: File the body is written to from its current start
+            max_bytes: Refuse bodies larger than this
+
+        Returns:
+            Number of bytes written
+
+        Raises:
+            requests.RequestException: If the download failed for good
+            ValueError: If the body exceeds max_bytes
+        """
+        received = 0
+        validator = None
+        attempt = 0
+        while True:
+            headers = {}
+            if received:
+                headers["Range"] = f"bytes={received}-"
+                if validator:
+                    # Serve the whole file instead if it changed in between
+                    headers["If-Range"] = validator
+            try:
+                response = self._open(url, headers)
+                try:
+                    response.raise_for_status()
+                    if received and _resumes_at(response, received):
+                        self.stats["resumed"] += 1
+                    elif received:
+                        # The server ignored the range; start the file over
+                        dest.seek(0)
+                        dest.truncate()
+                        received = 0
+                    if not received:
+                        validator = _validator(response)
+
+                    for chunk in response.iter_content(chunk_size=self.policy.chunk_size):
+                        if max_bytes is not None and received + len(chunk) > max_bytes:
+                            raise ValueError(f"Download exceeds {max_bytes} bytes")
+                        dest.write(chunk)
+                        received += len(chunk)
+                finally:
+                    response.close()
+            except Exception as e:
+                attempt += 1
+                if not is_retryable(e) or attempt >= self.policy.max_attempts:
+                    self.stats["failed"] += 1
+                    raise
+                delay = self.backoff(attempt - 1, e)
+                self.stats["retries"] += 1
+                logger.info(
+                    f"Retrying download in {delay:.2f}s after {e} "
+                    f"(attempt {attempt + 1}, {received} bytes kept)"
+                )
+                time.sleep(delay)
+            else:
+                self.stats["downloads"] += 1
+                return received
+
+    def get_statistics(self) -> dict:
+        """Get downloader statistics"""
+        return self.stats.copy()
+
+
+# Global downloader; hedge thresholds are learned across all generators
+downloader = Downloader(
+    DownloadPolicy(max_attempts=config.download_retries + 1, hedge=config.download_hedging)
+)
@@ -0,0 +1,467 @@
+"""Perceptual-hash index for finding duplicate and near-duplicate images
+
+Each image gets two 64-bit fingerprints computed with NumPy: a difference
+hash (dHash, horizontal gradients of a 9x8 thumbnail) and a DCT hash
+(pHash, low frequencies of a 32x32 thumbnail). pHash values are stored in
+a BK-tree, so a Hamming-radius query only visits the branches that can
+contain a match instead of comparing against every image.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from .config import config
+from .derivatives import IMAGE_EXTENSIONS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bits per side of the hash grid (8 -> 64-bit hashes)
+HASH_SIZE = 8
+
+# Thumbnail side for pHash; the DCT keeps the top-left HASH_SIZE x HASH_SIZE block
+PHASH_SAMPLE = 32
+
+# Largest pHash and dHash distance at which two images count as duplicates
+DUPLICATE_DISTANCE = 4
+
+# Default radius for "something like this" queries
+SIMILAR_DISTANCE = 12
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so dct2(x) == D @ x @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+_DCT = _dct_matrix(PHASH_SAMPLE)
+
+
+def _pack(bits: np.ndarray) -> int:
+    """Pack a boolean array into an integer, first element most significant"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _grayscale(img: Image.Image, size: tuple[int, int]) -> np.ndarray:
+    """Downscale an image to a float32 luminance array of shape (height, width)"""
+    # Decoders that support it (JPEG) can skip straight to a reduced scale
+    img.draft("L", (size[0] * 4, size[1] * 4))
+    gray = img.convert("L").resize(size, Image.LANCZOS)
+    return np.asarray(gray, dtype=np.float32)
+
+
+def dhash(img: Image.Image) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair
+
+    Args:
+        img: Source image
+
+    Returns:
+        64-bit hash as an integer
+    """
+    pixels = _grayscale(img, (HASH_SIZE + 1, HASH_SIZE))
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(img: Image.Image) -> int:
+    """
+    DCT hash: one bit per low-frequency coefficient above the median
+
+    Args:
+        img: Source image
+
+    Returns:
+        64-bit hash as an integer
+    """
+    pixels = _grayscale(img, (PHASH_SAMPLE, PHASH_SAMPLE))
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    # The DC term only encodes overall brightness, keep it out of the median
+    median = np.median(low.ravel()[1:])
+    return _pack(low > median)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+@dataclass(frozen=True)
+class ImageHash:
+    """Perceptual fingerprints of one image"""
+
+    phash: int
+    dhash: int
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "ImageHash":
+        """Hash an image file"""
+        with Image.open(path) as img:
+            return cls(phash=phash(img), dhash=dhash(img))
+
+    def is_duplicate(self, other: "ImageHash", max_distance: int = DUPLICATE_DISTANCE) -> bool:
+        """Whether both hashes agree that two images look the same"""
+        return (
+            hamming(self.phash, other.phash) <= max_distance
+            and hamming(self.dhash, other.dhash) <= max_distance
+        )
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance
+
+    Every child edge is labelled with its distance to the parent, so by the
+    triangle inequality a query of radius r at distance d from a node only
+    descends into edges labelled d - r .. d + r.
+    """
+
+    def __init__(self):
+        """Initialize an empty tree"""
+        # Node layout: [hash, keys, {distance: child}]
+        self._root: list | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, key: str) -> None:
+        """Insert a key under a hash; equal hashes share one node"""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [key], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def remove(self, value: int, key: str) -> bool:
+        """
+        Remove a key; its node stays behind to keep routing the subtree
+
+        Returns:
+            True if the key was present
+        """
+        node = self._root
+        while node is not None:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                if key in node[1]:
+                    node[1].remove(key)
+                    self._size -= 1
+                    return True
+                return False
+            node = node[2].get(distance)
+        return False
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, str]]:
+        """
+        Find keys within a Hamming radius
+
+        Args:
+            value: Query hash
+            max_distance: Inclusive radius
+
+        Returns:
+            (distance, key) pairs sorted by distance
+        """
+        results = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, key) for key in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for edge, child in node[2].items() if low <= edge <= high)
+        return sorted(results)
+
+
+class ImageHashIndex:
+    """Persistent perceptual-hash index over the generated images"""
+
+    def __init__(self, index_file: str | Path):
+        """
+        Initialize image hash index
+
+        Args:
+            index_file: JSON file the hashes are persisted to
+        """
+        self.index_file = Path(index_file)
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict] = {}
+        self._tree = BKTree()
+
+        # Statistics
+        self.stats = {
+            "indexed": 0,
+            "duplicates": 0,
+            "failed": 0,
+        }
+
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return self._key(path) in self._entries
+
+    @staticmethod
+    def _key(path: str | Path) -> str:
+        """Index key of a file"""
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _hash_of(entry: dict) -> ImageHash:
+        """Decode the hashes stored in an entry"""
+        return ImageHash(phash=int(entry["phash"], 16), dhash=int(entry["dhash"], 16))
+
+    def _load(self) -> None:
+        """Load persisted hashes, if any"""
+        if not self.index_file.exists():
+            return
+        try:
+            with open(self.index_file) as f:
+                entries = json.load(f)
+            for key, entry in entries.items():
+                self._entries[key] = entry
+                self._tree.add(self._hash_of(entry).phash, key)
+        except Exception as e:
+            logger.warning(f"Failed to load image index: {e}")
+
+    def _save(self) -> None:
+        """Persist the index atomically"""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(f"{self.index_file.name}.tmp")
+            with open(tmp_file, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logger.warning(f"Failed to save image index: {e}")
+
+    def _insert(self, key: str, image_hash: ImageHash, stat: os.stat_result) -> None:
+        """Add or replace one entry (caller holds the lock)"""
+        previous = self._entries.get(key)
+        if previous is not None:
+            self._tree.remove(self._hash_of(previous).phash, key)
+        self._entries[key] = {
+            "phash": f"{image_hash.phash:016x}",
+            "dhash": f"{image_hash.dhash:016x}",
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        self._tree.add(image_hash.phash, key)
+        self.stats["indexed"] += 1
+
+    def _is_current(self, key: str, stat: os.stat_result) -> bool:
+        """Whether the stored hash still matches the file on disk"""
+        entry = self._entries.get(key)
+        return (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        )
+
+    def _index_file(self, path: str) -> tuple[ImageHash | None, bool]:
+        """
+        Hash a file unless its stored hash is current (without saving)
+
+        Returns:
+            (hashes or None on failure, whether the index changed)
+        """
+        key = self._key(path)
+        try:
+            stat = os.stat(path)
+            with self._lock:
+                if self._is_current(key, stat):
+                    return self._hash_of(self._entries[key]), False
+            image_hash = ImageHash.from_file(path)
+        except Exception as e:
+            logger.error(f"Error hashing image {path}: {e}")
+            self.stats["failed"] += 1
+            return None, False
+
+        with self._lock:
+            self._insert(key, image_hash, stat)
+        return image_hash, True
+
+    def add(self, path: str) -> ImageHash | None:
+        """
+        Hash an image and add it to the index
+
+        Args:
+            path: Image file
+
+        Returns:
+            The image's hashes, or None if it could not be read
+        """
+        image_hash, changed = self._index_file(path)
+        if changed:
+            with self._lock:
+                self._save()
+        return image_hash
+
+    def remove(self, path: str) -> bool:
+        """Drop an image from the index; returns True if it was indexed"""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._tree.remove(self._hash_of(entry).phash, key)
+            self._save()
+        return True
+
+    def search(
+        self, image_hash: ImageHash, max_distance: int = SIMILAR_DISTANCE, limit: int | None = None
+    ) -> list[tuple[str, int]]:
+        """
+        Find indexed images within a pHash distance
+
+        Args:
+            image_hash: Query hashes
+            max_distance: Inclusive Hamming radius (0-64)
+            limit: Maximum number of matches
+
+        Returns:
+            (path, distance) pairs, closest first
+        """
+        with self._lock:
+            matches = self._tree.search(image_hash.phash, max_distance)
+        results = [(key, distance) for distance, key in matches]
+        return results[:limit] if limit else results
+
+    def find_similar(
+        self, path: str, max_distance: int = SIMILAR_DISTANCE, limit: int | None = 10
+    ) -> list[tuple[str, int]]:
+        """
+        Find images that look like a given file, excluding the file itself
+
+        Args:
+            path: Query image (indexed on the fly if needed)
+            max_distance: Inclusive Hamming radius (0-64)
+            limit: Maximum number of matches
+
+        Returns:
+            (path, distance) pairs, closest first
+        """
+        image_hash = self.add(path)
+        if image_hash is None:
+            return []
+        key = self._key(path)
+        matches = [match for match in self.search(image_hash, max_distance) if match[0] != key]
+        return matches[:limit] if limit else matches
+
+    def find_duplicate(self, path: str, image_hash: ImageHash | None = None) -> str | None:
+        """
+        Find an existing indexed image that is a duplicate of a file
+
+        Args:
+            path: Image file to check
+            image_hash: Its hashes, if already computed
+
+        Returns:
+            Path of the closest duplicate still on disk, or None
+        """
+        if image_hash is None:
+            try:
+                image_hash = ImageHash.from_file(path)
+            except Exception as e:
+                logger.error(f"Error hashing image {path}: {e}")
+                self.stats["failed"] += 1
+                return None
+
+        key = self._key(path)
+        with self._lock:
+            for candidate, _ in self.search(image_hash, DUPLICATE_DISTANCE):
+                entry = self._entries.get(candidate)
+                if (
+                    candidate != key
+                    and entry is not None
+                    and image_hash.is_duplicate(self._hash_of(entry))
+                    and os.path.exists(candidate)
+                ):
+                    return candidate
+        return None
+
+    def dedupe(self, path: str) -> str:
+        """
+        Store a new image only if nothing like it exists yet
+
+        When a duplicate is already indexed the new file is deleted and the
+        existing one is returned; otherwise the new file is indexed.
+
+        Args:
+            path: Newly written image file
+
+        Returns:
+            Path of the file to use for this image
+        """
+        try:
+            image_hash = ImageHash.from_file(path)
+        except Exception as e:
+            logger.error(f"Error hashing image {path}: {e}")
+            self.stats["failed"] += 1
+            return path
+
+        with self._lock:
+            duplicate = self.find_duplicate(path, image_hash)
+            if duplicate is None:
+                self._insert(self._key(path), image_hash, os.stat(path))
+                self._save()
+                return path
+
+        os.remove(path)
+        self.stats["duplicates"] += 1
+        logger.info(f"Duplicate image {os.path.basename(path)} -> {os.path.basename(duplicate)}")
+        return duplicate
+
+    def sync(self, directory: str) -> int:
+        """
+        Index new or changed images in a directory and drop deleted ones
+
+        Args:
+            directory: Directory scanned (non-recursively) for images
+
+        Returns:
+            Number of images hashed
+        """
+        hashed = 0
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+                    hashed += self._index_file(path)[1]
+
+        with self._lock:
+            missing = [key for key in self._entries if not os.path.exists(key)]
+            for key in missing:
+                self._tree.remove(self._hash_of(self._entries.pop(key)).phash, key)
+            if hashed or missing:
+                self._save()
+        return hashed
+
+
+# Global image index instance
+image_index = ImageHashIndex(os.path.join(config.output_dir, "image_index.json"))
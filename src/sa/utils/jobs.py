@@ -0,0 +1,115 @@
+"""In-memory job progress tracking for long-running generations"""
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+# Job states after which no more updates are expected
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class JobTracker:
+    """Thread-safe registry of job progress, readable by API streams"""
+
+    def __init__(self, max_jobs: int = 1000):
+        """
+        Initialize job tracker
+
+        Args:
+            max_jobs: Maximum number of jobs to remember (oldest finished are evicted)
+        """
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, kind: str = "video") -> dict[str, Any]:
+        """
+        Register a new job
+
+        Args:
+            job_id: Unique job identifier
+            kind: Job type (video, audio, ...)
+
+        Returns:
+            Initial job state
+        """
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "message": None,
+            "progress": {},
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+            "version": 0,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._evict()
+            return job.copy()
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """
+        Update job fields (status, message, progress, result)
+
+        Args:
+            job_id: Job identifier
+            **fields: Fields to update
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            job["version"] += 1
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Get a snapshot of job state"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job, progress=dict(job["progress"])) if job else None
+
+    def _evict(self) -> None:
+        """Drop the oldest finished jobs once the registry is full"""
+        if len(self._jobs) <= self.max_jobs:
+            return
+        finished = sorted(
+            (j for j in self._jobs.values() if j["status"] in TERMINAL_STATUSES),
+            key=lambda j: j["updated_at"],
+        )
+        for job in finished[: len(self._jobs) - self.max_jobs]:
+            del self._jobs[job["job_id"]]
+
+    async def stream(
+        self, job_id: str, poll_interval: float = 0.25
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Yield job snapshots whenever they change, until the job finishes
+
+        Args:
+            job_id: Job identifier
+            poll_interval: Seconds between state checks
+
+        Yields:
+            Job state snapshots
+        """
+        last_version = -1
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            if job["version"] != last_version:
+                last_version = job["version"]
+                yield job
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(poll_interval)
+
+
+# Global job tracker instance
+job_tracker = JobTracker()
@@ -0,0 +1,415 @@
+"""Latency-aware routing between interchangeable AI backends
+
+A ``ModelRouter`` holds several backends that can serve the same kind of
+request (for example Replicate Flux and DALL-E for images). For each one it
+keeps a latency moving average and its recent error rate. Requests are routed
+to the fastest healthy backend and fail over to the next one on errors.
+
+A circuit breaker takes a backend out of rotation after repeated failures.
+It is probed again after a cooldown that doubles with each further trip, so
+traffic drains away from a degrading vendor and returns once it recovers.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any
+
+from .ai_models import ModelFactory
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in a backend's latency moving average
+LATENCY_ALPHA = 0.2
+
+# Recent outcomes kept per backend to compute its error rate
+OUTCOME_WINDOW = 20
+
+# Circuit breaker: trip on this error rate (once enough outcomes are known)
+# or on this many failures in a row
+MAX_ERROR_RATE = 0.5
+MIN_OUTCOMES = 5
+MAX_CONSECUTIVE_FAILURES = 3
+
+# Seconds a tripped backend is skipped; doubles on each trip that follows a probe
+COOLDOWN = 30.0
+MAX_COOLDOWN = 300.0
+
+# Share of requests sent to a random healthy backend to keep its stats fresh
+EXPLORE_RATE = 0.05
+
+# Ordered quality levels and latency estimates from the ModelFactory catalogue
+QUALITY_LEVELS = ("Good", "High", "Very High")
+SPEED_LATENCY = {"Fast": 5.0, "Medium": 15.0, "Slow": 60.0}
+
+
+class RoutingError(Exception):
+    """No backend could serve a request"""
+
+
+class RequestRejected(ValueError):
+    """A backend refused the request itself, which says nothing about its health"""
+
+
+@dataclass(frozen=True)
+class RoutingHints:
+    """Per-request service-level hints"""
+
+    provider: str | None = None  # backend to try first while it is healthy
+    max_latency: float | None = None  # seconds; backends expected to be slower go last
+    max_cost: int | None = None  # cost tier, 1 ($) to 3 ($$$)
+    min_quality: str | None = None  # one of QUALITY_LEVELS
+
+
+@dataclass(frozen=True)
+class Routed:
+    """A result together with the backend that produced it"""
+
+    result: Any
+    backend: str
+    latency: float
+
+
+class Backend:
+    """One provider model with its health statistics"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        cost: int = 2,
+        quality: str = "High",
+        expected_latency: float = 15.0,
+        returns_future: bool = False,
+        enabled: Callable[[], bool] | None = None,
+    ):
+        """
+        Initialize backend
+
+        Args:
+            name: Backend name shown in responses and statistics
+            fn: Call that serves a request; a falsy result counts as a failure,
+                raising RequestRejected does not
+            cost: Cost tier, 1 ($) to 3 ($$$)
+            quality: One of QUALITY_LEVELS
+            expected_latency: Seconds assumed until real latencies are measured
+            returns_future: fn returns a Future instead of blocking
+            enabled: Whether the backend is configured right now (default: always)
+        """
+        self.name = name
+        self.fn = fn
+        self.cost = cost
+        self.quality = quality
+        self.returns_future = returns_future
+        self.enabled = enabled or (lambda: True)
+
+        self.latency = expected_latency
+        self.outcomes: deque[bool] = deque(maxlen=OUTCOME_WINDOW)
+        self.consecutive_failures = 0
+        self.cooldown = COOLDOWN
+        self.open_until = 0.0
+        self.disabled = False
+
+        # Statistics
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "rejected": 0,
+            "trips": 0,
+        }
+
+    @classmethod
+    def from_factory(
+        cls,
+        model_type: str,
+        model_name: str,
+        api_key: str,
+        adapter: Callable[[Any, dict], Callable[..., Any]] | None = None,
+    ) -> "Backend":
+        """
+        Backend for a ModelFactory model, described by its catalogue entry
+
+        Args:
+            model_type: Type of model (image/audio/video)
+            model_name: ModelFactory model name
+            api_key: API key for the provider
+            adapter: Builds the request function from the generator and its
+                model info; defaults to the generator's ``generate``
+
+        Returns:
+            Backend instance
+
+        Raises:
+            ValueError: If the model type or name is not supported
+        """
+        creators = {
+            "image": ModelFactory.create_image_generator,
+            "audio": ModelFactory.create_audio_generator,
+            "video": ModelFactory.create_video_generator,
+        }
+        if model_type not in creators:
+            raise ValueError(
+                f"Unsupported model type: {model_type}. Available: {list(creators.keys())}"
+            )
+        generator = creators[model_type](model_name, api_key)
+        info = ModelFactory.get_model_info(model_type, model_name)
+        return cls(
+            model_name,
+            adapter(generator, info) if adapter else generator.generate,
+            cost=len(info.get("cost", "$$")),
+            quality=info.get("quality", "High"),
+            expected_latency=SPEED_LATENCY.get(info.get("speed", "Medium"), 15.0),
+        )
+
+    @property
+    def error_rate(self) -> float:
+        """Share of recent requests that failed"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the breaker is closed, or its cooldown has passed and it may be probed"""
+        return time.monotonic() >= self.open_until
+
+    def record_success(self, latency: float) -> None:
+        """Fold a successful request into the moving averages"""
+        self.latency += LATENCY_ALPHA * (latency - self.latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.open_until:
+            logger.info(f"Backend {self.name} recovered")
+            self.open_until = 0.0
+            self.cooldown = COOLDOWN
+
+    def record_failure(self) -> None:
+        """Count a failed request and trip the breaker if the backend looks down"""
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.stats["failures"] += 1
+
+        probing = self.open_until > 0
+        tripped = self.consecutive_failures >= MAX_CONSECUTIVE_FAILURES or (
+            len(self.outcomes) >= MIN_OUTCOMES and self.error_rate >= MAX_ERROR_RATE
+        )
+        if probing or tripped:
+            if probing:
+                # Failed again while tripped (e.g. the probe after a cooldown); back off further
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self.open_until = time.monotonic() + self.cooldown
+            self.stats["trips"] += 1
+            logger.warning(
+                f"Backend {self.name} unhealthy (error rate {self.error_rate:.0%}); "
+                f"skipping it for {self.cooldown:.0f}s"
+            )
+
+    def snapshot(self) -> dict:
+        """Current health figures for monitoring"""
+        return {
+            "latency": round(self.latency, 3),
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.healthy and not self.disabled,
+            "enabled": self.enabled() and not self.disabled,
+            "cost": self.cost,
+            "quality": self.quality,
+            **self.stats,
+        }
+
+
+class ModelRouter:
+    """Send each request to the fastest healthy backend, failing over on errors"""
+
+    def __init__(
+        self,
+        model_type: str,
+        backends: list[Backend] | None = None,
+        explore_rate: float = EXPLORE_RATE,
+    ):
+        """
+        Initialize router
+
+        Args:
+            model_type: Type of model served (image/audio/video), used in messages
+            backends: Initial backends
+            explore_rate: Share of requests routed to a random healthy backend
+        """
+        self.model_type = model_type
+        self.explore_rate = explore_rate
+        self.backends: list[Backend] = []
+        self._lock = threading.Lock()
+        for backend in backends or []:
+            self.add(backend)
+
+    @classmethod
+    def from_factory(
+        cls,
+        model_type: str,
+        api_keys: dict[str, str | None],
+        adapter: Callable[[Any, dict], Callable[..., Any]] | None = None,
+    ) -> "ModelRouter":
+        """
+        Router over every ModelFactory model whose provider has an API key
+
+        Args:
+            model_type: Type of model (image/audio/video)
+            api_keys: API key per provider name, as in the model info ("OpenAI")
+            adapter: Passed on to Backend.from_factory
+
+        Returns:
+            ModelRouter instance
+        """
+        router = cls(model_type)
+        for model_name in ModelFactory.list_available_models().get(model_type, []):
+            provider = ModelFactory.get_model_info(model_type, model_name)["provider"]
+            if api_keys.get(provider):
+                router.add(
+                    Backend.from_factory(model_type, model_name, api_keys[provider], adapter)
+                )
+        return router
+
+    def add(self, backend: Backend) -> None:
+        """Register a backend, replacing one with the same name"""
+        with self._lock:
+            self.backends = [b for b in self.backends if b.name != backend.name] + [backend]
+
+    def __len__(self) -> int:
+        return len(self.enabled_backends())
+
+    def enabled_backends(self) -> list[Backend]:
+        """Backends that are configured and implemented"""
+        return [b for b in self.backends if not b.disabled and b.enabled()]
+
+    def candidates(self, hints: RoutingHints | None = None) -> list[Backend]:
+        """
+        Backends in the order they should be tried
+
+        Healthy backends come first, fastest first. Those expected to miss
+        ``max_latency`` go after those that meet it, and ``provider`` goes to
+        the front. Tripped backends are kept as a last resort.
+
+        Args:
+            hints: Per-request service-level hints
+
+        Returns:
+            Ordered list of backends
+
+        Raises:
+            RoutingError: If no enabled backend satisfies the cost and quality hints
+        """
+        hints = hints or RoutingHints()
+        eligible = [
+            b
+            for b in self.enabled_backends()
+            if (hints.max_cost is None or b.cost <= hints.max_cost)
+            and (
+                hints.min_quality is None
+                or QUALITY_LEVELS.index(b.quality) >= QUALITY_LEVELS.index(hints.min_quality)
+            )
+        ]
+        if not eligible:
+            raise RoutingError(f"No {self.model_type} backend matches {hints}")
+
+        healthy = sorted(
+            (b for b in eligible if b.healthy),
+            key=lambda b: (
+                hints.max_latency is not None and b.latency > hints.max_latency,
+                b.latency,
+            ),
+        )
+        tripped = sorted((b for b in eligible if not b.healthy), key=lambda b: b.open_until)
+
+        preferred = [b for b in healthy if b.name == hints.provider]
+        if preferred:
+            healthy.remove(preferred[0])
+            healthy.insert(0, preferred[0])
+        elif len(healthy) > 1 and random.random() < self.explore_rate:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + tripped
+
+    def _finish(self, backend: Backend, start: float, error: BaseException | None) -> None:
+        """Record the outcome of one attempt"""
+        with self._lock:
+            backend.stats["requests"] += 1
+            if error is None:
+                backend.record_success(time.monotonic() - start)
+            elif isinstance(error, NotImplementedError):
+                # Placeholder integrations never work; stop routing to them
+                backend.disabled = True
+                logger.warning(f"Backend {backend.name} is not implemented; disabled")
+            elif isinstance(error, RequestRejected):
+                # Bad input must not trip the breaker for every other caller
+                backend.stats["rejected"] += 1
+                logger.info(f"Backend {backend.name} rejected the request ({error})")
+            else:
+                backend.record_failure()
+                logger.warning(f"Backend {backend.name} failed ({error}); failing over")
+
+    def call(self, *args: Any, hints: RoutingHints | None = None, **kwargs: Any) -> Routed:
+        """
+        Serve a request from the best backend, blocking until done
+
+        Args:
+            *args: Positional arguments for the backend call
+            hints: Per-request service-level hints
+            **kwargs: Keyword arguments for the backend call
+
+        Returns:
+            The first successful result and the backend that produced it
+
+        Raises:
+            RoutingError: If every candidate backend failed
+        """
+        errors = []
+        for backend in self.candidates(hints):
+            start = time.monotonic()
+            try:
+                result = backend.fn(*args, **kwargs)
+                if backend.returns_future:
+                    result = result.result()
+                if not result:
+                    raise RoutingError(f"{backend.name} returned no result")
+            except Exception as e:
+                self._finish(backend, start, e)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self._finish(backend, start, None)
+            return Routed(result, backend.name, time.monotonic() - start)
+        raise RoutingError(f"All {self.model_type} backends failed: {'; '.join(errors)}")
+
+    async def acall(self, *args: Any, hints: RoutingHints | None = None, **kwargs: Any) -> Routed:
+        """
+        Serve a request from the best backend without blocking the event loop
+
+        Backends returning futures are awaited directly; blocking ones run
+        in a worker thread. Arguments and errors are as for ``call``.
+        """
+        errors = []
+        for backend in self.candidates(hints):
+            start = time.monotonic()
+            try:
+                if backend.returns_future:
+                    future: Future = backend.fn(*args, **kwargs)
+                    result = await asyncio.wrap_future(future)
+                else:
+                    result = await asyncio.to_thread(backend.fn, *args, **kwargs)
+                if not result:
+                    raise RoutingError(f"{backend.name} returned no result")
+            except Exception as e:
+                self._finish(backend, start, e)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self._finish(backend, start, None)
+            return Routed(result, backend.name, time.monotonic() - start)
+        raise RoutingError(f"All {self.model_type} backends failed: {'; '.join(errors)}")
+
+    def get_statistics(self) -> dict[str, dict]:
+        """Health figures of every backend"""
+        return {backend.name: backend.snapshot() for backend in self.backends}
@@ -0,0 +1,381 @@
+"""Adaptive rate limiting and concurrency control for provider API calls
+
+Every provider credential gets one shared ``AdaptiveLimiter``, which
+combines:
+
+- a token bucket capping the request rate, and
+- an AIMD concurrency window. The window grows by about one slot per
+  window's worth of successes. It is cut multiplicatively on a 429 or
+  5xx, at most once per cooldown, so one burst of rejections counts as
+  a single congestion signal.
+
+A ``Retry-After`` on a throttled response pauses new requests on that
+credential until the provider is ready. Calls go through ``call()``,
+which retries throttled or overloaded requests, dropped connections and
+timeouts with jittered backoff.
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses that mean "slow down" rather than "this request is wrong"
+OVERLOAD_STATUSES = (429, 500, 502, 503, 504, 529)
+
+# Exception classes (matched by name, so no SDK is imported) for requests that
+# never got a response: dropped connections and timeouts, worth retrying
+TRANSPORT_ERRORS = frozenset({"APIConnectionError", "TransportError", "ConnectionError", "Timeout"})
+
+# Multiplicative decrease applied to the concurrency window on overload
+DECREASE_FACTOR = 0.7
+
+# Seconds after a decrease during which further overload signals are ignored
+DECREASE_COOLDOWN = 1.0
+
+# Retries of throttled or overloaded calls, and their backoff in seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Longest Retry-After honoured; longer values are clamped
+MAX_RETRY_AFTER = 120.0
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Starting limits for one provider"""
+
+    rate: float  # sustained requests per second
+    burst: int  # token bucket capacity
+    max_concurrency: int
+    initial_concurrency: int = 2
+    min_concurrency: int = 1
+
+
+# Conservative defaults; AIMD grows concurrency up to the provider's real limit
+PROVIDER_LIMITS: dict[str, RateLimit] = {
+    # Creating predictions (600/min) and everything else (3000/min) are metered separately
+    "replicate": RateLimit(rate=10.0, burst=20, max_concurrency=32, initial_concurrency=8),
+    "replicate_reads": RateLimit(rate=50.0, burst=50, max_concurrency=32, initial_concurrency=16),
+    "openai": RateLimit(rate=5.0, burst=10, max_concurrency=16, initial_concurrency=4),
+    "elevenlabs": RateLimit(rate=3.0, burst=5, max_concurrency=5, initial_concurrency=2),
+}
+
+
+def status_of(error: BaseException) -> int | None:
+    """HTTP status carried by a provider SDK or httpx/requests exception"""
+    for attr in ("status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """Whether an SDK, httpx or requests exception means the request never got a response"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__)
+
+
+def retry_after_of(error: BaseException) -> float | None:
+    """
+    Seconds to wait according to an error's response headers
+
+    Understands ``retry-after-ms``, ``Retry-After`` in seconds and
+    ``Retry-After`` as an HTTP date.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+
+    try:
+        if headers.get("retry-after-ms"):
+            return min(float(headers["retry-after-ms"]) / 1000, MAX_RETRY_AFTER)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """Token bucket plus AIMD concurrency window shared by all callers of one credential"""
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        initial_concurrency: int = 2,
+        min_concurrency: int = 1,
+        max_retries: int = MAX_RETRIES,
+    ):
+        """
+        Initialize adaptive limiter
+
+        Args:
+            name: Label used in logs (provider name)
+            rate: Sustained requests per second
+            burst: Requests that may start back to back after an idle period
+            max_concurrency: Upper bound of the concurrency window
+            initial_concurrency: Starting concurrency window
+            min_concurrency: Lower bound of the concurrency window
+            max_retries: Retries of throttled or overloaded calls in ``call()``
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._decreased_at = -math.inf
+
+        # Statistics
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "errors": 0,
+        }
+
+    @classmethod
+    def for_provider(cls, provider: str) -> "AdaptiveLimiter":
+        """Limiter with a provider's default limits"""
+        if provider not in PROVIDER_LIMITS:
+            raise ValueError(
+                f"Unsupported provider: {provider}. Available: {list(PROVIDER_LIMITS.keys())}"
+            )
+        limits = PROVIDER_LIMITS[provider]
+        return cls(
+            provider,
+            rate=limits.rate,
+            burst=limits.burst,
+            max_concurrency=limits.max_concurrency,
+            initial_concurrency=limits.initial_concurrency,
+            min_concurrency=limits.min_concurrency,
+        )
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current size of the concurrency window"""
+        return max(self.min_concurrency, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot"""
+        return self._in_flight
+
+    # ----- admission -----
+
+    def _try_acquire(self) -> float:
+        """
+        Take a slot and a token if both are available (caller holds the lock)
+
+        Returns:
+            0 on success, otherwise seconds until it is worth trying again
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._in_flight >= self.concurrency_limit:
+            # Woken by release(); the timeout only guards against missed wakeups
+            return 1.0
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        self._tokens -= 1
+        self._in_flight += 1
+        self.stats["requests"] += 1
+        return 0.0
+
+    def acquire(self, timeout: float | None = None) -> None:
+        """
+        Block until the request may start
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Raises:
+            TimeoutError: If no slot became available in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"{self.name} rate limiter: no slot available")
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until the request may start"""
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+            if wait == 0:
+                return
+            # Slot releases don't wake coroutines, so re-check at least this often
+            await asyncio.sleep(min(wait, 0.05))
+
+    def release(self, error: BaseException | None = None) -> None:
+        """
+        Return a slot and feed the outcome into the AIMD window
+
+        Args:
+            error: The exception the request failed with, if any
+        """
+        status = status_of(error) if error is not None else None
+        with self._cond:
+            self._in_flight -= 1
+            if error is None:
+                # Additive increase: about one slot per window of successes
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            elif status in OVERLOAD_STATUSES:
+                self._on_overload(status, retry_after_of(error))
+            else:
+                self.stats["errors"] += 1
+            self._cond.notify_all()
+
+    def _on_overload(self, status: int, retry_after: float | None) -> None:
+        """Shrink the window and honour Retry-After (caller holds the lock)"""
+        now = time.monotonic()
+        self.stats["throttled"] += 1
+        if now - self._decreased_at >= DECREASE_COOLDOWN:
+            self._limit = max(self.min_concurrency, self._limit * DECREASE_FACTOR)
+            self._decreased_at = now
+            logger.warning(
+                f"{self.name} returned {status}; concurrency limit now {self.concurrency_limit}"
+            )
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+            # Resume gently instead of releasing a full burst at once
+            self._tokens = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of a block, e.g. while streaming a response"""
+        self.acquire()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # A caller abandoning the block (GeneratorExit) is not a provider error
+            self.release(error)
+
+    # ----- calls with retry -----
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retrying a throttled call"""
+        retry_after = retry_after_of(error)
+        if retry_after is not None:
+            # acquire() already waits out the provider's pause
+            return 0.0
+        # Exponential backoff with "equal jitter" to spread retries out
+        delay = min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a provider call under the limiter, retrying 429s, 5xx and transport errors
+
+        Args:
+            fn: Provider call
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            The last exception once retries are exhausted, or any
+            non-retryable exception immediately
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.release(e)
+                retryable = status_of(e) in OVERLOAD_STATUSES or is_transport_error(e)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                self.stats["retries"] += 1
+                logger.info(f"Retrying {self.name} call in {delay:.1f}s (attempt {attempt})")
+                time.sleep(delay)
+            else:
+                self.release()
+                return result
+
+
+_limiters: dict[tuple[str, str], AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, credential: str | None = None) -> AdaptiveLimiter:
+    """
+    Shared limiter for a provider credential
+
+    Limits are enforced per API key, since that is what providers meter;
+    keys are only kept as a hash.
+
+    Args:
+        provider: One of PROVIDER_LIMITS
+        credential: API key or token (None for anonymous use)
+
+    Returns:
+        The process-wide limiter for this provider and credential
+
+    Raises:
+        ValueError: If the provider is not supported
+    """
+    fingerprint = hashlib.sha256((credential or "").encode()).hexdigest()[:16]
+    key = (provider, fingerprint)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveLimiter.for_provider(provider)
+        return limiter
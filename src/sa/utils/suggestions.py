@@ -1,15 +1,14 @@
 """AI-powered suggestion system for content generation"""
 
+import importlib.util
 import os
 from typing import Any
 
-try:
-    from openai import OpenAI
+from .clients import get_client
+from .rate_limit import get_limiter
 
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None  # type: ignore
+# Checked without importing; the SDK is loaded when the first client is built
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
 
 class SuggestionEngine:
@@ -25,14 +24,19 @@ class SuggestionEngine:
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.client = None
         self._cache: dict[str, Any] = {}
+        self.limiter = get_limiter("openai", self.api_key)
 
         if self.api_key and OPENAI_AVAILABLE:
             try:
-                self.client = OpenAI(api_key=self.api_key)
+                self.client = get_client("openai", self.api_key)
             except Exception as e:
                 print(f"Failed to initialize OpenAI client: {e}")
                 self.client = None
 
+    def _chat(self, **kwargs: Any) -> Any:
+        """Create a chat completion under the shared OpenAI rate limiter"""
+        return self.limiter.call(self.client.chat.completions.create, **kwargs)
+
     def improve_prompt(self, prompt: str, content_type: str = "image") -> str:
         """
         Improve user prompt using AI
@@ -54,7 +58,7 @@ class SuggestionEngine:
             return self._fallback_improve(prompt, content_type)
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -108,7 +112,7 @@ class SuggestionEngine:
             return self._fallback_variations(prompt, count)
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -171,7 +175,7 @@ class SuggestionEngine:
             if not self.client:
                 return ["Continue the scene", "Fade to next location", "Close-up shot"]
 
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -215,7 +219,7 @@ class SuggestionEngine:
             if not self.client:
                 return {"mood": "neutral", "tempo": "medium", "genre": "ambient"}
 
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -266,7 +270,7 @@ class SuggestionEngine:
             if not self.client:
                 return self._fallback_script(idea, num_scenes)
 
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -372,7 +376,7 @@ class SuggestionEngine:
             return self._fallback_theme_prompt(theme, media_type)
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -423,7 +427,7 @@ class SuggestionEngine:
             return self._fallback_styles(media_type)
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -472,7 +476,7 @@ class SuggestionEngine:
             return [self._fallback_theme_prompt(theme, media_type) for _ in range(count)]
 
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
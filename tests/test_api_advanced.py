@@ -1,9 +1,13 @@
 """Advanced API endpoint tests to improve coverage"""
 
+import os
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+
 from sa.api import app
+from sa.generators.predictions import completed_future
 
 
 @pytest.fixture(scope="module")
@@ -18,8 +22,8 @@ class TestImageEndpoints:
     @patch("sa.api.routes.image_generator")
     def test_generate_image_with_guidance(self, mock_gen, client):
         """Test image generation with guidance scale"""
-        mock_gen.generate.return_value = ["http://example.com/image.jpg"]
-        mock_gen.download_image.return_value = True
+        mock_gen.submit.return_value = completed_future(["http://example.com/image.jpg"])
+        mock_gen.download_image.return_value = "outputs/img_job_0.webp"
 
         response = client.post(
             "/api/v1/images/generate",
@@ -35,6 +39,137 @@ class TestImageEndpoints:
         data = response.json()
         assert "job_id" in data
         assert data["status"] == "completed"
+        assert data["images"] == ["/api/v1/images/img_job_0.webp"]
+        assert data["provider"] == "replicate-flux-schnell"
+
+    @patch("sa.api.routes.image_generator")
+    def test_download_runs_off_event_loop(self, mock_gen, client):
+        """Test slow downloads run in a worker thread instead of on the event loop"""
+        import asyncio
+
+        def download(url, save_path, encoding=None):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return save_path
+
+        mock_gen.submit.return_value = completed_future(["http://example.com/image.jpg"])
+        mock_gen.download_image.side_effect = download
+
+        response = client.post("/api/v1/images/generate", json={"prompt": "beautiful sunset"})
+        assert response.json()["status"] == "completed"
+        mock_gen.download_image.assert_called_once()
+
+    @patch("sa.api.routes.image_index")
+    @patch("sa.api.routes.image_generator")
+    def test_dedupe_is_opt_in_and_off_event_loop(self, mock_gen, mock_index, client, monkeypatch):
+        """Test duplicates are only replaced when enabled, hashing in a worker thread"""
+        import asyncio
+
+        from sa.utils import config
+
+        def dedupe(path):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return "outputs/earlier.png"
+
+        mock_gen.submit.return_value = completed_future(["http://example.com/image.jpg"])
+        mock_gen.download_image.return_value = "outputs/img_job_0.png"
+        mock_index.dedupe.side_effect = dedupe
+        request = {"prompt": "beautiful sunset"}
+
+        monkeypatch.setattr(config, "dedupe_images", False)
+        assert client.post("/api/v1/images/generate", json=request).json()["images"] == [
+            "/api/v1/images/img_job_0.png"
+        ]
+        mock_index.dedupe.assert_not_called()
+
+        monkeypatch.setattr(config, "dedupe_images", True)
+        assert client.post("/api/v1/images/generate", json=request).json()["images"] == [
+            "/api/v1/images/earlier.png"
+        ]
+
+    @patch("sa.api.routes.image_generator")
+    def test_generate_image_routing_stats(self, mock_gen, client):
+        """Test a failing provider is reported as failed and shows up in routing stats"""
+        mock_gen.submit.return_value = completed_future([])
+
+        response = client.post("/api/v1/images/generate", json={"prompt": "beautiful sunset"})
+        assert response.json()["status"] == "failed"
+
+        stats = client.get("/api/v1/config/routing").json()["image"]
+        assert stats["replicate-flux-schnell"]["failures"] >= 1
+
+    @patch("sa.api.routes.image_generator")
+    def test_invalid_image_requests_keep_provider_healthy(self, mock_gen, client):
+        """Test locally rejected requests do not trip the provider's circuit breaker"""
+        for _ in range(3):
+            response = client.post(
+                "/api/v1/images/generate", json={"prompt": "cat", "width": 500, "height": 500}
+            )
+            assert response.json()["status"] == "failed"
+
+        mock_gen.submit.assert_not_called()
+        stats = client.get("/api/v1/config/routing").json()["image"]
+        assert stats["replicate-flux-schnell"]["healthy"] is True
+        assert stats["replicate-flux-schnell"]["rejected"] >= 3
+
+    @patch("sa.api.routes.image_generator")
+    def test_generate_image_with_format_override(self, mock_gen, client):
+        """Test encoding overrides are passed to the download"""
+        mock_gen.submit.return_value = completed_future(["http://example.com/image.png"])
+        mock_gen.download_image.return_value = "outputs/img_job_0.jpg"
+
+        response = client.post(
+            "/api/v1/images/generate",
+            json={"prompt": "beautiful sunset", "image_format": "jpeg", "quality": 70},
+        )
+        assert response.status_code == 200
+        encoding = mock_gen.download_image.call_args.kwargs["encoding"]
+        assert (encoding.image_format, encoding.quality) == ("jpeg", 70)
+
+        response = client.post(
+            "/api/v1/images/generate", json={"prompt": "beautiful sunset", "quality": 0}
+        )
+        assert response.status_code == 422
+
+    def test_get_image_thumbnail(self, client, tmp_path):
+        """Test ?size=thumb serves a cached JPEG derivative"""
+        from PIL import Image
+
+        from sa.utils import config
+
+        filename = f"thumb_test_{tmp_path.name}.png"
+        path = os.path.join(config.output_dir, filename)
+        Image.new("RGB", (1024, 512)).save(path)
+        try:
+            response = client.get(f"/api/v1/images/{filename}?size=thumb")
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "image/jpeg"
+
+            assert client.get(f"/api/v1/images/{filename}?size=huge").status_code == 422
+        finally:
+            client.delete(f"/api/v1/outputs/{filename}")
+
+    def test_find_similar_images(self, client, tmp_path):
+        """Test the similar-image lookup finds a resized copy"""
+        from PIL import Image
+
+        from sa.utils import config
+
+        base = Image.effect_noise((64, 64), 80).resize((512, 512))
+        names = [f"similar_{tmp_path.name}_{i}.png" for i in range(2)]
+        base.save(os.path.join(config.output_dir, names[0]))
+        base.resize((256, 256)).save(os.path.join(config.output_dir, names[1]))
+        try:
+            response = client.get(f"/api/v1/images/{names[0]}/similar?max_distance=6")
+            assert response.status_code == 200
+            matches = response.json()["matches"]
+            assert names[1] in [match["filename"] for match in matches]
+
+            assert client.get("/api/v1/images/missing.png/similar").status_code == 404
+        finally:
+            for name in names:
+                client.delete(f"/api/v1/outputs/{name}")
 
     def test_get_image_job_not_found(self, client):
         """Test getting non-existent image job"""
@@ -73,6 +208,84 @@ class TestVideoEndpoints:
         response = client.get("/api/v1/videos/jobs/nonexistent-id")
         assert response.status_code == 404
 
+    @patch("sa.api.routes.video_generator")
+    @patch("os.path.exists")
+    def test_submit_video_job_and_stream(self, mock_exists, mock_gen, client):
+        """Test background video job exposes status and SSE progress"""
+        mock_exists.return_value = True
+
+        def fake_slideshow(**kwargs):
+            kwargs["render_progress_callback"]({"frames": 24, "total_frames": 48})
+            return "outputs/video.mp4"
+
+        mock_gen.create_slideshow.side_effect = fake_slideshow
+
+        response = client.post(
+            "/api/v1/videos/jobs",
+            json={"image_paths": ["outputs/img1.png"], "render_profile": "draft"},
+        )
+        assert response.status_code == 202
+        data = response.json()
+        assert data["progress_url"].endswith("/events")
+
+        status = client.get(f"/api/v1/videos/jobs/{data['job_id']}").json()
+        assert status["status"] == "completed"
+        assert status["progress"]["frames"] == 24
+
+        events = client.get(data["progress_url"])
+        assert events.headers["content-type"].startswith("text/event-stream")
+        assert "event: completed" in events.text
+
+    def test_invalid_render_profile(self, client):
+        """Test unknown render profiles are rejected"""
+        response = client.post(
+            "/api/v1/videos/generate",
+            json={"image_paths": ["a.png"], "render_profile": "ultra"},
+        )
+        assert response.status_code == 422
+
+
+class TestPredictionEndpoints:
+    """Test text-to-video jobs and the Replicate webhook receiver"""
+
+    @patch("sa.api.routes.video_generator")
+    @patch("sa.api.routes.prediction_engine")
+    def test_text_to_video_job_completes_from_future(self, mock_engine, mock_gen, client):
+        """Test the job is queued immediately and completed by the prediction future"""
+        from concurrent.futures import Future
+
+        future = Future()
+        mock_gen.submit_from_text.return_value = future
+
+        response = client.post("/api/v1/videos/text", json={"prompt": "desert dunes at dusk"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert client.get(f"/api/v1/videos/jobs/{job_id}").json()["status"] == "processing"
+
+        future.set_result("https://replicate.delivery/video.mp4")
+        job = client.get(f"/api/v1/videos/jobs/{job_id}").json()
+        assert (job["status"], job["result"]) == (
+            "completed",
+            "https://replicate.delivery/video.mp4",
+        )
+
+    def test_replicate_webhook_checks_signature(self, client):
+        """Test unsigned deliveries are rejected, with or without a secret configured"""
+        import base64
+
+        from sa.generators.predictions import PredictionEngine
+
+        engine = PredictionEngine(webhook_secret="whsec_" + base64.b64encode(b"k" * 16).decode())
+        with patch("sa.api.routes.prediction_engine", engine):
+            response = client.post("/api/v1/webhooks/replicate", json={"id": "p1"})
+            assert response.status_code == 401
+
+        with patch("sa.api.routes.prediction_engine", PredictionEngine()):
+            response = client.post(
+                "/api/v1/webhooks/replicate", json={"id": "p1", "status": "succeeded"}
+            )
+            assert response.status_code == 401
+
 
 class TestAudioEndpoints:
     """Test audio generation endpoints"""
@@ -80,7 +293,7 @@ class TestAudioEndpoints:
     @patch("sa.api.routes.audio_generator")
     def test_generate_speech_with_voice(self, mock_gen, client):
         """Test speech generation with specific voice"""
-        mock_gen.generate_speech.return_value = "audio.mp3"
+        mock_gen.generate_speech.side_effect = lambda **kwargs: kwargs["output_path"]
 
         response = client.post(
             "/api/v1/audio/generate",
@@ -90,6 +303,118 @@ class TestAudioEndpoints:
         data = response.json()
         assert "job_id" in data
 
+    @patch("sa.api.routes.audio_generator")
+    def test_generate_speech_with_audio_profile(self, mock_gen, client, tmp_path):
+        """Test a compact profile synthesizes to the cache then re-encodes"""
+        mock_gen.speech_cache_path.return_value = str(tmp_path / "speech.mp3")
+        mock_gen.generate_speech.return_value = str(tmp_path / "speech.mp3")
+        mock_gen.convert_audio.side_effect = lambda src, dst, fmt: dst
+
+        response = client.post(
+            "/api/v1/audio/generate",
+            json={"text": "Hello world", "audio_profile": "voice", "bitrate": "24k"},
+        )
+        assert response.status_code == 200
+        assert response.json()["audio_url"].endswith(".ogg")
+        audio_format = mock_gen.convert_audio.call_args.args[2]
+        assert (audio_format.codec, audio_format.bitrate) == ("opus", "24k")
+        assert mock_gen.generate_speech.call_args.kwargs["output_path"] == str(
+            tmp_path / "speech.mp3"
+        )
+
+    def test_profile_speech_is_the_cache_entry(self, client, tmp_path, monkeypatch):
+        """Test profile requests leave no per-job speech files and reuse the cache"""
+        from sa.generators import AudioGenerator
+        from sa.utils import config
+
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator.client = None
+        monkeypatch.setattr(config, "output_dir", str(tmp_path))
+        monkeypatch.setattr("sa.api.routes.audio_generator", generator)
+
+        def fake_convert(src, dst, fmt):
+            with open(dst, "wb") as f:
+                f.write(b"OggS")
+            return dst
+
+        with (
+            patch("gtts.gTTS") as mock_gtts,
+            patch.object(generator, "convert_audio", side_effect=fake_convert),
+        ):
+            mock_gtts.return_value.save.side_effect = lambda path: open(path, "wb").close()
+            for _ in range(2):
+                response = client.post(
+                    "/api/v1/audio/generate", json={"text": "Hello world", "audio_profile": "voice"}
+                )
+                assert response.json()["status"] == "completed"
+
+        assert mock_gtts.call_count == 1
+        speech = [p.name for p in generator.cache_dir.glob("*.mp3")]
+        assert speech == [os.path.basename(generator.speech_cache_path("Hello world"))]
+
+    def test_generate_speech_rejects_unknown_codec(self, client):
+        """Test unsupported codecs fail validation"""
+        response = client.post(
+            "/api/v1/audio/generate", json={"text": "Hello world", "audio_codec": "flac"}
+        )
+        assert response.status_code == 422
+
+    @patch("sa.api.routes.audio_generator")
+    def test_stream_audio_relays_chunks(self, mock_gen, client):
+        """Test streamed speech is relayed chunk by chunk as audio/mpeg"""
+        mock_gen.stream_speech.return_value = iter([b"ID3", b"\xff\xfb", b"\x00"])
+
+        response = client.post("/api/v1/audio/stream", json={"text": "Hello world"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content == b"ID3\xff\xfb\x00"
+
+    @patch("sa.api.routes.audio_generator")
+    def test_stream_audio_invalid_text(self, mock_gen, client):
+        """Test invalid text is rejected before streaming starts"""
+        mock_gen.stream_speech.return_value = None
+
+        response = client.post("/api/v1/audio/stream", json={"text": ""})
+        assert response.status_code == 400
+
+    def test_streamed_speech_is_downloadable_after_generate(self, client, tmp_path, monkeypatch):
+        """Test a cache hit left by the stream endpoint is served by the download route"""
+        from sa.generators import AudioGenerator
+        from sa.utils import config
+
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator._provider_stream = lambda *args: iter([("elevenlabs", b"ID3\xff\xfb")])
+        monkeypatch.setattr(config, "output_dir", str(tmp_path))
+        monkeypatch.setattr("sa.api.routes.audio_generator", generator)
+
+        streamed = client.post("/api/v1/audio/stream", json={"text": "Hello world"})
+        generated = client.post("/api/v1/audio/generate", json={"text": "Hello world"})
+
+        assert generator.get_statistics()["cached"] == 1
+        download = client.get(generated.json()["audio_url"])
+        assert download.status_code == 200
+        assert download.content == streamed.content
+
+    @patch("sa.api.routes.audio_generator")
+    def test_cached_profile_speech_is_published(self, mock_gen, client, tmp_path, monkeypatch):
+        """Test another profile's intermediate speech is copied out of the cache"""
+        from sa.utils import config
+
+        mock_gen.cache_dir = tmp_path / "cache"
+        mock_gen.cache_dir.mkdir()
+        speech = mock_gen.cache_dir / "speech_previous-job.mp3"
+        speech.write_bytes(b"ID3\xff\xfb")
+        mock_gen.generate_speech.return_value = str(speech)
+        monkeypatch.setattr(config, "output_dir", str(tmp_path))
+
+        response = client.post("/api/v1/audio/generate", json={"text": "Hello world"})
+
+        audio_url = response.json()["audio_url"]
+        assert "speech_previous-job" not in audio_url
+        download = client.get(audio_url)
+        assert download.status_code == 200
+        assert download.content == b"ID3\xff\xfb"
+
     def test_get_audio_job_not_found(self, client):
         """Test getting non-existent audio job"""
         response = client.get("/api/v1/audio/jobs/nonexistent-id")
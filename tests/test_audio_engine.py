@@ -0,0 +1,292 @@
+"""Tests for the PCM assembly engine"""
+
+import os
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from sa.generators.audio_engine import (
+    AUDIO_PROFILES,
+    DEFAULT_CHUNK_FRAMES,
+    ArrayReader,
+    PCMCache,
+    PCMReader,
+    add_looped,
+    assemble_pcm,
+    db_to_gain,
+    decode_pcm,
+    ffmpeg_binary,
+    get_audio_format,
+    music_volume_to_gain,
+    stream_mix,
+    to_audio_segment,
+    transcode,
+)
+
+requires_ffmpeg = pytest.mark.skipif(
+    not os.path.exists(ffmpeg_binary()), reason="ffmpeg binary not available"
+)
+
+
+def write_wav(path, samples, channels=1, rate=8000):
+    """Write int16 samples to a WAV file"""
+    data = np.asarray(samples, dtype=np.int16)
+    AudioSegment(data=data.tobytes(), sample_width=2, frame_rate=rate, channels=channels).export(
+        str(path), format="wav"
+    )
+    return str(path)
+
+
+def test_db_to_gain():
+    """Test decibel conversion"""
+    assert db_to_gain(0) == 1.0
+    assert db_to_gain(-20) == pytest.approx(0.1)
+
+
+def test_music_volume_to_gain():
+    """Test music volume curve matches the previous dB mapping"""
+    assert music_volume_to_gain(1.0) == 1.0
+    assert music_volume_to_gain(0.0) == pytest.approx(0.1)
+
+
+def test_assemble_concatenates_with_gaps():
+    """Test segments are written in order with silent gaps"""
+    a = np.full((3, 1), 1, dtype=np.int16)
+    b = np.full((2, 1), 2, dtype=np.int16)
+
+    out = assemble_pcm([a, b], gap_frames=2)
+
+    assert out.dtype == np.int16
+    assert out[:, 0].tolist() == [1, 1, 1, 0, 0, 2, 2]
+
+
+def test_assemble_requires_segments():
+    """Test empty input is rejected"""
+    with pytest.raises(ValueError):
+        assemble_pcm([])
+
+
+def test_assemble_mixes_looped_bed_and_clips():
+    """Test the bed is looped under everything and the sum saturates"""
+    voice = np.array([[32000], [0], [0], [0], [0]], dtype=np.int16)
+    bed = np.array([[1000], [-1000]], dtype=np.int16)
+
+    out = assemble_pcm([voice], bed=bed)
+
+    assert out[:, 0].tolist() == [32767, -1000, 1000, -1000, 1000]
+
+
+def test_add_looped_applies_gain():
+    """Test bed gain scaling"""
+    out = np.zeros((4, 1), dtype=np.int32)
+    add_looped(out, np.full((3, 1), 100, dtype=np.int16), gain=0.5)
+    assert out[:, 0].tolist() == [50, 50, 50, 50]
+
+
+def test_add_looped_scales_memmapped_bed_per_window(tmp_path):
+    """Test a memory-mapped bed longer than one window loops and scales correctly"""
+    frames = DEFAULT_CHUNK_FRAMES + 1000
+    bed = np.lib.format.open_memmap(
+        str(tmp_path / "bed.npy"), mode="w+", dtype=np.int16, shape=(frames, 2)
+    )
+    bed[:] = (np.arange(frames) % 1000).astype(np.int16)[:, None]
+    out = np.zeros((2 * frames + 7, 2), dtype=np.int32)
+
+    add_looped(out, bed, gain=0.5)
+
+    expected = (np.resize(np.asarray(bed), out.shape) * np.float32(0.5)).astype(np.int32)
+    assert np.array_equal(out, expected)
+
+
+def test_decode_and_wrap_roundtrip(tmp_path):
+    """Test decoding a WAV file and wrapping PCM back into a segment"""
+    path = str(tmp_path / "tone.wav")
+    AudioSegment.silent(duration=100, frame_rate=44100).export(path, format="wav")
+
+    pcm = decode_pcm(path, sample_rate=44100, channels=2)
+    assert pcm.shape == (4410, 2)
+    assert pcm.dtype == np.int16
+
+    segment = to_audio_segment(pcm, 44100)
+    assert segment.channels == 2
+    assert len(segment) == 100
+
+
+@requires_ffmpeg
+def test_pcm_reader_loops(tmp_path):
+    """Test looping reader keeps producing frames past the end of the file"""
+    path = write_wav(tmp_path / "bed.wav", [1, 2, 3])
+    buffer = np.zeros((7, 1), dtype=np.int16)
+
+    with PCMReader(path, sample_rate=8000, channels=1, loop=True) as reader:
+        assert reader.read_into(buffer) == 7
+
+    assert buffer[:, 0].tolist() == [1, 2, 3, 1, 2, 3, 1]
+
+
+def test_array_reader_loops_without_copying_source():
+    """Test array reads wrap around like a looping PCMReader"""
+    pcm = np.array([[1], [2], [3]], dtype=np.int16)
+    buffer = np.zeros((7, 1), dtype=np.int16)
+
+    assert ArrayReader(pcm, loop=True).read_into(buffer) == 7
+    assert buffer[:, 0].tolist() == [1, 2, 3, 1, 2, 3, 1]
+    assert ArrayReader(pcm).read_into(buffer) == 3
+
+
+@requires_ffmpeg
+def test_pcm_cache_decodes_once(tmp_path):
+    """Test repeat lookups map the cached PCM instead of decoding again"""
+    track = write_wav(tmp_path / "track.wav", [5, -5, 10, -10])
+    cache = PCMCache(tmp_path / "pcm")
+
+    first = cache.get(track, sample_rate=8000, channels=1)
+    second = cache.get(track, sample_rate=8000, channels=1)
+
+    assert isinstance(second, np.memmap)
+    assert first[:, 0].tolist() == [5, -5, 10, -10]
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert len(list((tmp_path / "pcm").glob("*.s16le"))) == 1
+
+
+@requires_ffmpeg
+def test_pcm_cache_keys_by_content_and_format(tmp_path):
+    """Test identical content shares an entry while a new rate gets its own"""
+    a = write_wav(tmp_path / "a.wav", [1, 2, 3, 4])
+    b = write_wav(tmp_path / "b.wav", [1, 2, 3, 4])
+    cache = PCMCache(tmp_path / "pcm")
+
+    assert cache.path_for(a, 8000, 1) == cache.path_for(b, 8000, 1)
+    assert cache.path_for(a, 8000, 1) != cache.path_for(a, 16000, 1)
+    cache.get(a, 8000, 1)
+    cache.get(b, 8000, 1)
+    assert cache.stats["misses"] == 1
+    assert cache.clear() == 1
+
+
+@requires_ffmpeg
+def test_stream_mix_accepts_cached_bed(tmp_path):
+    """Test mixing over a memory-mapped bed matches mixing over the file"""
+    voice_path = write_wav(tmp_path / "voice.wav", np.arange(0, 500, 10))
+    bed_path = write_wav(tmp_path / "bed.wav", [100, -100, 300])
+    bed = PCMCache(tmp_path / "pcm").get(bed_path, sample_rate=8000, channels=1)
+
+    from_file = str(tmp_path / "file.wav")
+    from_cache = str(tmp_path / "cache.wav")
+    stream_mix(voice_path, bed_path, from_file, sample_rate=8000, channels=1, chunk_frames=16)
+    stream_mix(voice_path, bed, from_cache, sample_rate=8000, channels=1, chunk_frames=16)
+
+    assert AudioSegment.from_wav(from_file).raw_data == AudioSegment.from_wav(from_cache).raw_data
+
+
+@requires_ffmpeg
+def test_stream_mix_matches_in_memory_mix(tmp_path):
+    """Test chunked streaming gives the same samples as the one-shot mix"""
+    voice = np.arange(0, 5000, 10, dtype=np.int16)
+    bed = np.array([100, -100, 300], dtype=np.int16)
+    voice_path = write_wav(tmp_path / "voice.wav", voice)
+    bed_path = write_wav(tmp_path / "bed.wav", bed)
+    output = str(tmp_path / "mixed.wav")
+
+    stream_mix(
+        voice_path, bed_path, output, bed_gain=0.5, sample_rate=8000, channels=1, chunk_frames=64
+    )
+
+    mixed = np.frombuffer(AudioSegment.from_wav(output).raw_data, dtype=np.int16)
+    expected = assemble_pcm([voice[:, None]], bed=bed[:, None], bed_gain=0.5)[:, 0]
+    assert mixed.tolist() == expected.tolist()
+
+
+@requires_ffmpeg
+def test_stream_mix_pads_to_duration(tmp_path):
+    """Test a requested duration pads the voice and keeps looping the bed"""
+    voice_path = write_wav(tmp_path / "voice.wav", [1000] * 4)
+    bed_path = write_wav(tmp_path / "bed.wav", [7, 9])
+    output = str(tmp_path / "mixed.wav")
+
+    stream_mix(
+        voice_path,
+        bed_path,
+        output,
+        duration=0.001,
+        sample_rate=8000,
+        channels=1,
+        chunk_frames=3,
+    )
+
+    mixed = np.frombuffer(AudioSegment.from_wav(output).raw_data, dtype=np.int16)
+    assert mixed.tolist() == [1007, 1009, 1007, 1009, 7, 9, 7, 9]
+
+
+@requires_ffmpeg
+def test_stream_mix_reports_encoder_errors(tmp_path):
+    """Test a failing encoder raises with ffmpeg's message instead of a broken pipe"""
+    voice_path = write_wav(tmp_path / "voice.wav", [1000] * 40000)
+    bed_path = write_wav(tmp_path / "bed.wav", [7, 9])
+
+    with pytest.raises(RuntimeError, match="ffmpeg encoder failed: .*no_such_codec"):
+        stream_mix(
+            voice_path,
+            bed_path,
+            str(tmp_path / "mixed.wav"),
+            sample_rate=8000,
+            channels=1,
+            chunk_frames=64,
+            encoder_args=["-c:a", "no_such_codec"],
+        )
+
+
+def test_audio_format_overrides_profile():
+    """Test per-request overrides replace only the given profile fields"""
+    audio_format = get_audio_format("compact", bitrate="48k", channels=1)
+
+    assert audio_format.codec == "aac"
+    assert audio_format.bitrate == "48k"
+    assert audio_format.extension == ".m4a"
+    assert audio_format.media_type == "audio/mp4"
+    assert audio_format.ffmpeg_args() == [
+        "-f", "ipod", "-c:a", "aac", "-b:a", "48k", "-ac", "1", "-ar", "44100"
+    ]  # fmt: skip
+    assert get_audio_format() is AUDIO_PROFILES["standard"]
+
+
+def test_audio_format_validation():
+    """Test unknown names are rejected and Opus snaps to a supported rate"""
+    with pytest.raises(ValueError, match="Unsupported audio profile"):
+        get_audio_format("lossless")
+    with pytest.raises(ValueError, match="Unsupported audio codec"):
+        get_audio_format(codec="flac")
+    assert get_audio_format(codec="opus", sample_rate=44100).sample_rate == 48000
+    assert get_audio_format("voice").export_kwargs() == {
+        "format": "ogg",
+        "codec": "libopus",
+        "bitrate": "32k",
+        "parameters": ["-ac", "1", "-ar", "24000"],
+    }
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize("profile", ["voice", "compact"])
+def test_compact_profiles_shrink_output(tmp_path, profile):
+    """Test compact encodings decode back and are far smaller than standard MP3"""
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal(44100 * 2 * 2) * 3000).astype(np.int16)
+    source = write_wav(tmp_path / "speech.wav", noise, channels=2, rate=44100)
+
+    standard = transcode(source, str(tmp_path / "standard.mp3"), get_audio_format())
+    audio_format = get_audio_format(profile)
+    compact = transcode(source, str(tmp_path / f"out{audio_format.extension}"), audio_format)
+
+    assert os.path.getsize(compact) * 1.5 < os.path.getsize(standard)
+    buffer = np.zeros((20000, 1), dtype=np.int16)
+    with PCMReader(compact, 8000, 1) as reader:
+        assert reader.read_into(buffer) == pytest.approx(16000, rel=0.05)
+
+
+@requires_ffmpeg
+def test_transcode_failure_raises(tmp_path):
+    """Test a failed transcode raises with ffmpeg's message instead of returning a path"""
+    with pytest.raises(RuntimeError, match="ffmpeg transcode failed: .*Error opening input"):
+        transcode(str(tmp_path / "missing.wav"), str(tmp_path / "out.mp3"), get_audio_format())
+    assert not (tmp_path / "out.mp3").exists()
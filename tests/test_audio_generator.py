@@ -2,10 +2,14 @@
 
 import os
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
-from sa.generators.audio_generator import AudioGenerator
+from sa.generators.audio_generator import AudioGenerator, split_text
 
 
 @pytest.fixture
@@ -90,6 +94,19 @@ class TestGetAvailableVoices:
             voices = audio_generator.get_available_voices()
             assert isinstance(voices, list)
 
+    @patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True)
+    def test_voice_names_resolved_to_ids(self, tmp_path):
+        """Test display names are sent to ElevenLabs as voice IDs from the catalog"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator.client = Mock()
+        generator.client.text_to_speech.convert.return_value = iter([b"audio"])
+        generator.voice_catalog.refresh = Mock()
+
+        generator.generate_speech("Hello world", voice="Adam", output_path=str(tmp_path / "a.mp3"))
+
+        voice_id = generator.client.text_to_speech.convert.call_args.kwargs["voice_id"]
+        assert voice_id == "pNInz6obpgDQGcFmaJgB"
+
     @patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True)
     def test_get_available_voices_error(self, audio_generator):
         """Test getting voices when API call fails"""
@@ -158,6 +175,66 @@ class TestFallbackTTS:
         assert hasattr(audio_generator, "_fallback_tts")
         assert callable(audio_generator._fallback_tts)
 
+    @pytest.fixture
+    def fallback_generator(self, tmp_path):
+        """Generator without ElevenLabs and a fake gTTS writing its input text"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator.client = None
+        with patch("gtts.gTTS") as mock_gtts:
+            mock_gtts.return_value.save.side_effect = lambda path: open(path, "w").close()
+            yield generator, mock_gtts
+
+    def test_fallback_is_cached_by_language(self, fallback_generator, tmp_path):
+        """Test repeated fallback text is served locally, per language"""
+        generator, mock_gtts = fallback_generator
+        first = str(tmp_path / "first.mp3")
+
+        assert generator.generate_speech("Hello world", output_path=first, language="en") == first
+        assert generator.generate_speech("Hello world", output_path="other.mp3", language="en") == (
+            first
+        )
+        generator.generate_speech("Hello world", output_path=str(tmp_path / "ar.mp3"))
+
+        langs = [c.kwargs["lang"] for c in mock_gtts.call_args_list]
+        assert langs == ["en", "ar"]
+        assert generator.stats["cached"] == 1
+
+    def test_concurrent_fallbacks_share_one_request(self, fallback_generator, tmp_path):
+        """Test identical concurrent requests wait for a single gTTS call"""
+        generator, mock_gtts = fallback_generator
+        started = threading.Event()
+
+        def slow_save(path):
+            # Keep the first request in flight until every thread has called in
+            started.set()
+            time.sleep(0.2)
+            open(path, "w").close()
+
+        mock_gtts.return_value.save.side_effect = slow_save
+        output = str(tmp_path / "shared.mp3")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda _: generator.generate_speech("Same text", output_path=output), range(4)
+                )
+            )
+
+        assert started.is_set()
+        assert results == [output] * 4
+        assert mock_gtts.call_count == 1
+        assert mock_gtts.return_value.save.call_count == 1
+
+    def test_uncached_fallback_is_not_recorded(self, fallback_generator, tmp_path):
+        """Test use_cache=False neither reads nor writes the fallback cache"""
+        generator, mock_gtts = fallback_generator
+        for name in ("a.mp3", "b.mp3"):
+            generator.generate_speech(
+                "Hello world", output_path=str(tmp_path / name), use_cache=False
+            )
+
+        assert mock_gtts.call_count == 2
+        assert generator.get_cache_size() == 0
+
 
 class TestAddBackgroundMusic:
     """Test background music mixing"""
@@ -304,6 +381,55 @@ class TestProgressCallback:
         assert len(progress_messages) > 0
 
 
+class TestPCMAssembly:
+    """Test narration and music mixing go through the PCM engine"""
+
+    @patch("sa.generators.audio_generator.stream_mix")
+    def test_add_background_music_streams_mix(
+        self, mock_stream_mix, audio_generator, temp_audio_file, tmp_path
+    ):
+        """Test music mixing streams the voice over the cached, decoded bed"""
+        output = str(tmp_path / "mixed.mp3")
+        bed = np.zeros((10, 2), np.int16)
+        with patch.object(audio_generator.pcm_cache, "get", return_value=bed) as mock_get:
+            result = audio_generator.add_background_music(
+                temp_audio_file, temp_audio_file, output, music_volume=1.0
+            )
+
+        assert result == output
+        mock_get.assert_called_once_with(temp_audio_file)
+        args, kwargs = mock_stream_mix.call_args
+        assert args == (temp_audio_file, bed, output)
+        assert kwargs["bed_gain"] == 1.0
+        assert kwargs["encoder_args"][:4] == ["-f", "mp3", "-c:a", "libmp3lame"]
+
+    @patch("sa.generators.audio_generator.stream_mix")
+    def test_mix_uses_generator_audio_profile(self, mock_stream_mix, temp_audio_file, tmp_path):
+        """Test the configured audio profile selects the mix encoder and extension"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"), audio_profile="voice")
+        with patch.object(generator.pcm_cache, "get", return_value=np.zeros((10, 2), np.int16)):
+            default = generator.add_background_music(temp_audio_file, temp_audio_file)
+            renamed = generator.add_background_music(
+                temp_audio_file, temp_audio_file, str(tmp_path / "mix.mp3")
+            )
+
+        assert default == "mixed_audio.ogg"
+        assert renamed == str(tmp_path / "mix.ogg")
+        encoder_args = mock_stream_mix.call_args.kwargs["encoder_args"]
+        assert encoder_args == [
+            "-f",
+            "ogg",
+            "-c:a",
+            "libopus",
+            "-b:a",
+            "32k",
+            "-ac",
+            "1",
+            "-ar",
+            "24000",
+        ]
+
+
 class TestAddBackgroundMusicValidation:
     """Test background music validation"""
 
@@ -360,6 +486,354 @@ class TestGenerateNarrationValidation:
         assert len(progress_messages) > 0
 
 
+class TestParallelNarration:
+    """Test concurrent per-segment narration synthesis"""
+
+    @pytest.fixture
+    def fast_generator(self, tmp_path, monkeypatch):
+        """Generator with no retry delay, working in a scratch directory"""
+        monkeypatch.chdir(tmp_path)
+        return AudioGenerator(cache_dir=str(tmp_path / "cache"), retry_backoff=0)
+
+    def test_segments_assembled_in_script_order(self, fast_generator):
+        """Test out-of-order completion still yields script order"""
+        import threading
+        import time
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_speech(text, output_path, language, use_cache):
+            with lock:
+                active.append(text)
+                peak.append(len(active))
+            # Earlier segments finish last
+            time.sleep(0.05 * (4 - int(text[-1])))
+            with open(output_path, "w") as f:
+                f.write(text)
+            with lock:
+                active.remove(text)
+            return output_path
+
+        segments = [{"text": f"Segment {i}"} for i in range(4)]
+        with (
+            patch.object(fast_generator, "_fallback_tts", side_effect=fake_speech),
+            patch("sa.generators.audio_generator.decode_pcm") as mock_decode,
+            patch("sa.generators.audio_generator.to_audio_segment"),
+        ):
+            mock_decode.side_effect = lambda path, rate, channels: np.zeros(
+                (10, channels), np.int16
+            )
+            result = fast_generator.generate_narration_from_script(segments, "out.mp3")
+
+        assert result == "out.mp3"
+        loaded = [call.args[0] for call in mock_decode.call_args_list]
+        expected = [
+            str(
+                fast_generator._segment_path(
+                    f"Segment {i}", "Adam", "eleven_multilingual_v2", "gtts"
+                )
+            )
+            for i in range(4)
+        ]
+        assert loaded == expected
+        assert max(peak) <= fast_generator.concurrency["gtts"]
+        assert max(peak) > 1
+
+    def test_failed_segment_is_retried(self, fast_generator, tmp_path):
+        """Test a failing segment is retried before giving up"""
+        attempts = []
+
+        def flaky_speech(text, output_path, language, use_cache):
+            attempts.append(text)
+            if len(attempts) < 3:
+                return None
+            with open(output_path, "w") as f:
+                f.write(text)
+            return output_path
+
+        with patch.object(fast_generator, "_fallback_tts", side_effect=flaky_speech):
+            result = fast_generator._synthesize_segment("Hello there", "Adam", "m1", tmp_path)
+
+        assert result == str(fast_generator._segment_path("Hello there", "Adam", "m1", "gtts"))
+        assert os.path.exists(result)
+        assert len(attempts) == 3
+
+    def test_parallel_segments_are_all_counted(self, fast_generator, tmp_path):
+        """Test statistics updated from worker threads lose no counts"""
+        texts = [f"Segment {i}" for i in range(200)]
+        for text in texts:
+            fast_generator._segment_path(text, "Adam", "m1", "gtts").write_bytes(b"x")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(
+                pool.map(
+                    lambda text: fast_generator._synthesize_segment(text, "Adam", "m1", tmp_path),
+                    texts,
+                )
+            )
+
+        assert fast_generator.get_statistics()["cached"] == len(texts)
+
+    def test_segment_gives_up_after_retries(self, fast_generator, tmp_path):
+        """Test retries are bounded"""
+        with patch.object(fast_generator, "_fallback_tts", return_value=None) as mock_speech:
+            result = fast_generator._synthesize_segment("Hello there", "Adam", "m1", tmp_path)
+
+        assert result is None
+        assert mock_speech.call_count == fast_generator.segment_retries + 1
+
+    def test_provider_retried_before_fallback(self, fast_generator, tmp_path):
+        """Test a transient ElevenLabs error is retried instead of switching voice"""
+        fast_generator.client = Mock()
+        fast_generator.client.text_to_speech.convert.side_effect = [
+            ConnectionError("reset"),
+            iter([b"voice"]),
+        ]
+
+        with (
+            patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True),
+            patch.object(fast_generator, "_fallback_tts") as mock_fallback,
+        ):
+            result = fast_generator._synthesize_segment("Hello there", "Adam", "m1", tmp_path)
+
+        mock_fallback.assert_not_called()
+        with open(result, "rb") as f:
+            assert f.read() == b"voice"
+
+    def test_fallback_after_provider_retries(self, fast_generator, tmp_path, caplog):
+        """Test gTTS only takes over once every provider attempt failed"""
+        fast_generator.client = Mock()
+        fast_generator.client.text_to_speech.convert.side_effect = RuntimeError("down")
+
+        def fake_speech(text, output_path, language, use_cache):
+            with open(output_path, "w") as f:
+                f.write(language)
+            return output_path
+
+        with (
+            patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True),
+            patch.object(fast_generator, "_fallback_tts", side_effect=fake_speech),
+        ):
+            result = fast_generator._synthesize_segment(
+                "Hello there", "Adam", "m1", tmp_path, language="en"
+            )
+
+        calls = fast_generator.client.text_to_speech.convert.call_count
+        assert calls == fast_generator.segment_retries + 1
+        with open(result) as f:
+            assert f.read() == "en"
+        assert "gTTS fallback voice" in caplog.text
+        assert result == str(
+            fast_generator._segment_path("Hello there", "Adam", "m1", "gtts", "en")
+        )
+
+    def test_fallback_segment_not_reused_as_voice(self, fast_generator, tmp_path):
+        """Test a cached gTTS segment does not stand in for the ElevenLabs voice"""
+        fallback = fast_generator._segment_path("Hello there", "Adam", "m1", "gtts")
+        fallback.write_bytes(b"gtts")
+        fast_generator.client = Mock()
+        fast_generator.client.text_to_speech.convert.return_value = iter([b"voice"])
+
+        with patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True):
+            result = fast_generator._synthesize_segment("Hello there", "Adam", "m1", tmp_path)
+
+        assert result != str(fallback)
+        with open(result, "rb") as f:
+            assert f.read() == b"voice"
+
+    def test_unchanged_segments_are_reused(self, fast_generator):
+        """Test editing one line only re-synthesizes that line"""
+        calls = []
+
+        def fake_speech(text, output_path, language, use_cache):
+            calls.append(text)
+            with open(output_path, "w") as f:
+                f.write(text)
+            return output_path
+
+        with (
+            patch.object(fast_generator, "_fallback_tts", side_effect=fake_speech),
+            patch("sa.generators.audio_generator.decode_pcm") as mock_decode,
+            patch("sa.generators.audio_generator.to_audio_segment"),
+        ):
+            mock_decode.side_effect = lambda path, rate, channels: np.zeros(
+                (10, channels), np.int16
+            )
+            fast_generator.generate_narration_from_script(
+                [{"text": "Line one"}, {"text": "Line two"}], "v1.mp3"
+            )
+            fast_generator.generate_narration_from_script(
+                [{"text": "Line one"}, {"text": "Line two edited"}], "v2.mp3"
+            )
+
+        assert sorted(calls) == ["Line one", "Line two", "Line two edited"]
+        assert fast_generator.stats["cached"] == 1
+
+    def test_jobs_use_private_scratch_space(self, fast_generator):
+        """Test each job gets its own scratch directory that is removed afterwards"""
+        scratch_dirs = []
+
+        def fake_speech(text, output_path, language, use_cache):
+            scratch_dirs.append(os.path.dirname(output_path))
+            with open(output_path, "w") as f:
+                f.write(text)
+            return output_path
+
+        with (
+            patch.object(fast_generator, "_fallback_tts", side_effect=fake_speech),
+            patch("sa.generators.audio_generator.decode_pcm") as mock_decode,
+            patch("sa.generators.audio_generator.to_audio_segment"),
+        ):
+            mock_decode.side_effect = lambda path, rate, channels: np.zeros(
+                (10, channels), np.int16
+            )
+            fast_generator.generate_narration_from_script([{"text": "First job"}], "a.mp3")
+            fast_generator.generate_narration_from_script([{"text": "Second job"}], "b.mp3")
+
+        assert scratch_dirs[0] != scratch_dirs[1]
+        assert not any(os.path.exists(d) for d in scratch_dirs)
+        assert not os.path.exists("temp_narration")
+
+    def test_concurrency_is_configurable(self):
+        """Test per-provider limits merge with defaults"""
+        generator = AudioGenerator(concurrency={"gtts": 1})
+        assert generator.concurrency["gtts"] == 1
+        assert generator.concurrency["elevenlabs"] >= 1
+
+
+class TestLongTextChunking:
+    """Test sentence-aware splitting and parallel synthesis of long texts"""
+
+    def test_split_at_sentences_and_arabic_punctuation(self):
+        """Test Latin and Arabic sentence and clause marks are split points"""
+        text = "مرحبا بكم. هذا اختبار؟ نعم، هذا جيد؛ شكرا"
+        assert split_text(text, 15) == ["مرحبا بكم.", "هذا اختبار؟", "نعم، هذا جيد؛", "شكرا"]
+        assert split_text("One. Two! Three? Four.", 10) == ["One. Two!", "Three?", "Four."]
+
+    def test_split_packs_short_sentences_and_cuts_long_words(self):
+        """Test chunks stay under the limit and no text is lost"""
+        assert split_text("Short. Text.", 100) == ["Short. Text."]
+        chunks = split_text("a, b; " + "x" * 25, 10)
+        assert all(len(chunk) <= 10 for chunk in chunks)
+        assert "".join(chunks).replace(" ", "") == "a,b;" + "x" * 25
+
+    def test_long_text_synthesized_in_parallel_chunks(self, tmp_path):
+        """Test long text is split, synthesized per chunk and joined in order"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"), max_chunk_chars=25)
+        generator.client = Mock()
+        generator.client.text_to_speech.convert.side_effect = lambda text, **kwargs: iter(
+            [text.encode()]
+        )
+        chunks = ["First sentence here.", "Second sentence here.", "Third one."]
+        output = str(tmp_path / "long.mp3")
+
+        with (
+            patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True),
+            patch("sa.generators.audio_generator.decode_pcm") as mock_decode,
+            patch("sa.generators.audio_generator.to_audio_segment"),
+        ):
+            mock_decode.side_effect = lambda path, rate, channels: np.zeros((10, 1), np.int16)
+            result = generator.generate_speech(" ".join(chunks), output_path=output)
+
+        assert result == output
+        spoken = [c.kwargs["text"] for c in generator.client.text_to_speech.convert.call_args_list]
+        assert sorted(spoken) == chunks
+        decoded = [c.args[0] for c in mock_decode.call_args_list]
+        assert decoded == [
+            str(generator._segment_path(chunk, "Adam", "eleven_multilingual_v2", "elevenlabs"))
+            for chunk in chunks
+        ]
+
+    def test_missing_chunk_fails_whole_text(self, tmp_path):
+        """Test a chunk that fails after retries fails the request"""
+        generator = AudioGenerator(
+            cache_dir=str(tmp_path / "cache"), max_chunk_chars=20, retry_backoff=0
+        )
+        with patch.object(generator, "_synthesize_segment", return_value=None):
+            assert generator.generate_speech("First sentence here. Second one.") is None
+        assert generator.stats["failed"] == 1
+
+
+class TestStreamSpeech:
+    """Test low-latency streaming with tee-to-cache"""
+
+    @pytest.fixture
+    def streaming_generator(self, tmp_path):
+        """Generator with a fake ElevenLabs client yielding three chunks"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator.client = Mock()
+        generator.client.text_to_speech.convert.side_effect = lambda **kwargs: iter(
+            [b"one", b"two", b"three"]
+        )
+        return generator
+
+    def test_stream_is_cached_for_next_request(self, streaming_generator):
+        """Test the first stream is relayed and the second is served from disk"""
+        with patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True):
+            first = list(streaming_generator.stream_speech("Hello there"))
+            second = list(streaming_generator.stream_speech("Hello there"))
+
+        assert first == [b"one", b"two", b"three"]
+        assert b"".join(second) == b"onetwothree"
+        assert streaming_generator.client.text_to_speech.convert.call_count == 1
+        assert streaming_generator.stats["generated"] == 1
+        assert streaming_generator.stats["cached"] == 1
+
+    def test_abandoned_stream_is_not_cached(self, streaming_generator):
+        """Test a client disconnect leaves no partial file in the cache"""
+        with patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True):
+            chunks = streaming_generator.stream_speech("Hello there")
+            assert next(chunks) == b"one"
+            chunks.close()
+
+        assert streaming_generator.get_cache_size() == 0
+        assert not list((streaming_generator.cache_dir / "tmp").iterdir())
+
+    def test_failed_stream_is_raised(self, streaming_generator):
+        """Test a provider failure mid-stream propagates and caches nothing"""
+
+        def failing_stream(**kwargs):
+            yield b"one"
+            raise ConnectionError("stream dropped")
+
+        streaming_generator.client.text_to_speech.convert.side_effect = failing_stream
+        chunks = []
+        with (
+            patch("sa.generators.audio_generator.ELEVENLABS_AVAILABLE", True),
+            pytest.raises(ConnectionError, match="stream dropped"),
+        ):
+            for chunk in streaming_generator.stream_speech("Hello there"):
+                chunks.append(chunk)
+
+        assert chunks == [b"one"]
+        assert streaming_generator.stats["failed"] == 1
+        assert streaming_generator.get_cache_size() == 0
+        assert not list((streaming_generator.cache_dir / "tmp").iterdir())
+
+    def test_stream_falls_back_to_gtts(self, tmp_path):
+        """Test gTTS streams when ElevenLabs is unavailable"""
+        generator = AudioGenerator(cache_dir=str(tmp_path / "cache"))
+        generator.client = None
+        with patch("gtts.gTTS") as mock_gtts:
+            mock_gtts.return_value.stream.return_value = iter([b"gtts"])
+            assert list(generator.stream_speech("Hello there")) == [b"gtts"]
+
+        assert generator.stats["fallback_used"] == 1
+        assert generator.get_cache_size() == 1
+
+        # The fallback rendition is keyed by provider, so it is reused by gTTS only
+        with patch("gtts.gTTS") as mock_gtts:
+            assert list(generator.stream_speech("Hello there")) == [b"gtts"]
+            assert generator.generate_speech("Hello there", use_cache=True).endswith(".mp3")
+        mock_gtts.assert_not_called()
+
+    def test_stream_rejects_invalid_text(self, audio_generator):
+        """Test invalid text returns None instead of an empty stream"""
+        assert audio_generator.stream_speech("") is None
+
+
 class TestInvalidTextGeneration:
     """Test speech generation with invalid inputs"""
 
@@ -0,0 +1,74 @@
+"""Tests for the shared provider client registry"""
+
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+from sa.utils import clients, rate_limit
+from sa.utils.ai_models import ModelFactory
+from sa.utils.suggestions import SuggestionEngine
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    """Start and end every test with no cached clients"""
+    clients.close_clients()
+    yield
+    clients.close_clients()
+
+
+def test_one_client_per_credential():
+    """Test every generator and the suggestion engine share a key's client"""
+    image = ModelFactory.create_image_generator("openai-dalle-3", "key-a")
+    audio = ModelFactory.create_audio_generator("openai-tts-1-hd", "key-a")
+    video = ModelFactory.create_video_generator("openai-gpt-4", "key-a")
+    engine = SuggestionEngine(api_key="key-a")
+    other = ModelFactory.create_image_generator("openai-dalle-3", "key-b")
+
+    assert image.client is audio.client is video.client is engine.client
+    assert other.client is not image.client
+
+
+def test_close_clients_rebuilds_on_next_use():
+    """Test closed clients are dropped and replaced lazily"""
+    first = clients.get_client("openai", "key-a")
+    clients.close_clients()
+
+    assert clients.get_client("openai", "key-a") is not first
+    with pytest.raises(ValueError, match="Unsupported provider"):
+        clients.get_client("unknown", "key-a")
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    """Test a dropped connection is retried by the limiter, since SDK retries are off"""
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE", 0.01)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            raise httpx.ConnectError("connection dropped", request=request)
+        return httpx.Response(200, json={"object": "list", "data": []})
+
+    client = clients.get_client("openai", "key-a")
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    limiter = rate_limit.AdaptiveLimiter("test", rate=1000.0, burst=1000, max_concurrency=4)
+
+    assert limiter.call(client.models.list).data == []
+    assert len(requests) == 2
+    assert limiter.stats["retries"] == 1
+
+
+def test_sdks_imported_lazily():
+    """Test importing the package does not import provider SDKs"""
+    code = (
+        "import sys, sa.utils, sa.generators\n"
+        "print(sorted(m for m in ('openai', 'elevenlabs') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=False
+    )
+
+    assert result.stdout.strip() == "[]", result.stderr
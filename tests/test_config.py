@@ -19,3 +19,38 @@ def test_config_validation():
     assert "replicate" in validation
     assert "elevenlabs" in validation
     assert "paths" in validation
+
+
+def test_config_render_profile():
+    """Test render profile defaults and override"""
+    assert Config().render_profile in ("draft", "standard", "final")
+    assert Config(render_profile="draft").render_profile == "draft"
+
+
+def test_config_audio_profile():
+    """Test audio profile defaults and override"""
+    assert Config().audio_profile in ("voice", "compact", "standard", "high")
+    assert Config(audio_profile="voice").audio_profile == "voice"
+
+
+def test_config_image_profile():
+    """Test image profile defaults and override"""
+    assert Config().image_profile in ("original", "lossless", "high", "standard", "compact")
+    assert Config(image_profile="original").image_profile == "original"
+
+
+def test_config_dedupe_images(monkeypatch):
+    """Test image deduplication is opt-in"""
+    monkeypatch.delenv("SA_DEDUPE_IMAGES", raising=False)
+    assert Config().dedupe_images is False
+    monkeypatch.setenv("SA_DEDUPE_IMAGES", "true")
+    assert Config().dedupe_images is True
+
+
+def test_config_download_policy(monkeypatch):
+    """Test download retry and hedging settings come from the environment"""
+    monkeypatch.setenv("SA_DOWNLOAD_RETRIES", "5")
+    monkeypatch.setenv("SA_DOWNLOAD_HEDGING", "false")
+    config = Config()
+    assert config.download_retries == 5
+    assert config.download_hedging is False
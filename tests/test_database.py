@@ -1,10 +1,20 @@
 """Tests for database module"""
 
 import os
+import sqlite3
 import tempfile
+import threading
+import time
 
 import pytest
-from sa.utils.database import Database
+from sa.utils.database import (
+    MIGRATIONS,
+    SELECT_ALL_STATISTICS,
+    SELECT_GENERATIONS,
+    SELECT_PROJECTS,
+    SELECT_STATISTICS,
+    Database,
+)
 
 
 @pytest.fixture
@@ -15,6 +25,7 @@ def temp_db():
         db = Database(db_path)
         yield db
         # Cleanup
+        db.close_all()
         if os.path.exists(db_path):
             os.remove(db_path)
 
@@ -129,3 +140,173 @@ def test_statistics_no_data(temp_db):
     stats = temp_db.get_statistics()
     assert stats["images_count"] == 0
     assert stats["videos_count"] == 0
+
+
+def test_connection_reused_with_wal(temp_db):
+    """Test each thread keeps one configured connection"""
+    conn = temp_db.get_connection()
+    temp_db.create_project("Reuse", "Desc")
+
+    assert temp_db.get_connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(temp_db.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_readers_do_not_block_writer(temp_db):
+    """Test a writer commits while another connection holds a read transaction"""
+    project_id = temp_db.create_project("Busy", "Desc")
+    reader = sqlite3.connect(temp_db.db_path)
+    reader.execute("BEGIN")
+    reader.execute("SELECT * FROM generations").fetchall()
+
+    temp_db.add_generation(project_id, "image", "prompt", "/path/1.png", 1.0)
+
+    # The reader keeps its snapshot; new readers see the write
+    assert reader.execute("SELECT COUNT(*) FROM generations").fetchone()[0] == 0
+    assert len(temp_db.get_generations(project_id)) == 1
+    reader.close()
+
+
+def test_migrations_recorded(temp_db):
+    """Test every migration is applied once and recorded"""
+    latest = MIGRATIONS[-1][0]
+
+    assert temp_db.schema_version() == latest
+    assert temp_db.migrate() == latest
+    rows = temp_db.get_connection().execute("SELECT version FROM schema_migrations").fetchall()
+    assert [row[0] for row in rows] == [version for version, _, _ in MIGRATIONS]
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    """Test a database created before migrations keeps its data and gains the indexes"""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    for statement in MIGRATIONS[0][2]:
+        conn.execute(statement)
+    conn.execute("INSERT INTO projects (name) VALUES ('Old')")
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    indexes = {
+        row[0]
+        for row in db.get_connection().execute("SELECT name FROM sqlite_master WHERE type='index'")
+    }
+
+    assert db.get_projects()[0]["name"] == "Old"
+    assert "idx_generations_project_created" in indexes
+    db.close()
+
+
+@pytest.mark.parametrize(
+    "sql, params",
+    [
+        (SELECT_PROJECTS, ()),
+        (SELECT_GENERATIONS, (1,)),
+        (SELECT_STATISTICS, ("2024-01-01",)),
+        (SELECT_ALL_STATISTICS, ()),
+    ],
+)
+def test_hot_queries_use_indexes(temp_db, sql, params):
+    """Test hot queries never fall back to a table scan or a temporary sort"""
+    project_id = temp_db.create_project("Plan", "Desc")
+    for i in range(200):
+        temp_db.add_generation(project_id, "image", f"prompt{i}", f"/path/{i}.png", 1.0)
+    temp_db.get_connection().execute("ANALYZE")
+
+    plan = temp_db.query_plan(sql, params)
+
+    assert all("USING INDEX" in step or "USING COVERING INDEX" in step for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def raw_statistics(db):
+    """Statistics rows as seen by another connection, bypassing the buffer"""
+    conn = sqlite3.connect(db.db_path)
+    rows = conn.execute("SELECT images_count, videos_count, total_time FROM statistics").fetchall()
+    conn.close()
+    return rows
+
+
+def test_statistics_are_buffered_and_exact(temp_db):
+    """Test increments are written in one batch and reads see exact totals"""
+    project_id = temp_db.create_project("Batch", "Desc")
+    for i in range(10):
+        temp_db.add_generation(project_id, "image", f"p{i}", f"/path/{i}.png", 0.5)
+    temp_db.add_generation(project_id, "unknown", "p", "/path/x", 3.0)
+
+    assert raw_statistics(temp_db) == []
+    stats = temp_db.get_statistics()
+    assert (stats["images_count"], stats["total_time"]) == (10, 5.0)
+    assert raw_statistics(temp_db) == [(10, 0, 5.0)]
+
+
+def test_statistics_flushed_in_background(temp_db, monkeypatch):
+    """Test timed flushes share one long-lived thread and connection"""
+    monkeypatch.setattr("sa.utils.database.STATS_FLUSH_INTERVAL", 0.05)
+    project_id = temp_db.create_project("Timer", "Desc")
+
+    for expected in range(1, 4):
+        temp_db.add_generation(project_id, "video", "p", "/path/v.mp4", 2.0)
+        deadline = time.time() + 2
+        while raw_statistics(temp_db) != [(0, expected, 2.0 * expected)]:
+            assert time.time() < deadline
+            time.sleep(0.02)
+
+    flusher = temp_db._flusher
+    assert flusher.is_alive()
+    # This thread's connection plus the flusher's, however many flushes ran
+    assert len(temp_db._connections) == 2
+
+    temp_db.close_all()
+    assert not flusher.is_alive()
+    assert temp_db._connections == []
+    assert temp_db.get_statistics()["videos_count"] == 3
+
+
+def test_concurrent_statistics_writers(tmp_path):
+    """Test threads and separate Database instances never lose or collide on counts"""
+    path = str(tmp_path / "concurrent.db")
+    first, second = Database(path), Database(path)
+    project_id = first.create_project("Busy", "Desc")
+
+    def write(db):
+        for i in range(60):
+            db.add_generation(project_id, "image", f"p{i}", f"/path/{i}.png", 1.0)
+        db.close()
+
+    threads = [threading.Thread(target=write, args=(db,)) for db in (first, second) * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    first.flush_stats()
+    second.flush_stats()
+
+    stats = first.get_statistics()
+    assert stats["images_count"] == 480
+    assert stats["total_time"] == 480.0
+    assert len(first.get_all_statistics()) == 1
+    first.close_all()
+    second.close_all()
+
+
+def test_statistics_reads_survive_flush_errors(temp_db, monkeypatch, caplog):
+    """Test a failing flush is logged by readers and writers, and retried later"""
+    project_id = temp_db.create_project("Locked", "Desc")
+    monkeypatch.setattr("sa.utils.database.STATS_FLUSH_SIZE", 1)
+    monkeypatch.setattr("sa.utils.database.UPSERT_STATISTICS", "INSERT INTO missing VALUES (1)")
+
+    temp_db.add_generation(project_id, "audio", "p", "/path/a.mp3", 1.0)
+    assert temp_db.get_statistics()["audio_count"] == 0
+    assert temp_db.get_all_statistics() == []
+    assert "Failed to flush statistics" in caplog.text
+
+    monkeypatch.undo()
+    assert temp_db.get_statistics()["audio_count"] == 1
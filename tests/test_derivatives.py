@@ -0,0 +1,134 @@
+"""Tests for thumbnail, preview and poster derivatives"""
+
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from sa.generators.audio_engine import ffmpeg_binary
+from sa.utils.derivatives import DerivativeService, sizes_for
+
+requires_ffmpeg = pytest.mark.skipif(
+    not os.path.exists(ffmpeg_binary()), reason="ffmpeg binary not available"
+)
+
+
+@pytest.fixture
+def service(tmp_path):
+    """Derivative service caching into a scratch directory"""
+    return DerivativeService(str(tmp_path / "derivatives"))
+
+
+@pytest.fixture
+def large_image(tmp_path):
+    """A 2048x1024 RGBA PNG"""
+    path = tmp_path / "big.png"
+    Image.new("RGBA", (2048, 1024), (10, 120, 200, 255)).save(path)
+    return str(path)
+
+
+def test_sizes_by_media_kind():
+    """Test posters are only offered for videos"""
+    assert sizes_for("a.webp") == ["thumb", "preview"]
+    assert sizes_for("a.mp4") == ["poster", "thumb", "preview"]
+    assert sizes_for("a.mp3") == []
+
+
+def test_image_derivatives_are_downscaled_jpegs(service, large_image):
+    """Test thumb and preview fit their bounding box and keep the aspect ratio"""
+    futures = service.submit(large_image)
+    thumb, preview = (future.result(timeout=10) for future in futures)
+
+    with Image.open(thumb) as img:
+        assert (img.format, img.size) == ("JPEG", (256, 128))
+    with Image.open(preview) as img:
+        assert img.size == (1024, 512)
+    assert os.path.getsize(thumb) < os.path.getsize(large_image)
+
+
+def test_derivatives_are_cached_until_source_changes(service, large_image):
+    """Test repeat requests hit the cache and a rewritten source re-renders"""
+    first = service.get(large_image, "thumb")
+    assert service.get(large_image, "thumb") == first
+    assert service.stats == {"generated": 1, "cached": 1, "failed": 0}
+
+    Image.new("RGB", (100, 400)).save(large_image)
+    os.utime(large_image, ns=(os.stat(first).st_mtime_ns + 10**9,) * 2)
+    with Image.open(service.get(large_image, "thumb")) as img:
+        assert img.size == (64, 256)
+    assert service.stats["generated"] == 2
+
+
+def test_get_nowait_queues_instead_of_blocking(service, large_image):
+    """Test a missing derivative is queued and served once rendered"""
+    assert service.get_nowait(large_image, "thumb") is None
+
+    deadline = time.time() + 10
+    while (thumb := service.get_nowait(large_image, "thumb")) is None:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert thumb == str(service.derivative_path(large_image, "thumb"))
+    assert service.stats["generated"] == 1
+    with pytest.raises(ValueError):
+        service.get_nowait(large_image, "poster")
+
+
+def test_invalid_size_and_removal(service, large_image):
+    """Test unknown sizes are rejected and derivatives are removed with the source"""
+    with pytest.raises(ValueError, match="Unsupported derivative size"):
+        service.get(large_image, "poster")
+
+    service.get(large_image, "thumb")
+    service.get(large_image, "preview")
+    assert service.remove(large_image) == 2
+    assert not list(service.cache_dir.glob("*.jpg"))
+
+
+@pytest.fixture
+def video(tmp_path):
+    """A 0.5 s 640x360 test clip"""
+    path = str(tmp_path / "clip.mp4")
+    subprocess.run(
+        [
+            ffmpeg_binary(),
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "testsrc=duration=0.5:size=640x360:rate=10",
+            "-pix_fmt",
+            "yuv420p",
+            path,
+        ],
+        check=True,
+    )
+    return path
+
+
+@requires_ffmpeg
+def test_video_poster_and_thumbnail(service, video):
+    """Test a poster frame is extracted even from clips shorter than the offset"""
+    with Image.open(service.get(video, "poster")) as img:
+        assert img.size == (640, 360)
+    with Image.open(service.get(video, "thumb")) as img:
+        assert img.size == (256, 144)
+
+
+@requires_ffmpeg
+def test_video_thumbs_queued_before_poster_do_not_starve(tmp_path, video):
+    """Test a thumb ahead of its poster in a single-worker pool renders the poster itself"""
+    service = DerivativeService(str(tmp_path / "derivatives"), max_workers=1)
+    release = threading.Event()
+    service._pool().submit(release.wait)
+
+    assert service.get_nowait(video, "thumb") is None
+    assert service.get_nowait(video, "poster") is None
+    release.set()
+
+    with Image.open(service.get(video, "thumb", timeout=10)) as img:
+        assert img.size == (256, 144)
+    assert service.get(video, "poster", timeout=10)
@@ -0,0 +1,170 @@
+"""Tests for download retries, range resume and hedged requests against a local server"""
+
+import io
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from sa.utils.downloads import Downloader, DownloadPolicy
+
+BODY = bytes(range(256)) * 1024  # 256 KiB
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves BODY with failure modes selected by path"""
+
+    hits: Counter = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path
+        self.hits[path] += 1
+        attempt = self.hits[path]
+
+        if path == "/missing":
+            self.send_error(404)
+        elif path == "/flaky" and attempt <= 2:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif path == "/slow-once" and attempt == 1:
+            time.sleep(1.5)
+            self.send_body()
+        elif path in ("/truncated", "/no-ranges") and attempt == 1:
+            # Promise the whole body, then hang up half-way
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(BODY[: len(BODY) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+        elif path == "/truncated" and self.headers.get("Range"):
+            start = int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+            self.server.range_headers.append((self.headers["Range"], self.headers["If-Range"]))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(BODY) - 1}/{len(BODY)}")
+            self.send_header("Content-Length", str(len(BODY) - start))
+            self.end_headers()
+            self.wfile.write(BODY[start:])
+        else:
+            self.send_body()
+
+    def send_body(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+@pytest.fixture
+def server():
+    """Local HTTP server yielding its base URL"""
+    Handler.hits = Counter()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.range_headers = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_downloader(**kwargs):
+    """Downloader with short delays suitable for tests"""
+    options = {"backoff_base": 0.01, "hedge_initial_delay": 0.2, "hedge_budget": 1.0}
+    options.update(kwargs)
+    return Downloader(DownloadPolicy(**options))
+
+
+def test_transient_errors_are_retried(server):
+    """Test 503s are retried until the file arrives"""
+    _, base = server
+    downloader = make_downloader()
+    dest = io.BytesIO()
+
+    assert downloader.fetch(f"{base}/flaky", dest) == len(BODY)
+    assert dest.getvalue() == BODY
+    assert Handler.hits["/flaky"] == 3
+    assert downloader.stats["retries"] == 2
+
+
+def test_client_errors_are_final(server):
+    """Test a 404 fails at once without retries"""
+    _, base = server
+    downloader = make_downloader()
+
+    with pytest.raises(requests.HTTPError):
+        downloader.fetch(f"{base}/missing", io.BytesIO())
+    assert Handler.hits["/missing"] == 1
+    assert downloader.stats["failed"] == 1
+
+
+def test_interrupted_body_is_resumed(server):
+    """Test a dropped connection continues with a Range request"""
+    httpd, base = server
+    downloader = make_downloader()
+    dest = io.BytesIO()
+
+    downloader.fetch(f"{base}/truncated", dest)
+
+    assert dest.getvalue() == BODY
+    assert httpd.range_headers[0][1] == '"v1"'
+    assert int(httpd.range_headers[0][0].removeprefix("bytes=").rstrip("-")) > 0
+    assert downloader.stats["resumed"] == 1
+
+
+def test_ignored_range_restarts_file(server):
+    """Test a full response to a Range request replaces the partial file"""
+    _, base = server
+    downloader = make_downloader()
+    dest = io.BytesIO()
+
+    downloader.fetch(f"{base}/no-ranges", dest)
+
+    assert dest.getvalue() == BODY
+    assert downloader.stats["resumed"] == 0
+
+
+def test_slow_response_is_hedged(server):
+    """Test a stalled request is overtaken by a hedged second request"""
+    _, base = server
+    downloader = make_downloader()
+    dest = io.BytesIO()
+
+    start = time.monotonic()
+    downloader.fetch(f"{base}/slow-once", dest)
+
+    assert time.monotonic() - start < 1.0
+    assert dest.getvalue() == BODY
+    assert downloader.stats["hedged"] == 1
+    assert downloader.stats["hedge_wins"] == 1
+
+
+def test_max_bytes_is_enforced(server):
+    """Test oversized bodies are refused without retrying"""
+    _, base = server
+    downloader = make_downloader()
+
+    with pytest.raises(ValueError):
+        downloader.fetch(f"{base}/file", io.BytesIO(), max_bytes=1024)
+    assert Handler.hits["/file"] == 1
+
+
+def test_hedge_delay_tracks_latency_percentile():
+    """Test the hedge threshold follows the host's recent latencies"""
+    downloader = make_downloader(hedge_min_delay=0.05)
+    assert downloader.hedge_delay("cdn.example") == 0.2
+
+    for i in range(100):
+        downloader._record_latency("cdn.example", (i + 1) / 100)
+
+    assert downloader.hedge_delay("cdn.example") == pytest.approx(0.95)
+    assert downloader.hedge_delay("other.example") == 0.2
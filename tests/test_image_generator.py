@@ -1,5 +1,6 @@
 """Tests for ImageGenerator with comprehensive coverage"""
 
+import os
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -203,7 +204,7 @@ class TestCaching:
 class TestDownloadImage:
     """Test image downloading"""
 
-    @patch("sa.generators.image_generator.requests.get")
+    @patch("sa.utils.downloads.requests.get")
     @patch("sa.generators.image_generator.Image.open")
     def test_download_success(self, mock_image, mock_get, generator, tmp_path):
         """Test successful image download"""
@@ -217,7 +218,8 @@ class TestDownloadImage:
         save_path = str(tmp_path / "test_image.png")
         result = generator.download_image("https://example.com/image.png", save_path)
 
-        assert result == save_path
+        # Stored with the default "standard" profile
+        assert result == str(tmp_path / "test_image.webp")
         assert generator.stats["downloaded"] == 1
 
     def test_download_invalid_url(self, generator):
@@ -239,7 +241,7 @@ class TestDownloadImage:
 
         assert result is None
 
-    @patch("sa.generators.image_generator.requests.get")
+    @patch("sa.utils.downloads.requests.get")
     @patch("sa.generators.image_generator.Image.open")
     def test_download_with_progress_callback(self, mock_image, mock_get, generator, tmp_path):
         """Test download with progress callback"""
@@ -263,10 +265,203 @@ class TestDownloadImage:
         assert len(progress_messages) > 0
 
 
+class TestStreamingDownload:
+    """Test downloads are streamed to disk and stored as served"""
+
+    @staticmethod
+    def image_bytes(fmt):
+        """Encode a small image in the given PIL format"""
+        from io import BytesIO
+
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8), (200, 30, 30)).save(buffer, format=fmt)
+        return buffer.getvalue()
+
+    @staticmethod
+    def streamed(payload):
+        """Fake streaming response yielding the payload in small chunks"""
+        response = MagicMock()
+        response.iter_content.return_value = [
+            payload[i : i + 16] for i in range(0, len(payload), 16)
+        ]
+        return response
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_bytes_stored_without_reencoding(self, mock_get, generator, tmp_path):
+        """Test WebP bytes are kept byte-for-byte under a .webp name"""
+        payload = self.image_bytes("WEBP")
+        mock_get.return_value = self.streamed(payload)
+
+        result = generator.download_image("https://example.com/x", str(tmp_path / "img.png"))
+
+        assert result == str(tmp_path / "img.webp")
+        assert (tmp_path / "img.webp").read_bytes() == payload
+        assert mock_get.call_args.kwargs["stream"] is True
+        assert [p.name for p in tmp_path.iterdir()] == ["img.webp"]
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_conversion_only_when_requested(self, mock_get, generator, tmp_path):
+        """Test a different target format triggers a single conversion"""
+        from PIL import Image
+
+        mock_get.return_value = self.streamed(self.image_bytes("WEBP"))
+
+        result = generator.download_image(
+            "https://example.com/x", str(tmp_path / "img.png"), image_format="png"
+        )
+
+        assert result == str(tmp_path / "img.png")
+        with Image.open(result) as img:
+            assert img.format == "PNG"
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_invalid_payload_leaves_no_files(self, mock_get, generator, tmp_path):
+        """Test a non-image response fails without partial files"""
+        mock_get.return_value = self.streamed(b"<html>error</html>")
+
+        assert generator.download_image("https://example.com/x", str(tmp_path / "a.png")) is None
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestImageEncoding:
+    """Test storage profiles for downloaded images"""
+
+    @staticmethod
+    def photo_png():
+        """Encode a noisy PNG with EXIF metadata"""
+        from io import BytesIO
+
+        import numpy as np
+        from PIL import Image
+
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 255, (128, 128, 3), dtype=np.uint8)
+        img = Image.fromarray(pixels)
+        exif = Image.Exif()
+        exif[0x010F] = "TestCamera"
+        buffer = BytesIO()
+        img.save(buffer, format="PNG", exif=exif)
+        return buffer.getvalue()
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_standard_profile_stores_smaller_webp(self, mock_get, generator, tmp_path):
+        """Test a PNG download is re-encoded to a smaller, metadata-free WebP"""
+        from PIL import Image
+
+        from sa.generators.image_generator import get_image_encoding
+
+        payload = self.photo_png()
+        mock_get.return_value = TestStreamingDownload.streamed(payload)
+
+        result = generator.download_image(
+            "https://example.com/x",
+            str(tmp_path / "img.png"),
+            encoding=get_image_encoding("standard"),
+        )
+
+        assert result == str(tmp_path / "img.webp")
+        assert os.path.getsize(result) < len(payload)
+        with Image.open(result) as img:
+            assert img.format == "WEBP"
+            assert not img.getexif()
+        assert [p.name for p in tmp_path.iterdir()] == ["img.webp"]
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_webp_source_is_reencoded_and_stripped(self, mock_get, generator, tmp_path):
+        """Test a WebP download still gets the profile's quality and loses its EXIF"""
+        from io import BytesIO
+
+        from PIL import Image
+
+        from sa.generators.image_generator import get_image_encoding
+
+        buffer = BytesIO()
+        with Image.open(BytesIO(self.photo_png())) as img:
+            img.save(buffer, format="WEBP", quality=100, exif=img.getexif())
+        payload = buffer.getvalue()
+        mock_get.return_value = TestStreamingDownload.streamed(payload)
+
+        result = generator.download_image(
+            "https://example.com/x",
+            str(tmp_path / "img.png"),
+            encoding=get_image_encoding("compact"),
+        )
+
+        assert result == str(tmp_path / "img.webp")
+        assert os.path.getsize(result) < len(payload)
+        with Image.open(result) as img:
+            assert not img.getexif()
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_matching_lossless_format_is_not_reencoded(self, mock_get, generator, tmp_path):
+        """Test metadata-free bytes already in a lossless target are stored untouched"""
+        from sa.generators.image_generator import get_image_encoding
+
+        payload = TestStreamingDownload.image_bytes("WEBP")
+        mock_get.return_value = TestStreamingDownload.streamed(payload)
+
+        result = generator.download_image(
+            "https://example.com/x",
+            str(tmp_path / "img.png"),
+            encoding=get_image_encoding("lossless"),
+        )
+
+        assert (tmp_path / "img.webp").read_bytes() == payload
+        assert result == str(tmp_path / "img.webp")
+
+    @patch("sa.utils.downloads.requests.get")
+    def test_metadata_kept_when_requested(self, mock_get, generator, tmp_path):
+        """Test strip_metadata=False carries EXIF into the new file"""
+        from PIL import Image
+
+        from sa.generators.image_generator import get_image_encoding
+
+        mock_get.return_value = TestStreamingDownload.streamed(self.photo_png())
+
+        result = generator.download_image(
+            "https://example.com/x",
+            str(tmp_path / "img.png"),
+            encoding=get_image_encoding("compact", strip_metadata=False),
+        )
+
+        with Image.open(result) as img:
+            assert img.getexif()[0x010F] == "TestCamera"
+
+    def test_default_profile_matches_config(self, monkeypatch):
+        """Test a generator built without a profile encodes like the configured app"""
+        from sa.utils.config import Config
+
+        monkeypatch.delenv("SA_IMAGE_PROFILE", raising=False)
+        configured = ImageGenerator(image_profile=Config().image_profile)
+
+        assert ImageGenerator().encoding == configured.encoding
+
+    def test_profile_overrides(self):
+        """Test per-request overrides and validation"""
+        from sa.generators.image_generator import IMAGE_PROFILES, get_image_encoding
+
+        assert get_image_encoding() == IMAGE_PROFILES["standard"]
+        encoding = get_image_encoding("standard", image_format="jpg", quality=55)
+        assert (encoding.image_format, encoding.quality) == ("jpeg", 55)
+        assert encoding.pil_format == "JPEG"
+
+        with pytest.raises(ValueError):
+            get_image_encoding("huge")
+
+    @patch("sa.generators.image_generator.AVIF_AVAILABLE", False)
+    def test_avif_falls_back_to_webp(self):
+        """Test AVIF requests use WebP when no encoder is installed"""
+        from sa.generators.image_generator import get_image_encoding
+
+        assert get_image_encoding("high", image_format="avif").image_format == "webp"
+
+
 class TestBatchDownload:
     """Test batch downloading"""
 
-    @patch("sa.generators.image_generator.requests.get")
+    @patch("sa.utils.downloads.requests.get")
     @patch("sa.generators.image_generator.Image.open")
     def test_batch_download_success(self, mock_image, mock_get, generator, tmp_path):
         """Test successful batch download"""
@@ -0,0 +1,112 @@
+"""Tests for the perceptual-hash image index"""
+
+import os
+import random
+
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter
+
+from sa.utils.image_index import (
+    BKTree,
+    ImageHash,
+    ImageHashIndex,
+    dhash,
+    hamming,
+    phash,
+)
+
+
+def noise_image(seed, size=512):
+    """A blocky random RGB image that survives downscaling"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize((size, size), Image.NEAREST)
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Index persisted into a scratch directory"""
+    return ImageHashIndex(tmp_path / "index.json")
+
+
+def test_hashes_survive_resize_and_recompression(tmp_path):
+    """Test edited copies stay close while unrelated images are far apart"""
+    original = noise_image(1)
+    path = tmp_path / "copy.jpg"
+    original.filter(ImageFilter.GaussianBlur(1)).resize((300, 300)).save(path, quality=70)
+    copy = ImageHash.from_file(path)
+    other = noise_image(2)
+
+    assert copy.is_duplicate(ImageHash(phash(original), dhash(original)))
+    assert hamming(phash(original), phash(other)) > 16
+    assert hamming(dhash(original), dhash(other)) > 16
+
+
+def test_bktree_matches_brute_force():
+    """Test radius queries return exactly the keys a linear scan finds"""
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, f"k{i}")
+    # Near neighbours of a stored value
+    query = values[0] ^ 0b1011
+
+    for radius in (0, 3, 20, 28):
+        expected = sorted(
+            (hamming(query, value), f"k{i}")
+            for i, value in enumerate(values)
+            if hamming(query, value) <= radius
+        )
+        assert tree.search(query, radius) == expected
+
+    assert tree.remove(values[0], "k0")
+    assert not tree.remove(values[0], "k0")
+    assert "k0" not in [key for _, key in tree.search(values[0], 64)]
+    assert len(tree) == 499
+
+
+def test_dedupe_keeps_first_copy(index, tmp_path):
+    """Test a near-identical image is replaced by the stored one"""
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.webp"
+    unrelated = tmp_path / "unrelated.png"
+    noise_image(1).save(first)
+    noise_image(1).resize((400, 400)).save(second, quality=85)
+    noise_image(2).save(unrelated)
+
+    assert index.dedupe(str(first)) == str(first)
+    assert index.dedupe(str(second)) == os.path.abspath(first)
+    assert not second.exists()
+    assert index.dedupe(str(unrelated)) == str(unrelated)
+    assert index.stats["duplicates"] == 1
+    assert len(index) == 2
+
+
+def test_find_similar_excludes_query(index, tmp_path):
+    """Test similar lookups rank matches by distance and skip the query itself"""
+    for name, seed in (("a.png", 1), ("b.png", 2)):
+        noise_image(seed).save(tmp_path / name)
+    noise_image(1).filter(ImageFilter.GaussianBlur(2)).save(tmp_path / "a_blur.png")
+    index.sync(str(tmp_path))
+
+    matches = index.find_similar(str(tmp_path / "a.png"), max_distance=10)
+
+    assert [os.path.basename(path) for path, _ in matches] == ["a_blur.png"]
+
+
+def test_sync_persists_and_prunes(index, tmp_path):
+    """Test sync hashes only new files, drops deleted ones and reloads from disk"""
+    noise_image(1).save(tmp_path / "a.png")
+    noise_image(2).save(tmp_path / "b.png")
+
+    assert index.sync(str(tmp_path)) == 2
+    assert index.sync(str(tmp_path)) == 0
+
+    os.remove(tmp_path / "b.png")
+    index.sync(str(tmp_path))
+    reloaded = ImageHashIndex(tmp_path / "index.json")
+
+    assert str(tmp_path / "a.png") in reloaded
+    assert str(tmp_path / "b.png") not in reloaded
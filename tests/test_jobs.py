@@ -0,0 +1,64 @@
+"""Tests for job progress tracking"""
+
+import asyncio
+
+import pytest
+
+from sa.utils.jobs import JobTracker
+
+
+@pytest.fixture
+def tracker():
+    """Create a fresh job tracker"""
+    return JobTracker(max_jobs=3)
+
+
+def test_create_job(tracker):
+    """Test job creation"""
+    job = tracker.create("job-1")
+    assert job["status"] == "queued"
+    assert job["kind"] == "video"
+    assert tracker.get("job-1")["job_id"] == "job-1"
+
+
+def test_update_job(tracker):
+    """Test job updates bump the version"""
+    tracker.create("job-1")
+    tracker.update("job-1", status="processing", progress={"frames": 10})
+    job = tracker.get("job-1")
+    assert job["status"] == "processing"
+    assert job["progress"]["frames"] == 10
+    assert job["version"] == 1
+
+
+def test_update_unknown_job(tracker):
+    """Test updating an unknown job is a no-op"""
+    tracker.update("missing", status="completed")
+    assert tracker.get("missing") is None
+
+
+def test_evicts_oldest_finished(tracker):
+    """Test finished jobs are evicted once the registry is full"""
+    tracker.create("old")
+    tracker.update("old", status="completed")
+    for i in range(3):
+        tracker.create(f"job-{i}")
+    assert tracker.get("old") is None
+    assert tracker.get("job-0") is not None
+
+
+def test_stream_until_finished(tracker):
+    """Test stream yields changes and stops on a terminal status"""
+    tracker.create("job-1")
+
+    async def collect():
+        events = []
+        async for job in tracker.stream("job-1", poll_interval=0.01):
+            events.append(job["status"])
+            if job["status"] == "queued":
+                tracker.update("job-1", status="processing")
+            elif job["status"] == "processing":
+                tracker.update("job-1", status="completed")
+        return events
+
+    assert asyncio.run(collect()) == ["queued", "processing", "completed"]
@@ -0,0 +1,193 @@
+"""Tests for latency-aware routing between provider backends"""
+
+import asyncio
+import time
+
+import pytest
+
+from sa.generators.predictions import completed_future
+from sa.utils.ai_models import closest_size
+from sa.utils.model_router import (
+    Backend,
+    ModelRouter,
+    RequestRejected,
+    RoutingError,
+    RoutingHints,
+)
+
+
+class FakeProvider:
+    """Backend call with a controllable delay and failure mode"""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.failing = False
+        self.calls = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.failing:
+            raise ConnectionError(f"{self.name} is down")
+        return f"{self.name}:{prompt}"
+
+
+def make_router(*providers, **kwargs):
+    """Router over fake providers with exploration disabled"""
+    backends = [
+        Backend(provider.name, provider, expected_latency=provider.delay, **kwargs)
+        for provider in providers
+    ]
+    return ModelRouter("image", backends, explore_rate=0)
+
+
+def test_routes_to_fastest_backend():
+    """Test measured latency decides the order, whatever the seed estimates"""
+    fast, slow = FakeProvider("fast", 0.001), FakeProvider("slow", 0.05)
+    router = ModelRouter(
+        "image",
+        [Backend("slow", slow, expected_latency=0.0), Backend("fast", fast, expected_latency=0.01)],
+        explore_rate=0,
+    )
+
+    for _ in range(10):
+        router.call("x")
+
+    assert router.candidates()[0].name == "fast"
+    assert router.call("x").backend == "fast"
+    assert slow.calls <= 2
+
+
+def test_fails_over_and_trips_breaker():
+    """Test errors fail over at once and a failing backend is taken out of rotation"""
+    primary, secondary = FakeProvider("primary", 0.0), FakeProvider("secondary", 0.01)
+    router = make_router(primary, secondary)
+    primary.failing = True
+
+    results = [router.call("x") for _ in range(5)]
+
+    assert {routed.backend for routed in results} == {"secondary"}
+    # Three failures trip the breaker; later requests skip the primary
+    assert primary.calls == 3
+    assert router.get_statistics()["primary"]["healthy"] is False
+    assert router.candidates()[-1].name == "primary"
+
+
+def test_recovers_after_cooldown(monkeypatch):
+    """Test a tripped backend is probed after its cooldown and rejoins on success"""
+    primary, secondary = FakeProvider("primary", 0.0), FakeProvider("secondary", 0.01)
+    router = make_router(primary, secondary)
+    primary.failing = True
+    for _ in range(3):
+        router.call("x")
+
+    primary.failing = False
+    backend = router.backends[0]
+    monkeypatch.setattr(backend, "open_until", time.monotonic() - 1)
+
+    assert router.call("x").backend == "primary"
+    assert backend.healthy
+    assert backend.cooldown == 30.0
+
+
+def test_all_backends_failing_raises():
+    """Test a request fails only when every backend did, with each error listed"""
+    first, second = FakeProvider("first"), FakeProvider("second")
+    first.failing = second.failing = True
+    router = make_router(first, second)
+
+    with pytest.raises(RoutingError, match="first.*second"):
+        router.call("x")
+
+
+def test_rejected_requests_do_not_trip_breaker():
+    """Test invalid input fails over without counting against backend health"""
+    secondary = FakeProvider("secondary", 0.01)
+
+    def strict(prompt):
+        raise RequestRejected("Prompt is too short")
+
+    router = ModelRouter(
+        "image",
+        [Backend("strict", strict, expected_latency=0.0), Backend("secondary", secondary)],
+        explore_rate=0,
+    )
+
+    assert {router.call("x").backend for _ in range(5)} == {"secondary"}
+    stats = router.get_statistics()["strict"]
+    assert (stats["healthy"], stats["failures"], stats["rejected"]) == (True, 0, 5)
+
+
+def test_sla_hints():
+    """Test provider, latency, cost and quality hints"""
+    cheap = Backend("cheap", FakeProvider("cheap"), cost=1, quality="Good", expected_latency=1)
+    premium = Backend("premium", FakeProvider("premium"), cost=3, quality="Very High")
+    router = ModelRouter("image", [cheap, premium], explore_rate=0)
+
+    assert router.call("x").backend == "cheap"
+    assert router.call("x", hints=RoutingHints(provider="premium")).backend == "premium"
+    assert router.call("x", hints=RoutingHints(min_quality="High")).backend == "premium"
+    assert router.candidates(RoutingHints(max_latency=5))[0].name == "cheap"
+    with pytest.raises(RoutingError):
+        router.candidates(RoutingHints(max_cost=1, min_quality="Very High"))
+
+
+def test_unimplemented_and_unconfigured_backends_are_skipped():
+    """Test placeholder integrations are disabled and disabled configs are invisible"""
+
+    def placeholder(prompt):
+        raise NotImplementedError("requires setup")
+
+    fallback = FakeProvider("fallback")
+    router = ModelRouter(
+        "image",
+        [
+            Backend("placeholder", placeholder, expected_latency=0),
+            Backend("unconfigured", fallback, expected_latency=0, enabled=lambda: False),
+            Backend("fallback", fallback, expected_latency=1),
+        ],
+        explore_rate=0,
+    )
+
+    assert router.call("x").backend == "fallback"
+    assert [b.name for b in router.candidates()] == ["fallback"]
+    assert len(router) == 1
+
+
+def test_async_call_awaits_futures():
+    """Test acall awaits future-returning backends and treats empty results as failures"""
+    empty = Backend(
+        "empty", lambda prompt: completed_future([]), expected_latency=0, returns_future=True
+    )
+    futures = Backend(
+        "futures",
+        lambda prompt: completed_future([prompt]),
+        expected_latency=1,
+        returns_future=True,
+    )
+    router = ModelRouter("image", [empty, futures], explore_rate=0)
+
+    routed = asyncio.run(router.acall("x"))
+
+    assert (routed.result, routed.backend) == (["x"], "futures")
+    assert router.get_statistics()["empty"]["failures"] == 1
+
+
+def test_from_factory_uses_catalogue():
+    """Test factory backends only appear for providers with keys, with catalogue metadata"""
+    router = ModelRouter.from_factory("image", {"OpenAI": "key"})
+    empty = ModelRouter.from_factory("image", {"OpenAI": None})
+
+    stats = router.get_statistics()
+    assert set(stats) == {"openai-dalle-3", "openai-dalle-2"}
+    assert stats["openai-dalle-2"]["cost"] == 1
+    assert len(empty) == 0
+
+
+def test_closest_size():
+    """Test requested dimensions map to the nearest supported size"""
+    sizes = ["1024x1024", "1792x1024", "1024x1792"]
+    assert closest_size(sizes, 1536, 864) == "1792x1024"
+    assert closest_size(sizes, 512, 512) == "1024x1024"
+    assert closest_size(["256x256", "512x512", "1024x1024"], 600, 600) == "512x512"
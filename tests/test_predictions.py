@@ -0,0 +1,279 @@
+"""Tests for non-blocking Replicate predictions against a local fake server"""
+
+import base64
+import hashlib
+import hmac
+import itertools
+import threading
+import time
+from collections import Counter
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+
+from sa.generators.image_generator import ImageGenerator
+from sa.generators.predictions import PredictionEngine, PredictionError
+from sa.utils.rate_limit import AdaptiveLimiter
+
+
+class FakeReplicate:
+    """In-process stand-in for the Replicate predictions API"""
+
+    def __init__(self, duration: float = 0.3):
+        self.duration = duration
+        self.predictions: dict[str, dict] = {}
+        self.bodies: list[dict] = []
+        self.requests: Counter = Counter()
+        self._ids = itertools.count()
+        self.app = self._build_app()
+
+    def _view(self, prediction: dict, with_output: bool = True) -> dict:
+        """Current state of a prediction, derived from its age"""
+        view = {"id": prediction["id"], "status": prediction["status"]}
+        if view["status"] in ("starting", "processing"):
+            finished = time.monotonic() - prediction["created"] >= self.duration
+            if not finished:
+                view["status"] = "processing"
+            elif "FAIL" in prediction["input"].get("prompt", ""):
+                view.update(status="failed", error="NSFW content detected")
+            else:
+                view["status"] = "succeeded"
+        if view["status"] == "succeeded" and with_output:
+            view["output"] = [f"https://fake.replicate/{prediction['id']}.png"]
+        return view
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        def create(body: dict) -> dict:
+            self.requests["create"] += 1
+            self.bodies.append(body)
+            prediction_id = f"p{next(self._ids)}"
+            self.predictions[prediction_id] = {
+                "id": prediction_id,
+                "status": "starting",
+                "input": body["input"],
+                "created": time.monotonic(),
+            }
+            return {"id": prediction_id, "status": "starting"}
+
+        @app.post("/v1/models/{owner}/{name}/predictions", status_code=201)
+        async def create_for_model(owner: str, name: str, request: Request):
+            return create(await request.json())
+
+        @app.post("/v1/predictions", status_code=201)
+        async def create_for_version(request: Request):
+            return create(await request.json())
+
+        @app.get("/v1/predictions")
+        async def list_predictions():
+            self.requests["list"] += 1
+            newest = sorted(self.predictions.values(), key=lambda p: -p["created"])[:100]
+            return {"results": [self._view(p, with_output=False) for p in newest], "next": None}
+
+        @app.get("/v1/predictions/{prediction_id}")
+        async def get_prediction(prediction_id: str):
+            self.requests["get"] += 1
+            if prediction_id not in self.predictions:
+                raise HTTPException(status_code=404)
+            return self._view(self.predictions[prediction_id])
+
+        @app.post("/v1/predictions/{prediction_id}/cancel")
+        async def cancel_prediction(prediction_id: str):
+            self.requests["cancel"] += 1
+            self.predictions[prediction_id]["status"] = "canceled"
+            return self._view(self.predictions[prediction_id])
+
+        return app
+
+
+@pytest.fixture
+def fake():
+    """Fake Replicate server"""
+    return FakeReplicate()
+
+
+@pytest.fixture
+def make_engine(fake):
+    """Build engines wired to the fake server and close them afterwards"""
+    engines = []
+
+    def factory(**kwargs):
+        options = {
+            "poll_interval": 0.05,
+            "max_poll_interval": 0.2,
+            "limiter": AdaptiveLimiter("test", 1000, 1000, 64, initial_concurrency=64),
+            "read_limiter": AdaptiveLimiter("test", 1000, 1000, 64, initial_concurrency=64),
+        }
+        options.update(kwargs)
+        engine = PredictionEngine(
+            "test-token",
+            base_url="http://fake.replicate/v1",
+            transport=httpx.ASGITransport(app=fake.app),
+            **options,
+        )
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        engine.close()
+
+
+WEBHOOK_URL = "https://app.example/api/v1/webhooks/replicate"
+SECRET = "whsec_" + base64.b64encode(b"0123456789abcdef").decode()
+
+
+def wait_until(condition, timeout=2.0):
+    """Poll a condition until it holds or the timeout passes"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_many_predictions_share_one_thread(fake, make_engine):
+    """Test a burst of predictions is tracked by one thread and batch-polled"""
+    engine = make_engine()
+    threads_before = threading.active_count()
+
+    futures = [engine.submit("owner/model", {"prompt": f"image {i}"}) for i in range(100)]
+    results = [future.result(timeout=10) for future in futures]
+
+    assert threading.active_count() <= threads_before + 1
+    assert all(result["output"][0].endswith(f"{result['id']}.png") for result in results)
+    assert engine.in_flight == 0
+    # Progress came from the listing; single gets are only needed for outputs
+    assert fake.requests["list"] >= 1
+    assert fake.requests["get"] <= 120
+
+
+def test_versioned_model_and_webhook_fields(fake, make_engine):
+    """Test version pins use /predictions and webhooks are requested on completion only"""
+    engine = make_engine(webhook_url=WEBHOOK_URL, webhook_secret=SECRET)
+
+    engine.submit("owner/model:abc123", {"prompt": "x"})
+    assert wait_until(lambda: engine.in_flight == 1)
+
+    assert fake.bodies[0]["version"] == "abc123"
+    assert fake.bodies[0]["webhook_events_filter"] == ["completed"]
+
+
+def test_webhook_resolves_without_polling(fake, make_engine):
+    """Test a webhook delivery completes the prediction before any poll"""
+    fake.duration = 3600
+    engine = make_engine(webhook_url=WEBHOOK_URL, webhook_secret=SECRET)
+
+    future = engine.submit("owner/model", {"prompt": "x"})
+    assert wait_until(lambda: engine.in_flight == 1)
+    prediction_id = next(iter(fake.predictions))
+
+    assert engine.handle_webhook({"id": prediction_id, "status": "succeeded", "output": ["u"]})
+    assert future.result(timeout=2)["output"] == ["u"]
+    assert fake.requests["get"] == 0
+    assert not engine.handle_webhook({"id": prediction_id, "status": "succeeded"})
+
+
+def test_timeout_cancels_upstream(fake, make_engine):
+    """Test predictions past the timeout fail locally and are canceled remotely"""
+    fake.duration = 3600
+    engine = make_engine(timeout=0.2)
+
+    future = engine.submit("owner/model", {"prompt": "x"})
+
+    with pytest.raises(PredictionError, match="timed out"):
+        future.result(timeout=5)
+    assert wait_until(lambda: fake.requests["cancel"] == 1)
+
+
+def test_image_generator_uses_engine(make_engine, tmp_path):
+    """Test ImageGenerator resolves through the engine, including failures"""
+    generator = ImageGenerator(cache_dir=str(tmp_path), prediction_engine=make_engine())
+
+    urls = generator.generate("A beautiful sunset over the sea", use_cache=False)
+    failed = generator.submit("FAIL a beautiful sunset", use_cache=False).result(timeout=5)
+
+    assert urls and urls[0].startswith("https://fake.replicate/")
+    assert failed == []
+    assert generator.stats["generated"] == 1
+    assert generator.stats["failed"] == 1
+
+
+def sign(secret: str, message_id: str, timestamp: str, body: bytes) -> str:
+    """Sign a webhook the way Replicate does"""
+    key = base64.b64decode(secret.removeprefix("whsec_"))
+    digest = hmac.new(key, f"{message_id}.{timestamp}.".encode() + body, hashlib.sha256)
+    return "v1," + base64.b64encode(digest.digest()).decode()
+
+
+def test_webhook_signature_verification():
+    """Test valid, tampered and stale webhook signatures"""
+    engine = PredictionEngine(webhook_secret=SECRET)
+    body = b'{"id": "p0", "status": "succeeded"}'
+    now = str(int(time.time()))
+    headers = {
+        "webhook-id": "msg_1",
+        "webhook-timestamp": now,
+        "webhook-signature": f"v1,stale {sign(SECRET, 'msg_1', now, body)}",
+    }
+
+    assert engine.verify_webhook(headers, body)
+    assert not engine.verify_webhook(headers, body + b" ")
+
+    old = str(int(time.time()) - 3600)
+    stale = dict(headers, **{"webhook-timestamp": old})
+    stale["webhook-signature"] = sign(SECRET, "msg_1", old, body)
+    assert not engine.verify_webhook(stale, body)
+
+
+def test_webhooks_require_a_secret(fake, make_engine):
+    """Test an unsigned webhook receiver is neither registered nor trusted"""
+    engine = make_engine(webhook_url=WEBHOOK_URL)
+
+    engine.submit("owner/model", {"prompt": "x"})
+    assert wait_until(lambda: fake.bodies)
+
+    assert "webhook" not in fake.bodies[0]
+    assert not engine.verify_webhook({}, b'{"id": "p0", "status": "succeeded"}')
+
+
+def mock_engine(handler):
+    """Engine talking to an httpx handler instead of a fake server"""
+    return PredictionEngine(
+        "test-token",
+        base_url="http://fake.replicate/v1",
+        transport=httpx.MockTransport(handler),
+        poll_interval=0.05,
+        limiter=AdaptiveLimiter("test", 1000, 1000, 64),
+        read_limiter=AdaptiveLimiter("test", 1000, 1000, 64),
+    )
+
+
+def test_malformed_create_response_fails_future():
+    """Test a created prediction without an id fails instead of hanging"""
+    engine = mock_engine(lambda request: httpx.Response(201, json={"status": "starting"}))
+    try:
+        with pytest.raises(PredictionError, match="Malformed"):
+            engine.submit("owner/model", {"prompt": "x"}).result(timeout=2)
+    finally:
+        engine.close()
+
+
+def test_malformed_poll_response_keeps_poller_alive():
+    """Test one unreadable poll body is retried rather than killing the poller"""
+    polls = itertools.count()
+
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(201, json={"id": "p0", "status": "starting"})
+        if next(polls) == 0:
+            return httpx.Response(200, text="<html>bad gateway</html>")
+        return httpx.Response(200, json={"id": "p0", "status": "succeeded", "output": ["u"]})
+
+    engine = mock_engine(handler)
+    try:
+        result = engine.submit("owner/model", {"prompt": "x"}).result(timeout=2)
+    finally:
+        engine.close()
+    assert result["output"] == ["u"]
@@ -0,0 +1,180 @@
+"""Tests for adaptive provider rate limiting"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from sa.utils import rate_limit
+from sa.utils.rate_limit import (
+    AdaptiveLimiter,
+    get_limiter,
+    is_transport_error,
+    retry_after_of,
+)
+
+
+class ProviderError(Exception):
+    """Stand-in for an SDK error carrying an HTTP status and headers"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def make_limiter(**kwargs):
+    """Limiter fast enough not to slow tests down unless asked to"""
+    options = {"rate": 1000.0, "burst": 1000, "max_concurrency": 16, "initial_concurrency": 8}
+    options.update(kwargs)
+    return AdaptiveLimiter("test", **options)
+
+
+def test_token_bucket_caps_rate():
+    """Test requests beyond the burst are spaced out at the sustained rate"""
+    limiter = make_limiter(rate=50.0, burst=5)
+    start = time.monotonic()
+
+    for _ in range(15):
+        limiter.call(lambda: None)
+
+    # 5 from the burst, then 10 more at 50/s
+    assert time.monotonic() - start >= 0.18
+
+
+def test_concurrency_window_is_enforced():
+    """Test no more calls than the window run at once"""
+    limiter = make_limiter(max_concurrency=3, initial_concurrency=3)
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal peak
+        with lock:
+            peak = max(peak, limiter.in_flight)
+        time.sleep(0.02)
+
+    threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak <= 3
+    assert limiter.in_flight == 0
+
+
+def test_aimd_window():
+    """Test successes grow the window and a burst of 429s shrinks it once"""
+    limiter = make_limiter(initial_concurrency=4)
+    for _ in range(20):
+        limiter.call(lambda: None)
+    grown = limiter.concurrency_limit
+    assert grown > 4
+
+    for _ in range(5):
+        limiter.acquire()
+    for _ in range(5):
+        limiter.release(ProviderError(429))
+
+    assert limiter.concurrency_limit == max(1, int(limiter._limit))
+    assert limiter.concurrency_limit < grown
+    assert limiter.concurrency_limit >= int(grown * 0.7) - 1
+    assert limiter.stats["throttled"] == 5
+
+
+def test_client_errors_do_not_shrink_window():
+    """Test 4xx responses other than 429 are not treated as congestion"""
+    limiter = make_limiter(initial_concurrency=4)
+
+    limiter.acquire()
+    limiter.release(ProviderError(400))
+
+    assert limiter.concurrency_limit == 4
+    assert limiter.stats["errors"] == 1
+
+
+def test_retry_after_pauses_new_requests():
+    """Test Retry-After blocks acquire until the provider is ready"""
+    limiter = make_limiter()
+    limiter.acquire()
+    limiter.release(ProviderError(429, {"retry-after-ms": "200"}))
+
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0)
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_call_retries_throttled_requests():
+    """Test call retries 429s and 5xx, then returns the result"""
+    limiter = make_limiter()
+    responses = [ProviderError(429, {"retry-after": "0"}), ProviderError(503), "ok"]
+
+    def flaky():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats["retries"] == 2
+
+
+def test_call_raises_non_retryable_errors():
+    """Test bad requests and exhausted retries are raised to the caller"""
+    limiter = make_limiter(max_retries=1)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ProviderError(400)
+
+    def throttled():
+        raise ProviderError(429, {"retry-after": "0"})
+
+    with pytest.raises(ProviderError):
+        limiter.call(bad_request)
+    with pytest.raises(ProviderError):
+        limiter.call(throttled)
+    assert len(calls) == 1
+    assert limiter.stats["retries"] == 1
+
+
+def test_call_retries_transport_errors(monkeypatch):
+    """Test dropped connections and timeouts are retried, other errors are not"""
+    monkeypatch.setattr(rate_limit, "BACKOFF_BASE", 0.01)
+    limiter = make_limiter(max_retries=2)
+    errors = [ConnectionError("reset"), httpx.ReadTimeout("slow")]
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert limiter.stats["retries"] == 2
+    assert not is_transport_error(ValueError("bad"))
+
+
+def test_retry_after_formats():
+    """Test Retry-After is read from seconds, milliseconds and HTTP dates"""
+    assert retry_after_of(ProviderError(429, {"retry-after": "3"})) == 3
+    assert retry_after_of(ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after_of(ProviderError(429, {"retry-after": "999999"})) == 120
+    date = retry_after_of(ProviderError(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+    assert date == 0
+    assert retry_after_of(ValueError("no response")) is None
+
+
+def test_limiters_shared_per_credential():
+    """Test one limiter per provider credential"""
+    assert get_limiter("openai", "key-a") is get_limiter("openai", "key-a")
+    assert get_limiter("openai", "key-a") is not get_limiter("openai", "key-b")
+    assert get_limiter("replicate", "key-a") is not get_limiter("openai", "key-a")
+    with pytest.raises(ValueError, match="Unsupported provider"):
+        get_limiter("unknown")
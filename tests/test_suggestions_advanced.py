@@ -8,7 +8,7 @@ from sa.utils.suggestions import SuggestionEngine
 @pytest.fixture
 def mock_openai_client():
     """Mock OpenAI client"""
-    with patch("sa.utils.suggestions.OpenAI") as mock:
+    with patch("sa.utils.suggestions.get_client") as mock:
         mock_instance = MagicMock()
         mock.return_value = mock_instance
 
@@ -25,14 +25,14 @@ class TestSuggestionEngineInit:
 
     def test_init_with_api_key(self):
         """Test initialization with API key"""
-        with patch("sa.utils.suggestions.OpenAI"):
+        with patch("sa.utils.suggestions.get_client"):
             engine = SuggestionEngine(api_key="test_key")
             assert engine.api_key == "test_key"
 
     def test_init_from_env(self):
         """Test initialization from environment"""
         with patch("sa.utils.suggestions.os.getenv", return_value="env_key"):
-            with patch("sa.utils.suggestions.OpenAI"):
+            with patch("sa.utils.suggestions.get_client"):
                 engine = SuggestionEngine()
                 assert engine.api_key == "env_key"
 
@@ -0,0 +1,104 @@
+"""Tests for vectorized slideshow transitions"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from sa.generators.transitions import (
+    SlideshowRenderer,
+    build_slideshow_clip,
+    load_frames,
+)
+
+
+@pytest.fixture
+def frames():
+    """Two solid frames: black then white"""
+    data = np.zeros((2, 8, 10, 3), dtype=np.uint8)
+    data[1] = 255
+    return data
+
+
+@pytest.fixture
+def image_files(tmp_path):
+    """Create two real images of different sizes"""
+    paths = []
+    for i, (size, color) in enumerate([((40, 30), "red"), ((20, 30), "blue")]):
+        path = tmp_path / f"img_{i}.png"
+        Image.new("RGB", size, color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_load_frames_letterboxes(image_files):
+    """Test images are fitted into the first image's size"""
+    loaded = load_frames(image_files)
+    assert loaded.shape == (2, 30, 40, 3)
+    assert tuple(loaded[0, 15, 20]) == (255, 0, 0)
+    # Narrow blue image is centered with black bars
+    assert tuple(loaded[1, 15, 0]) == (0, 0, 0)
+    assert tuple(loaded[1, 15, 20]) == (0, 0, 255)
+
+
+def test_invalid_transition(frames):
+    """Test unknown transitions raise ValueError"""
+    with pytest.raises(ValueError):
+        SlideshowRenderer(frames, 2, "spin")
+
+
+def test_no_transition_returns_source(frames):
+    """Test frames outside a transition are the source images"""
+    renderer = SlideshowRenderer(frames, 2, "crossfade", 0.5)
+    assert renderer.duration == 4
+    assert renderer.make_frame(0.5).max() == 0
+    assert renderer.make_frame(3.0).min() == 255
+
+
+def test_crossfade_midpoint(frames):
+    """Test crossfade blends linearly between images"""
+    renderer = SlideshowRenderer(frames, 2, "crossfade", 0.5)
+    frame = renderer.make_frame(1.75)
+    assert frame.dtype == np.uint8
+    assert np.all(np.abs(frame.astype(int) - 127) <= 1)
+
+
+def test_slide_midpoint(frames):
+    """Test slide pushes the next image in from the right"""
+    renderer = SlideshowRenderer(frames, 2, "slide", 0.5)
+    frame = renderer.make_frame(1.75)
+    assert frame[:, 0].max() == 0
+    assert frame[:, -1].min() == 255
+
+
+def test_kenburns_keeps_shape_and_range(frames):
+    """Test Ken Burns warp produces full frames and blends into the next image"""
+    renderer = SlideshowRenderer(frames, 2, "kenburns", 0.5)
+    start = renderer.make_frame(0.0).copy()
+    middle = renderer.make_frame(1.75)
+    assert start.shape == (8, 10, 3)
+    assert start.max() == 0
+    assert 120 <= middle.mean() <= 135
+
+
+def test_kenburns_zooms_in():
+    """Test Ken Burns zoom magnifies the image over time"""
+    gradient = np.tile(np.arange(0, 200, 10, dtype=np.uint8)[None, :, None], (10, 1, 3))
+    renderer = SlideshowRenderer(gradient[None], 4, "kenburns")
+    start = renderer.make_frame(0.0).astype(int).copy()
+    end = renderer.make_frame(3.99).astype(int)
+    assert np.ptp(end[5, :, 0]) < np.ptp(start[5, :, 0])
+
+
+def test_kenburns_buffers_are_single_frames(frames):
+    """Test Ken Burns keeps no float copy of the whole slideshow"""
+    renderer = SlideshowRenderer(frames, 2, "kenburns", 0.5)
+    frame_size = frames[0].size
+    buffers = [v for v in vars(renderer).values() if isinstance(v, np.ndarray)]
+    assert all(b.size <= frame_size for b in buffers if b is not frames)
+
+
+def test_build_slideshow_clip(image_files):
+    """Test clip duration and frame size"""
+    clip = build_slideshow_clip(image_files, 2, "crossfade", 0.5)
+    assert clip.duration == 4
+    assert clip.get_frame(1.9).shape == (30, 40, 3)
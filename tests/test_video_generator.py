@@ -5,7 +5,14 @@ import tempfile
 from unittest.mock import MagicMock, patch
 
 import pytest
-from sa.generators.video_generator import VideoGenerator
+from moviepy.editor import VideoFileClip
+from PIL import Image
+from sa.generators.video_generator import (
+    RENDER_PROFILES,
+    RenderProgressLogger,
+    VideoGenerator,
+    get_render_profile,
+)
 
 
 @pytest.fixture
@@ -141,7 +148,11 @@ class TestCreateSlideshow:
         assert result == output_path
         assert mock_image_clip.call_count == 2
         mock_concat.assert_called_once()
-        mock_video.write_videofile.assert_called_once_with(output_path, fps=24, logger=None)
+        mock_video.write_videofile.assert_called_once()
+        args, kwargs = mock_video.write_videofile.call_args
+        assert args == (output_path,)
+        assert kwargs["fps"] == 24
+        assert kwargs["preset"] == RENDER_PROFILES["standard"].preset
 
     @patch("sa.generators.video_generator.ImageClip")
     def test_create_slideshow_failure(self, mock_image_clip, video_generator):
@@ -168,6 +179,147 @@ class TestCreateSlideshow:
         mock_image_clip.assert_called_once_with(temp_image_file, duration=10)
 
 
+class TestSlideshowTransitions:
+    """Test slideshow transition selection"""
+
+    def test_invalid_transition(self, video_generator, temp_image_file):
+        """Test unknown transition fails validation"""
+        result = video_generator.create_slideshow([temp_image_file], transition="spin")
+
+        assert result is None
+        assert video_generator.stats["failed"] == 1
+
+    @patch("sa.generators.video_generator.build_slideshow_clip")
+    @patch("sa.generators.video_generator.ImageClip")
+    def test_transition_uses_vectorized_renderer(
+        self, mock_image_clip, mock_build, video_generator, temp_image_file
+    ):
+        """Test transitions bypass per-image moviepy clips"""
+        mock_video = MagicMock()
+        mock_build.return_value = mock_video
+
+        result = video_generator.create_slideshow(
+            [temp_image_file, temp_image_file],
+            output_path="test_slideshow.mp4",
+            transition="crossfade",
+            transition_duration=1.0,
+        )
+
+        assert result == "test_slideshow.mp4"
+        mock_image_clip.assert_not_called()
+        mock_build.assert_called_once_with([temp_image_file, temp_image_file], 3, "crossfade", 1.0)
+        mock_video.write_videofile.assert_called_once()
+
+
+class TestRenderProfiles:
+    """Test render profile selection"""
+
+    def test_get_render_profile_default(self):
+        """Test default profile is standard"""
+        assert get_render_profile().name == "standard"
+
+    def test_get_render_profile_invalid(self):
+        """Test unknown profile raises ValueError"""
+        with pytest.raises(ValueError):
+            get_render_profile("ultra")
+
+    def test_profiles_trade_speed_for_quality(self):
+        """Test draft renders faster and smaller than final"""
+        draft = RENDER_PROFILES["draft"]
+        final = RENDER_PROFILES["final"]
+        assert draft.crf > final.crf
+        assert draft.max_height is not None
+        assert final.max_height is None
+
+    def test_write_kwargs(self):
+        """Test profile translates into encoder arguments"""
+        kwargs = RENDER_PROFILES["draft"].write_kwargs()
+        assert kwargs["codec"] == "libx264"
+        assert kwargs["preset"] == "ultrafast"
+        assert kwargs["audio_bitrate"] == "96k"
+        assert "-crf" in kwargs["ffmpeg_params"]
+        assert any("scale=" in p for p in kwargs["ffmpeg_params"])
+
+    def test_generator_default_profile(self):
+        """Test generator-level default profile"""
+        generator = VideoGenerator(api_key="test_key", render_profile="draft")
+        assert generator.render_profile == "draft"
+
+    @patch("sa.generators.video_generator.ImageClip")
+    @patch("sa.generators.video_generator.concatenate_videoclips")
+    def test_slideshow_per_call_profile(
+        self, mock_concat, mock_image_clip, video_generator, temp_image_file
+    ):
+        """Test per-call profile overrides the generator default"""
+        mock_video = MagicMock()
+        mock_concat.return_value = mock_video
+
+        video_generator.create_slideshow([temp_image_file], render_profile="final")
+
+        kwargs = mock_video.write_videofile.call_args.kwargs
+        assert kwargs["preset"] == "slow"
+        assert "min(" not in kwargs["ffmpeg_params"][-1]
+
+    @pytest.mark.parametrize("profile", sorted(RENDER_PROFILES))
+    def test_odd_sized_image_renders(self, profile, tmp_path):
+        """Test odd image dimensions are rounded to even for yuv420p"""
+        image_path = tmp_path / "odd.png"
+        Image.new("RGB", (641, 361), "red").save(image_path)
+        generator = VideoGenerator(api_key="test_key", cache_dir=str(tmp_path / "cache"))
+        output_path = str(tmp_path / f"{profile}.mp4")
+
+        result = generator.create_slideshow(
+            [str(image_path)], 1, output_path, fps=4, render_profile=profile
+        )
+
+        assert result == output_path
+        with VideoFileClip(output_path) as clip:
+            assert all(size % 2 == 0 for size in clip.size)
+
+
+class TestRenderProgress:
+    """Test frame-level encoder progress reporting"""
+
+    def test_logger_reports_frames(self):
+        """Test frame updates are translated into progress dicts"""
+        updates = []
+        messages = []
+        render_logger = RenderProgressLogger(messages.append, updates.append, min_interval=0)
+
+        for _ in render_logger.iter_bar(t=range(10)):
+            pass
+
+        assert updates[-1]["frames"] == 10
+        assert updates[-1]["total_frames"] == 10
+        assert updates[-1]["percent"] == 100.0
+        assert "fps" in updates[-1]
+        assert any("Encoding frame" in msg for msg in messages)
+
+    def test_logger_ignores_audio_chunks(self):
+        """Test audio chunk bars are not reported as frames"""
+        updates = []
+        render_logger = RenderProgressLogger(render_progress_callback=updates.append)
+
+        for _ in render_logger.iter_bar(chunk=range(5)):
+            pass
+
+        assert updates == []
+
+    @patch("sa.generators.video_generator.ImageClip")
+    @patch("sa.generators.video_generator.concatenate_videoclips")
+    def test_slideshow_passes_progress_logger(
+        self, mock_concat, mock_image_clip, video_generator, temp_image_file
+    ):
+        """Test encoder logger is wired when a render callback is given"""
+        mock_video = MagicMock()
+        mock_concat.return_value = mock_video
+
+        video_generator.create_slideshow([temp_image_file], render_progress_callback=print)
+
+        kwargs = mock_video.write_videofile.call_args.kwargs
+        assert isinstance(kwargs["logger"], RenderProgressLogger)
+
+
 class TestAddAudio:
     """Test adding audio to video"""
 
@@ -0,0 +1,69 @@
+"""Tests for the cached voice catalog"""
+
+import json
+import threading
+import time
+
+from sa.generators.voice_catalog import DEFAULT_VOICES, VoiceCatalog
+
+
+def wait_for_refresh(catalog, timeout=2.0):
+    """Wait until no background refresh is running"""
+    deadline = time.time() + timeout
+    while catalog._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_defaults_resolve_before_first_fetch(tmp_path):
+    """Test premade voices resolve by name, case-insensitively, without a fetch"""
+    catalog = VoiceCatalog(dict, tmp_path / "voices.json")
+
+    assert catalog.resolve("Adam") == DEFAULT_VOICES["Adam"]
+    assert catalog.resolve("rachel") == DEFAULT_VOICES["Rachel"]
+    assert catalog.resolve("custom-voice-id") == "custom-voice-id"
+
+
+def test_stale_catalog_refreshes_in_background_and_persists(tmp_path):
+    """Test reads return immediately while a single refresh runs in the background"""
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(2)
+        return {"Narrator": "id-narrator"}
+
+    cache_file = tmp_path / "voices.json"
+    catalog = VoiceCatalog(slow_fetch, cache_file)
+
+    assert "Adam" in catalog.names()
+    assert "Adam" in catalog.names()
+    release.set()
+    wait_for_refresh(catalog)
+
+    assert len(calls) == 1
+    assert catalog.names() == ["Narrator"]
+    assert json.loads(cache_file.read_text())["voices"] == {"Narrator": "id-narrator"}
+
+    # A new instance starts warm from disk without fetching
+    warm = VoiceCatalog(lambda: calls.append(1) or {}, cache_file)
+    assert warm.resolve("narrator") == "id-narrator"
+    assert not warm.is_stale
+    assert len(calls) == 1
+
+
+def test_failed_refresh_keeps_snapshot_and_backs_off(tmp_path):
+    """Test a failing provider neither clears the catalog nor is retried per call"""
+    calls = []
+
+    def failing_fetch():
+        calls.append(1)
+        raise RuntimeError("API down")
+
+    catalog = VoiceCatalog(failing_fetch, tmp_path / "voices.json", defaults={"A": "id-a"})
+    assert catalog.refresh() is False
+
+    assert catalog.resolve("A") == "id-a"
+    assert not catalog.is_stale
+    catalog.names()
+    assert len(calls) == 1